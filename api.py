@@ -1,68 +1,523 @@
-import io
+import asyncio
+import functools
+import json
 import logging
 import os
-import shutil
-import tempfile
-from contextlib import asynccontextmanager
+import time
+from contextlib import asynccontextmanager, suppress
 from typing import Callable
 
-from fastapi import FastAPI, File, HTTPException, Request, UploadFile
-from fastapi.responses import StreamingResponse
+import numpy as np
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
-from voice_runtime import RuntimeServices
+from audio_encoding import AudioFormat, UnsupportedFormatError
+from audio_io import SAMPLE_RATE, AudioDecodeError, decode_audio_bytes
+from conversation import Conversation
+from inference import DeadlineExceededError, InferenceExecutor, QueueFullError, UnknownPriorityError
+from long_audio import split_at_silence
+from metrics import REGISTRY, Trace
+from model_registry import UnknownModelError
+from streaming_stt import StreamingTranscriber
+from voice_activity import make_vad
+from voice_runtime import RuntimeServices, Transcription, UnsupportedLanguageError
+from whisper_pool import WhisperProcessPool
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
 
-ALLOWED_TTS_FORMATS = {"pcm", "mp3", "ogg_vorbis"}
-MEDIA_TYPES = {
-    "pcm": "application/octet-stream",
-    "mp3": "audio/mpeg",
-    "ogg_vorbis": "audio/ogg",
-}
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+# /transcribe/long takes whole recordings: an hour of 16 kHz mono WAV is about 115 MB.
+MAX_LONG_UPLOAD_BYTES = int(os.getenv("MAX_LONG_UPLOAD_BYTES", str(512 * 1024 * 1024)))
+STREAM_VAD = os.getenv("STREAM_VAD", "silero")
+STREAM_MIN_SILENCE_MS = float(os.getenv("STREAM_MIN_SILENCE_MS", "500"))
+STREAM_PARTIAL_INTERVAL_MS = float(os.getenv("STREAM_PARTIAL_INTERVAL_MS", "600"))
+
+# Long recordings are cut at pauses into chunks of at most this length and decoded in parallel.
+LONG_AUDIO_CHUNK_S = float(os.getenv("LONG_AUDIO_CHUNK_S", "30"))
+LONG_AUDIO_VAD = os.getenv("LONG_AUDIO_VAD", STREAM_VAD)
+# Chunks in flight per request; 0 means one per inference worker.
+LONG_AUDIO_PARALLELISM = int(os.getenv("LONG_AUDIO_PARALLELISM", "0"))
+# How long one chunk may keep retrying against a full inference queue before the request fails.
+LONG_AUDIO_QUEUE_WAIT_S = float(os.getenv("LONG_AUDIO_QUEUE_WAIT_S", "120"))
+
+STARTUP_RETRY_AFTER = int(os.getenv("STARTUP_RETRY_AFTER", "5"))
 
 
 class TTSRequest(BaseModel):
     text: str
     language: str | None = None
     format: str = "mp3"
+    # Output sample rate (Hz) and, for opus, bitrate (bits per second).
+    sample_rate: int | None = None
+    bitrate: int | None = None
+
+
+def _transcribe_upload(
+    services: RuntimeServices,
+    data: bytes,
+    language: str | None,
+    model: str | None,
+    trace: Trace,
+    submitted: float,
+    deadline: float | None,
+) -> Transcription:
+    trace.mark("inference_wait", trace.elapsed() - submitted)
+    with trace.stage("audio_decode"):
+        audio = decode_audio_bytes(data)
+    budget = deadline - time.monotonic() if deadline is not None else None
+    with trace.stage("stt"):
+        return services.transcribe(audio, language=language, model=model, budget_s=budget)
+
+
+def _prepare_long_audio(data: bytes) -> tuple[np.ndarray, list[tuple[int, int]]]:
+    audio = decode_audio_bytes(data)
+    return audio, split_at_silence(audio, make_vad(LONG_AUDIO_VAD), LONG_AUDIO_CHUNK_S)
+
+
+def _ndjson(event: dict) -> bytes:
+    return (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
 
 
-def create_app(services_factory: Callable[[], RuntimeServices] = RuntimeServices.from_env) -> FastAPI:
+def _not_ready_detail(services: RuntimeServices) -> str:
+    if services.load_error is not None:
+        return f"Startup failed: {services.load_error}"
+    return "Service is starting"
+
+
+def _require_ready(services: RuntimeServices) -> None:
+    if not services.is_ready:
+        raise HTTPException(
+            status_code=503,
+            detail=_not_ready_detail(services),
+            headers={"Retry-After": str(STARTUP_RETRY_AFTER)},
+        )
+
+
+async def _accept_when_ready(websocket: WebSocket) -> bool:
+    await websocket.accept()
+    services: RuntimeServices = websocket.app.state.services
+    if services.is_ready:
+        return True
+    await websocket.send_json(
+        {"type": "error", "detail": _not_ready_detail(services), "retry_after": STARTUP_RETRY_AFTER}
+    )
+    # 1013: try again later.
+    await websocket.close(code=1013)
+    return False
+
+
+def create_app(
+    services_factory: Callable[[], RuntimeServices] = functools.partial(RuntimeServices.from_env, background=True),
+    executor_factory: Callable[[], InferenceExecutor] = InferenceExecutor.from_env,
+) -> FastAPI:
     @asynccontextmanager
     async def lifespan(app: FastAPI):
         logger.info("Initializing runtime services")
         app.state.services = services_factory()
-        logger.info("Runtime services initialized (language=%s)", app.state.services.language)
+        app.state.inference = executor_factory()
+        # Model loading may still be running; /health/ready reports when it is done.
+        logger.info(
+            "Runtime services created (language=%s, inference_workers=%s, inference_queue=%s)",
+            app.state.services.language,
+            app.state.inference.workers,
+            app.state.inference.max_queue,
+        )
         yield
+        app.state.inference.shutdown()
+        await app.state.services.aclose()
+        app.state.services.close()
 
     app = FastAPI(title="Voice Agent API", description="API for STT and TTS services", lifespan=lifespan)
 
+    @app.middleware("http")
+    async def reject_oversized_uploads(request: Request, call_next):
+        # Refuse before the multipart body is read when the client declares its size up front.
+        content_length = request.headers.get("content-length")
+        if request.url.path.startswith("/transcribe") and content_length and content_length.isdigit():
+            limit = MAX_LONG_UPLOAD_BYTES if request.url.path == "/transcribe/long" else MAX_UPLOAD_BYTES
+            if int(content_length) > limit + 64 * 1024:
+                return JSONResponse(status_code=413, content={"detail": f"Upload exceeds {limit} bytes"})
+        return await call_next(request)
+
     @app.post("/transcribe")
-    async def transcribe_audio(request: Request, file: UploadFile = File(...)):
-        suffix = os.path.splitext(file.filename or "upload.wav")[1] or ".wav"
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp:
-            shutil.copyfileobj(file.file, temp)
-            temp_path = temp.name
+    async def transcribe_audio(
+        request: Request,
+        file: UploadFile = File(...),
+        language: str | None = Form(None),
+        model: str | None = Form(None),
+        priority: str = Form("normal"),
+        # Time budget from receipt; past it the request fails with 504, close to it quality is lowered.
+        deadline_ms: float | None = Form(None),
+    ):
+        if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+        _require_ready(request.app.state.services)
+        deadline = time.monotonic() + deadline_ms / 1000 if deadline_ms is not None else None
 
+        trace = Trace("transcribe")
+        trace.fields["priority"] = priority
+        with trace.stage("upload_read"):
+            data = await file.read()
+        trace.fields["bytes"] = len(data)
         try:
             services: RuntimeServices = request.app.state.services
-            current_lang = services.current_config["whisper_lang"]
-            transcription, lang = services.transcribe_file(temp_path, language=current_lang)
-            return {"text": transcription, "language": lang}
+            inference: InferenceExecutor = request.app.state.inference
+            result = await inference.run(
+                _transcribe_upload,
+                services,
+                data,
+                language,
+                model,
+                trace,
+                trace.elapsed(),
+                deadline,
+                priority=priority,
+                deadline=deadline,
+            )
+            trace.fields["degradation"] = result.degradation
+            trace.mark("request_total")
+            trace.log()
+            return {"text": result.text, "language": result.language, "degradation": result.degradation}
+        except QueueFullError as e:
+            logger.warning("Transcription rejected: %s", e)
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        except DeadlineExceededError as e:
+            logger.warning("Transcription dropped: %s", e)
+            raise HTTPException(status_code=504, detail=str(e))
+        except (AudioDecodeError, UnknownModelError, UnknownPriorityError, UnsupportedLanguageError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             logger.exception("Transcription failed")
             raise HTTPException(status_code=500, detail=str(e))
+
+    @app.post("/transcribe/long")
+    async def transcribe_long_audio(
+        request: Request,
+        file: UploadFile = File(...),
+        language: str | None = Form(None),
+        model: str | None = Form(None),
+        priority: str = Form("normal"),
+    ):
+        if file.size is not None and file.size > MAX_LONG_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds {MAX_LONG_UPLOAD_BYTES} bytes")
+        _require_ready(request.app.state.services)
+        services: RuntimeServices = request.app.state.services
+        inference: InferenceExecutor = request.app.state.inference
+
+        trace = Trace("transcribe_long")
+        with trace.stage("upload_read"):
+            data = await file.read()
+        try:
+            with trace.stage("audio_decode"):
+                audio, bounds = await inference.run(_prepare_long_audio, data, priority=priority)
+            total_s = len(audio) / SAMPLE_RATE
+            # Checked before the 200 goes out, so a bad model or language is a 400 like on /transcribe.
+            await asyncio.to_thread(services.check_language, language, total_s, model)
+        except QueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        except (AudioDecodeError, UnknownModelError, UnknownPriorityError, UnsupportedLanguageError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        trace.fields.update({"audio_s": round(total_s, 1), "chunks": len(bounds)})
+        window = LONG_AUDIO_PARALLELISM or inference.workers
+
+        async def decode(start: int, end: int, lang: str | None):
+            # Chunks of one recording queue behind each other, so a full queue means waiting, not failing,
+            # up to LONG_AUDIO_QUEUE_WAIT_S and only while the client is still there to read the result.
+            give_up = time.monotonic() + LONG_AUDIO_QUEUE_WAIT_S
+            while True:
+                try:
+                    return await inference.run(
+                        services.transcribe_chunk,
+                        audio[start:end],
+                        start / SAMPLE_RATE,
+                        lang,
+                        model,
+                        total_s,
+                        priority=priority,
+                    )
+                except QueueFullError as e:
+                    if time.monotonic() + e.retry_after > give_up or await request.is_disconnected():
+                        raise
+                    await asyncio.sleep(e.retry_after)
+
+        async def events():
+            # Chunks decode concurrently but are emitted strictly in order, each as soon as it and
+            # every chunk before it are done. With "auto", the first chunk fixes the language.
+            lang = language
+            used = None
+            pending: list[asyncio.Task] = []
+            remaining = iter(bounds)
+            try:
+                while True:
+                    limit = 1 if lang == "auto" else window
+                    while len(pending) < limit and (chunk := next(remaining, None)) is not None:
+                        pending.append(asyncio.create_task(decode(*chunk, lang)))
+                    if not pending:
+                        break
+                    segments, detected = await pending.pop(0)
+                    used = used or detected
+                    if lang == "auto":
+                        lang = detected
+                    for start, end, text in segments:
+                        yield _ndjson({"type": "segment", "start": round(start, 2), "end": round(end, 2), "text": text})
+                trace.mark("request_total")
+                trace.log()
+                yield _ndjson({"type": "done", "language": used, "duration": round(total_s, 2), "chunks": len(bounds)})
+            except Exception as e:
+                logger.exception("Long transcription failed")
+                yield _ndjson({"type": "error", "detail": str(e)})
+            finally:
+                for task in pending:
+                    task.cancel()
+
+        return StreamingResponse(events(), media_type="application/x-ndjson")
+
+    async def _send_transcripts(websocket: WebSocket, session: StreamingTranscriber, inference: InferenceExecutor):
+        while session.final_ready:
+            try:
+                event = await inference.run(session.decode_final, priority="interactive")
+            except QueueFullError as e:
+                session.discard_final()
+                event = {"type": "error", "detail": str(e), "retry_after": e.retry_after}
+            except Exception as e:
+                # The utterance is lost, but the stream stays open for the next one.
+                logger.exception("Streaming final decode failed")
+                event = {"type": "error", "detail": str(e)}
+            if event is not None:
+                await websocket.send_json(event)
+
+        if session.partial_due:
+            try:
+                event = await inference.run(session.decode_partial, priority="interactive")
+            except QueueFullError:
+                # Partials are best effort; the next one (or the final) catches up.
+                return
+            except Exception as e:
+                logger.exception("Streaming partial decode failed")
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                return
+            if event is not None:
+                await websocket.send_json(event)
+
+    @app.websocket("/ws/transcribe")
+    async def transcribe_stream(websocket: WebSocket, language: str | None = None, model: str | None = None):
+        if not await _accept_when_ready(websocket):
+            return
+        services: RuntimeServices = websocket.app.state.services
+        inference: InferenceExecutor = websocket.app.state.inference
+        try:
+            # May load the model, so it runs off the event loop; a bad language fails here, not mid-stream.
+            await asyncio.to_thread(services.check_language, language, 0.0, model)
+        except (UnknownModelError, UnsupportedLanguageError) as e:
+            await websocket.send_json({"type": "error", "detail": str(e)})
+            await websocket.close(code=1008)
+            return
+        session = StreamingTranscriber(
+            functools.partial(services.transcribe_segments, model=model),
+            vad=make_vad(STREAM_VAD),
+            language=language or services.current_config["whisper_lang"],
+            min_silence_ms=STREAM_MIN_SILENCE_MS,
+            partial_interval_ms=STREAM_PARTIAL_INTERVAL_MS,
+        )
+
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+
+                if message.get("bytes"):
+                    for event in session.push_pcm16(message["bytes"]):
+                        await websocket.send_json(event)
+                elif message.get("text"):
+                    try:
+                        control = json.loads(message["text"])
+                    except json.JSONDecodeError:
+                        await websocket.send_json({"type": "error", "detail": "Control messages must be JSON"})
+                        continue
+                    if control.get("type") == "end":
+                        session.close()
+                        await _send_transcripts(websocket, session, inference)
+                        await websocket.send_json({"type": "done"})
+                        await websocket.close()
+                        return
+
+                await _send_transcripts(websocket, session, inference)
+        except WebSocketDisconnect:
+            logger.info("Streaming transcription client disconnected")
+
+    async def _converse_turn(
+        websocket: WebSocket, conversation: Conversation, user_text: str, output_format: AudioFormat
+    ) -> None:
+        services: RuntimeServices = websocket.app.state.services
+        ready: asyncio.Queue = asyncio.Queue()
+        trace = Trace("converse_turn", language=conversation.language)
+
+        cached = conversation.cached_reply(user_text, output_format)
+        trace.fields["response_cache"] = "hit" if cached is not None else "miss"
+
+        async def produce() -> None:
+            if cached is not None:
+                # Repeated utterance: the stored reply and audio skip both the LLM and Polly.
+                for sentence, audio in zip(cached.sentences, cached.audio):
+                    done = asyncio.get_running_loop().create_future()
+                    done.set_result(audio)
+                    ready.put_nowait((sentence, done))
+                ready.put_nowait(None)
+                return
+            # Synthesis starts as soon as a sentence is segmented, so later sentences are ready
+            # by the time the earlier ones have been sent.
+            try:
+                async for sentence in conversation.astream_reply(user_text, trace):
+                    task = asyncio.create_task(
+                        services.asynthesize_speech(sentence, conversation.language, output_format)
+                    )
+                    ready.put_nowait((sentence, task))
+            except Exception as e:
+                logger.exception("Conversation LLM stream failed")
+                ready.put_nowait(e)
+            ready.put_nowait(None)
+
+        producer = asyncio.create_task(produce())
+        spoken: list[str] = []
+        spoken_audio: list[bytes] = []
+        try:
+            while True:
+                item = await ready.get()
+                if item is None:
+                    if cached is None:
+                        conversation.remember(user_text, output_format, spoken, spoken_audio)
+                    break
+                if isinstance(item, Exception):
+                    await websocket.send_json({"type": "error", "detail": str(item)})
+                    break
+                sentence, task = item
+                audio = await task
+                await websocket.send_json({"type": "sentence", "index": len(spoken), "text": sentence})
+                await websocket.send_bytes(audio)
+                trace.mark_once("first_audio_sent")
+                spoken.append(sentence)
+                spoken_audio.append(audio)
+            await websocket.send_json({"type": "turn_end", "text": " ".join(spoken)})
+        except asyncio.CancelledError:
+            with suppress(Exception):
+                await websocket.send_json({"type": "turn_cancelled", "text": " ".join(spoken)})
+            raise
+        except Exception as e:
+            logger.exception("Conversation turn failed")
+            with suppress(Exception):
+                await websocket.send_json({"type": "error", "detail": str(e)})
+        finally:
+            producer.cancel()
+            with suppress(asyncio.CancelledError):
+                await producer
+            while not ready.empty():
+                item = ready.get_nowait()
+                if isinstance(item, tuple):
+                    item[1].cancel()
+            conversation.record(user_text, " ".join(spoken))
+            trace.fields["sentences"] = len(spoken)
+            trace.log()
+
+    @app.websocket("/ws/converse")
+    async def converse_stream(
+        websocket: WebSocket,
+        language: str | None = None,
+        format: str = "pcm",
+        sample_rate: int | None = None,
+        bitrate: int | None = None,
+    ):
+        if not await _accept_when_ready(websocket):
+            return
+        services: RuntimeServices = websocket.app.state.services
+        inference: InferenceExecutor = websocket.app.state.inference
+        target_lang = language or services.language
+        try:
+            output_format = AudioFormat.parse(format, sample_rate, bitrate)
+        except UnsupportedFormatError:
+            output_format = None
+        if target_lang not in services.voice_config or output_format is None:
+            await websocket.send_json({"type": "error", "detail": "Unsupported language or format"})
+            await websocket.close(code=1008)
+            return
+
+        conversation = Conversation(services, language=target_lang)
+        session = StreamingTranscriber(
+            services.transcribe_segments,
+            vad=make_vad(STREAM_VAD),
+            language=services.voice_config[target_lang]["whisper_lang"],
+            min_silence_ms=STREAM_MIN_SILENCE_MS,
+        )
+        turn: asyncio.Task | None = None
+
+        async def start_turn(user_text: str) -> None:
+            nonlocal turn
+            # A new user turn interrupts whatever reply is still being spoken.
+            await cancel_turn()
+            turn = asyncio.create_task(_converse_turn(websocket, conversation, user_text, output_format))
+
+        async def cancel_turn() -> None:
+            if turn is not None and not turn.done():
+                turn.cancel()
+                try:
+                    await turn
+                except asyncio.CancelledError:
+                    pass
+
+        async def handle_finals() -> None:
+            while session.final_ready:
+                try:
+                    event = await inference.run(session.decode_final, priority="interactive")
+                except QueueFullError as e:
+                    session.discard_final()
+                    await websocket.send_json({"type": "error", "detail": str(e), "retry_after": e.retry_after})
+                    continue
+                except Exception as e:
+                    logger.exception("Conversation transcription failed")
+                    await websocket.send_json({"type": "error", "detail": str(e)})
+                    continue
+                if event is not None:
+                    await websocket.send_json({**event, "type": "transcript"})
+                    await start_turn(event["text"])
+
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+
+                if message.get("bytes"):
+                    for event in session.push_pcm16(message["bytes"]):
+                        await websocket.send_json(event)
+                    await handle_finals()
+                elif message.get("text"):
+                    try:
+                        control = json.loads(message["text"])
+                    except json.JSONDecodeError:
+                        await websocket.send_json({"type": "error", "detail": "Control messages must be JSON"})
+                        continue
+                    if control.get("type") == "text" and control.get("text", "").strip():
+                        await start_turn(control["text"].strip())
+                    elif control.get("type") == "end":
+                        session.close()
+                        await handle_finals()
+                        if turn is not None:
+                            await turn
+                        await websocket.send_json({"type": "done"})
+                        await websocket.close()
+                        return
+        except WebSocketDisconnect:
+            logger.info("Conversation client disconnected")
         finally:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+            await cancel_turn()
 
     @app.post("/tts")
     async def text_to_speech(request: Request, payload: TTSRequest):
         services: RuntimeServices = request.app.state.services
+        _require_ready(services)
         target_lang = payload.language or services.language
-        output_format = payload.format
 
         if target_lang not in services.voice_config:
             raise HTTPException(
@@ -70,16 +525,26 @@ def create_app(services_factory: Callable[[], RuntimeServices] = RuntimeServices
                 detail=f"Language '{target_lang}' not supported. Options: {list(services.voice_config.keys())}",
             )
 
-        if output_format not in ALLOWED_TTS_FORMATS:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Format '{output_format}' not supported. Options: pcm, mp3, ogg_vorbis",
-            )
+        try:
+            output_format = AudioFormat.parse(payload.format, payload.sample_rate, payload.bitrate)
+        except UnsupportedFormatError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
         try:
-            logger.info("TTS request language=%s chars=%s format=%s", target_lang, len(payload.text), output_format)
-            audio_data = services.synthesize_speech(payload.text, target_lang, output_format)
-            return StreamingResponse(io.BytesIO(audio_data), media_type=MEDIA_TYPES[output_format])
+            logger.info("TTS request language=%s chars=%s format=%s", target_lang, len(payload.text), output_format.tag)
+            trace = Trace("tts", language=target_lang, chars=len(payload.text), format=output_format.tag)
+            chunks = services.astream_speech(payload.text, target_lang, output_format)
+            # Pull the first chunk before responding so synthesis failures still surface as a 500.
+            first_chunk = await anext(chunks, b"")
+            trace.mark("tts_first_chunk")
+            trace.log()
+
+            async def relay():
+                yield first_chunk
+                async for chunk in chunks:
+                    yield chunk
+
+            return StreamingResponse(relay(), media_type=output_format.media_type)
         except Exception as e:
             logger.exception("TTS failed")
             raise HTTPException(status_code=500, detail=str(e))
@@ -87,7 +552,57 @@ def create_app(services_factory: Callable[[], RuntimeServices] = RuntimeServices
     @app.get("/health")
     def health_check(request: Request):
         services: RuntimeServices = request.app.state.services
-        return {"status": "ok", "mode": services.language}
+        return {"status": "ok" if services.is_ready else "starting", "mode": services.language}
+
+    @app.get("/health/live")
+    def liveness(request: Request):
+        services: RuntimeServices = request.app.state.services
+        if services.load_error is not None:
+            return JSONResponse(status_code=503, content={"status": "failed", "detail": str(services.load_error)})
+        return {"status": "alive"}
+
+    @app.get("/health/ready")
+    def readiness(request: Request):
+        services: RuntimeServices = request.app.state.services
+        if not services.is_ready:
+            status = "failed" if services.load_error is not None else "starting"
+            return JSONResponse(
+                status_code=503,
+                content={"status": status, "detail": _not_ready_detail(services)},
+                headers={"Retry-After": str(STARTUP_RETRY_AFTER)},
+            )
+        return {"status": "ready", "startup": services.startup_timings}
+
+    @app.get("/metrics")
+    def metrics():
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/stats")
+    def stats(request: Request):
+        services: RuntimeServices = request.app.state.services
+        inference: InferenceExecutor = request.app.state.inference
+        payload = {"inference": inference.stats()}
+        batcher = getattr(services, "batcher", None)
+        if batcher is not None:
+            payload["batching"] = batcher.stats()
+        tts_cache = getattr(services, "tts_cache", None)
+        if tts_cache is not None:
+            payload["tts_cache"] = tts_cache.stats()
+        response_cache = getattr(services, "response_cache", None)
+        if response_cache is not None:
+            payload["response_cache"] = response_cache.stats()
+        local_tts = getattr(services, "local_tts", None)
+        if local_tts:
+            payload["local_tts"] = {
+                "voices": {language: engine.name for language, engine in local_tts.items()},
+                "fallbacks": services.tts_fallbacks,
+            }
+        models = getattr(services, "models", None)
+        if models is not None:
+            payload["whisper_models"] = models.stats()
+        if isinstance(getattr(services, "whisper_model", None), WhisperProcessPool):
+            payload["whisper_pool"] = services.whisper_model.stats()
+        return payload
 
     return app
 
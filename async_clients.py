@@ -0,0 +1,227 @@
+import asyncio
+import json
+import logging
+import random
+import threading
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import Any, AsyncIterator
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+BACKOFF_BASE_S = 0.1
+BACKOFF_MAX_S = 2.0
+
+
+def make_timeout(config) -> httpx.Timeout:
+    return httpx.Timeout(
+        config.http_read_timeout_s,
+        connect=config.http_connect_timeout_s,
+        pool=config.http_pool_timeout_s,
+    )
+
+
+def make_http_client(config) -> httpx.AsyncClient:
+    # One pool per upstream: idle connections stay open for `http_keepalive_expiry_s`, so bursts
+    # reuse warm TLS sessions instead of handshaking per request.
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=config.http_max_connections,
+            max_keepalive_connections=config.http_max_keepalive,
+            keepalive_expiry=config.http_keepalive_expiry_s,
+        ),
+        timeout=make_timeout(config),
+    )
+
+
+def make_async_openai(openai_module, config):
+    # The SDK sends its own per-request timeout, so it has to be given the same one as the pool.
+    return openai_module.AsyncOpenAI(
+        http_client=make_http_client(config),
+        timeout=make_timeout(config),
+        max_retries=config.http_max_retries,
+    )
+
+
+def make_async_polly(session, config) -> "AsyncPolly":
+    return AsyncPolly(
+        session,
+        config.aws_region,
+        make_http_client(config),
+        max_retries=config.http_max_retries,
+        budget=RetryBudget(ratio=config.http_retry_budget),
+    )
+
+
+class PollyError(RuntimeError):
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(f"Polly {status} {code}: {message}")
+        self.status = status
+        self.code = code
+
+
+class RetryBudget:
+    # Token bucket shared by every request of a client: each first attempt adds `ratio` tokens and
+    # each retry spends one, so retries stay a bounded fraction of traffic instead of multiplying
+    # the load on a backend that is already failing.
+    def __init__(self, ratio: float = 0.2, min_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = min_tokens
+        self._tokens = min_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+def backoff(attempt: int) -> float:
+    return random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2**attempt))
+
+
+class AsyncPolly:
+    # SynthesizeSpeech over a pooled httpx.AsyncClient instead of boto3, so hundreds of requests can
+    # be in flight without a thread each. Requests are SigV4-signed with botocore using the boto3
+    # session's credential chain (env, profile, instance role), resolved on first use.
+    def __init__(
+        self,
+        session,
+        region: str,
+        http_client: httpx.AsyncClient,
+        max_retries: int = 2,
+        budget: RetryBudget | None = None,
+    ):
+        self.session = session
+        self.region = region
+        self.url = f"https://polly.{region}.amazonaws.com/v1/speech"
+        self.http_client = http_client
+        self.max_retries = max_retries
+        self.budget = budget or RetryBudget()
+        self._credentials = None
+
+    def _signed_headers(self, body: bytes) -> dict:
+        from botocore.auth import SigV4Auth
+        from botocore.awsrequest import AWSRequest
+        from botocore.exceptions import NoCredentialsError
+
+        if self._credentials is None:
+            self._credentials = self.session.get_credentials()
+            if self._credentials is None:
+                raise NoCredentialsError()
+        request = AWSRequest(method="POST", url=self.url, data=body, headers={"Content-Type": "application/json"})
+        SigV4Auth(self._credentials.get_frozen_credentials(), "polly", self.region).add_auth(request)
+        return dict(request.headers.items())
+
+    @staticmethod
+    def _error(response: httpx.Response) -> PollyError:
+        try:
+            detail = response.json()
+        except ValueError:
+            detail = {}
+        code = response.headers.get("x-amzn-ErrorType", "").split(":")[0] or "Error"
+        return PollyError(response.status_code, code, detail.get("message") or detail.get("Message") or response.text)
+
+    @asynccontextmanager
+    async def _open(self, params: dict) -> AsyncIterator[httpx.Response]:
+        # Only the request and its status are retried; once audio has started flowing, a failure
+        # surfaces to the caller, who may already have relayed part of it.
+        body = json.dumps(params).encode()
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                request = self.http_client.build_request("POST", self.url, content=body, headers=self._signed_headers(body))
+                response = await self.http_client.send(request, stream=True)
+            except httpx.TransportError as e:
+                error: Exception = e
+            else:
+                if response.status_code == 200:
+                    try:
+                        yield response
+                    finally:
+                        await response.aclose()
+                    return
+                await response.aread()
+                await response.aclose()
+                error = self._error(response)
+                if response.status_code not in RETRYABLE_STATUS:
+                    raise error
+            if attempt >= self.max_retries or not self.budget.withdraw():
+                raise error
+            logger.warning("Polly request failed (%s); retry %d/%d", error, attempt + 1, self.max_retries)
+            await asyncio.sleep(backoff(attempt))
+            attempt += 1
+
+    async def stream(self, params: dict, chunk_bytes: int) -> AsyncIterator[bytes]:
+        async with self._open(params) as response:
+            async for chunk in response.aiter_bytes(chunk_bytes):
+                yield chunk
+
+    async def aclose(self) -> None:
+        await self.http_client.aclose()
+
+
+class ThreadedPolly:
+    # Async facade over a blocking boto3-style client (injected stand-ins), run on worker threads.
+    def __init__(self, client):
+        self.client = client
+
+    async def stream(self, params: dict, chunk_bytes: int) -> AsyncIterator[bytes]:
+        response = await asyncio.to_thread(lambda: self.client.synthesize_speech(**params))
+        chunks = response["AudioStream"].iter_chunks(chunk_bytes)
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    async def aclose(self) -> None:
+        pass
+
+
+class _ThreadedStream:
+    def __init__(self, stream):
+        self._stream = iter(stream)
+        self._source = stream
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Any:
+        chunk = await asyncio.to_thread(next, self._stream, None)
+        if chunk is None:
+            raise StopAsyncIteration
+        return chunk
+
+    async def close(self) -> None:
+        close = getattr(self._source, "close", None)
+        if close is not None:
+            close()
+
+
+class _ThreadedCompletions:
+    def __init__(self, client):
+        self.client = client
+
+    async def create(self, **kwargs) -> _ThreadedStream:
+        return _ThreadedStream(await asyncio.to_thread(lambda: self.client.chat.completions.create(**kwargs)))
+
+
+class ThreadedOpenAI:
+    # Same idea for a blocking OpenAI-style client: exposes `await chat.completions.create(...)`
+    # returning an async iterator of chunks, like AsyncOpenAI.
+    def __init__(self, client):
+        self.chat = SimpleNamespace(completions=_ThreadedCompletions(client))
+
+    async def close(self) -> None:
+        pass
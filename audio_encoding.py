@@ -0,0 +1,203 @@
+import struct
+from dataclasses import dataclass
+
+import numpy as np
+
+# Formats Polly produces itself, and formats encoded here from Polly PCM.
+POLLY_FORMATS = {"pcm", "mp3", "ogg_vorbis"}
+ENCODED_FORMATS = {"wav", "opus"}
+OUTPUT_FORMATS = POLLY_FORMATS | ENCODED_FORMATS
+
+MEDIA_TYPES = {
+    "pcm": "application/octet-stream",
+    "mp3": "audio/mpeg",
+    "ogg_vorbis": "audio/ogg",
+    "wav": "audio/wav",
+    "opus": "audio/ogg",
+}
+SAMPLE_RATES = {
+    "pcm": (8000, 16000),
+    "wav": (8000, 16000),
+    "mp3": (8000, 16000, 22050, 24000),
+    "ogg_vorbis": (8000, 16000, 22050, 24000),
+    "opus": (8000, 12000, 16000, 24000, 48000),
+}
+DEFAULT_SAMPLE_RATE = 16000
+DEFAULT_OPUS_BITRATE = 24000
+OPUS_BITRATE_RANGE = (6000, 510000)
+# Placeholder RIFF/data sizes for WAV streamed before its length is known.
+WAV_UNKNOWN_SIZE = 0xFFFFFFFF
+
+
+class UnsupportedFormatError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    name: str
+    sample_rate: int = DEFAULT_SAMPLE_RATE
+    # Bits per second; only Opus output is encoded at a selectable bitrate.
+    bitrate: int | None = None
+
+    @classmethod
+    def of(cls, value: "str | AudioFormat") -> "AudioFormat":
+        if isinstance(value, cls):
+            return value
+        return cls(value, bitrate=DEFAULT_OPUS_BITRATE if value == "opus" else None)
+
+    @classmethod
+    def parse(cls, name: str, sample_rate: int | None = None, bitrate: int | None = None) -> "AudioFormat":
+        if name not in OUTPUT_FORMATS:
+            options = ", ".join(sorted(OUTPUT_FORMATS))
+            raise UnsupportedFormatError(f"Format '{name}' not supported. Options: {options}")
+        sample_rate = sample_rate or DEFAULT_SAMPLE_RATE
+        if sample_rate not in SAMPLE_RATES[name]:
+            raise UnsupportedFormatError(
+                f"Sample rate {sample_rate} not supported for '{name}'. Options: {list(SAMPLE_RATES[name])}"
+            )
+        if name != "opus":
+            if bitrate is not None:
+                raise UnsupportedFormatError(f"Bitrate can only be selected for 'opus', not '{name}'")
+            return cls(name, sample_rate)
+        bitrate = bitrate or DEFAULT_OPUS_BITRATE
+        low, high = OPUS_BITRATE_RANGE
+        if not low <= bitrate <= high:
+            raise UnsupportedFormatError(f"Opus bitrate must be between {low} and {high} bits per second")
+        return cls(name, sample_rate, bitrate)
+
+    @property
+    def encoded(self) -> bool:
+        return self.name in ENCODED_FORMATS
+
+    @property
+    def polly_format(self) -> str:
+        return "pcm" if self.encoded else self.name
+
+    @property
+    def polly_rate(self) -> int:
+        # Opus is resampled by the encoder, so Polly always produces 16 kHz for it.
+        return DEFAULT_SAMPLE_RATE if self.name == "opus" else self.sample_rate
+
+    @property
+    def source(self) -> "AudioFormat":
+        # The Polly output an encoded format is produced from.
+        return AudioFormat("pcm", self.polly_rate)
+
+    @property
+    def tag(self) -> str:
+        return f"{self.name}/{self.bitrate}" if self.bitrate else self.name
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES[self.name]
+
+
+def wav_header(sample_rate: int, data_bytes: int | None = None) -> bytes:
+    data_size = WAV_UNKNOWN_SIZE if data_bytes is None else data_bytes
+    riff_size = WAV_UNKNOWN_SIZE if data_bytes is None else 36 + data_bytes
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        riff_size,
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,
+        1,
+        sample_rate,
+        sample_rate * 2,
+        2,
+        16,
+        b"data",
+        data_size,
+    )
+
+
+class WavEncoder:
+    # 16-bit mono PCM behind a RIFF header. The length is unknown while streaming, so the header
+    # carries placeholder sizes; finalize() writes the real ones for cached copies.
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self._started = False
+
+    def encode(self, pcm: bytes) -> bytes:
+        if self._started:
+            return pcm
+        self._started = True
+        return wav_header(self.sample_rate) + pcm
+
+    def flush(self) -> bytes:
+        return b"" if self._started else wav_header(self.sample_rate, 0)
+
+
+class _Sink:
+    # Write-only, non-seekable target, so the muxer emits pages strictly in order.
+    def __init__(self):
+        self.parts: list[bytes] = []
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+class OpusEncoder:
+    # 16-bit mono PCM in, Ogg/Opus out, chunk by chunk. PyAV buffers input into whole Opus frames
+    # and resamples it to the output rate; each call returns whatever pages are complete so far.
+    def __init__(self, input_rate: int, output_rate: int, bitrate: int):
+        import av
+
+        self._av = av
+        self.input_rate = input_rate
+        self._sink = _Sink()
+        # Short Ogg pages so audio leaves the muxer every ~100 ms rather than once a second.
+        self._container = av.open(self._sink, mode="w", format="ogg", options={"page_duration": "100000"})
+        self._stream = self._container.add_stream("libopus", rate=output_rate)
+        self._stream.codec_context.layout = "mono"
+        self._stream.codec_context.bit_rate = bitrate
+        self._carry = b""
+
+    def encode(self, pcm: bytes) -> bytes:
+        pcm = self._carry + pcm
+        usable = len(pcm) & ~1
+        self._carry = pcm[usable:]
+        if usable:
+            samples = np.frombuffer(pcm, dtype="<i2", count=usable // 2)
+            frame = self._av.AudioFrame.from_ndarray(samples.reshape(1, -1), format="s16", layout="mono")
+            frame.sample_rate = self.input_rate
+            self._mux(frame)
+        return self._sink.take()
+
+    def flush(self) -> bytes:
+        self._mux(None)
+        self._container.close()
+        return self._sink.take()
+
+    def _mux(self, frame) -> None:
+        for packet in self._stream.encode(frame):
+            self._container.mux(packet)
+
+
+def make_encoder(fmt: AudioFormat) -> WavEncoder | OpusEncoder:
+    if fmt.name == "wav":
+        return WavEncoder(fmt.sample_rate)
+    if fmt.name == "opus":
+        return OpusEncoder(fmt.polly_rate, fmt.sample_rate, fmt.bitrate or DEFAULT_OPUS_BITRATE)
+    raise UnsupportedFormatError(f"Format '{fmt.name}' is passed through from Polly, not encoded")
+
+
+def finalize(fmt: AudioFormat, data: bytes) -> bytes:
+    # Streamed WAV carries placeholder sizes; a complete copy (cache, whole-file response) gets real ones.
+    if fmt.name == "wav" and len(data) >= 44:
+        return wav_header(fmt.sample_rate, len(data) - 44) + data[44:]
+    return data
+
+
+def encode_all(pcm: bytes, fmt: AudioFormat) -> bytes:
+    encoder = make_encoder(fmt)
+    return finalize(fmt, encoder.encode(pcm) + encoder.flush())
@@ -0,0 +1,178 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from audio_encoding import AudioFormat, encode_all
+from audio_io import SAMPLE_RATE, decode_audio_bytes
+from conversation import Conversation
+from metrics import Trace
+from voice_runtime import RuntimeServices
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".ogg", ".opus", ".flac", ".m4a", ".webm"}
+FILE_EXTENSIONS = {"wav": ".wav", "opus": ".ogg", "pcm": ".pcm"}
+TRANSCRIPT_FILE = "transcript.jsonl"
+
+
+@dataclass
+class Utterance:
+    id: str
+    path: str
+    language: str | None = None
+
+
+def load_utterances(source: str) -> list[Utterance]:
+    # A directory of audio files, a JSONL manifest ({"audio": path, "id"?, "language"?} per line)
+    # or a text file with one path per line. Manifest paths are relative to the manifest.
+    if os.path.isdir(source):
+        names = sorted(name for name in os.listdir(source) if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS)
+        utterances = [Utterance(os.path.splitext(name)[0], os.path.join(source, name)) for name in names]
+    else:
+        base = os.path.dirname(os.path.abspath(source))
+        utterances = []
+        with open(source, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                entry = json.loads(line) if source.endswith(".jsonl") else {"audio": line}
+                path = os.path.join(base, entry["audio"])
+                utterance_id = entry.get("id") or os.path.splitext(os.path.basename(path))[0]
+                utterances.append(Utterance(str(utterance_id), path, entry.get("language")))
+
+    seen: set[str] = set()
+    for utterance in utterances:
+        if utterance.id in seen:
+            raise ValueError(f"Duplicate utterance id '{utterance.id}' in {source}")
+        seen.add(utterance.id)
+    return utterances
+
+
+@dataclass
+class _Job:
+    utterance: Utterance
+    trace: Trace
+    record: dict
+    handed_off: float = 0.0
+    sentences: list[str] = field(default_factory=list)
+    done: Future = field(default_factory=Future)
+
+
+class BatchPipeline:
+    # Headless STT -> LLM -> TTS over recorded utterances. Each stage has its own pool and hands a
+    # job to the next one when it finishes, so Whisper keeps transcribing later files while
+    # earlier ones wait on the LLM or Polly. Utterances are independent: no shared history.
+    def __init__(
+        self,
+        services: RuntimeServices,
+        output_dir: str,
+        output_format: str = "wav",
+        stt_workers: int = 1,
+        llm_workers: int = 4,
+        tts_workers: int = 4,
+    ):
+        self.services = services
+        self.output_dir = output_dir
+        self.format = AudioFormat.parse(output_format)
+        if self.format.polly_format != "pcm":
+            raise ValueError(f"Batch output must be one of {sorted(FILE_EXTENSIONS)}, not '{output_format}'")
+        self.stt_pool = ThreadPoolExecutor(max_workers=max(1, stt_workers), thread_name_prefix="batch-stt")
+        self.llm_pool = ThreadPoolExecutor(max_workers=max(1, llm_workers), thread_name_prefix="batch-llm")
+        self.tts_pool = ThreadPoolExecutor(max_workers=max(1, tts_workers), thread_name_prefix="batch-tts")
+
+    def _hand_off(self, job: _Job, pool: ThreadPoolExecutor, stage) -> None:
+        job.handed_off = job.trace.elapsed()
+        pool.submit(self._run_stage, job, stage)
+
+    @staticmethod
+    def _finish(job: _Job) -> None:
+        job.trace.mark("turn_total")
+        job.done.set_result(job)
+
+    def _run_stage(self, job: _Job, stage) -> None:
+        job.trace.mark(f"{stage.__name__.strip('_')}_wait", job.trace.elapsed() - job.handed_off)
+        try:
+            stage(job)
+        except Exception as e:
+            logger.warning("Utterance %s failed in %s: %s", job.utterance.id, stage.__name__.strip("_"), e)
+            job.record["error"] = f"{type(e).__name__}: {e}"
+            self._finish(job)
+
+    def _language(self, job: _Job) -> str:
+        language = job.utterance.language or self.services.language
+        if language not in self.services.voice_config:
+            raise ValueError(f"Language '{language}' not supported. Options: {list(self.services.voice_config)}")
+        return language
+
+    def _stt(self, job: _Job) -> None:
+        language = self._language(job)
+        with job.trace.stage("audio_decode"):
+            with open(job.utterance.path, "rb") as f:
+                audio = decode_audio_bytes(f.read())
+        job.record["audio_s"] = round(len(audio) / SAMPLE_RATE, 2)
+        with job.trace.stage("stt"):
+            result = self.services.transcribe(audio, language=self.services.voice_config[language]["whisper_lang"])
+        job.record["transcript"] = result.text.strip()
+        if not job.record["transcript"]:
+            job.record["reply"] = ""
+            self._finish(job)
+            return
+        self._hand_off(job, self.llm_pool, self._llm)
+
+    def _llm(self, job: _Job) -> None:
+        conversation = Conversation(self.services, language=self._language(job))
+        job.sentences = [s for s in conversation.stream_reply(job.record["transcript"], trace=job.trace) if s.strip()]
+        job.record["reply"] = " ".join(job.sentences)
+        self._hand_off(job, self.tts_pool, self._tts)
+
+    def _tts(self, job: _Job) -> None:
+        language = self._language(job)
+        with job.trace.stage("tts"):
+            pcm = b"".join(self.services.synthesize_speech(s, language, self.format.source) for s in job.sentences)
+            audio = pcm if self.format.name == "pcm" else encode_all(pcm, self.format)
+        path = os.path.join(self.output_dir, job.utterance.id + FILE_EXTENSIONS[self.format.name])
+        with open(path, "wb") as f:
+            f.write(audio)
+        job.record["output"] = path
+        job.record["reply_s"] = round(len(pcm) / 2 / self.format.source.sample_rate, 2)
+        self._finish(job)
+
+    def run(self, utterances: list[Utterance]) -> dict:
+        os.makedirs(self.output_dir, exist_ok=True)
+        started = time.perf_counter()
+        jobs = []
+        for utterance in utterances:
+            job = _Job(utterance, Trace("batch", id=utterance.id), {"id": utterance.id, "input": utterance.path})
+            self._hand_off(job, self.stt_pool, self._stt)
+            jobs.append(job)
+
+        # Records are written in input order, so two runs over the same inputs diff line by line.
+        failed = 0
+        with open(os.path.join(self.output_dir, TRANSCRIPT_FILE), "w", encoding="utf-8") as out:
+            for job in jobs:
+                job.done.result()
+                job.trace.log()
+                record = {
+                    **job.record,
+                    "total_ms": round(job.trace.stages["turn_total"] * 1000, 1),
+                    "stages_ms": {stage: round(s * 1000, 1) for stage, s in job.trace.stages.items()},
+                }
+                failed += "error" in record
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+
+        elapsed = time.perf_counter() - started
+        return {
+            "utterances": len(jobs),
+            "failed": failed,
+            "elapsed_s": round(elapsed, 2),
+            "per_second": round(len(jobs) / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+    def close(self) -> None:
+        for pool in (self.stt_pool, self.llm_pool, self.tts_pool):
+            pool.shutdown()
@@ -0,0 +1,184 @@
+import bisect
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+# Whisper decodes fixed 30 s windows; every clip handed to the batched pipeline must fit in one.
+CHUNK_SAMPLES = 30 * SAMPLE_RATE
+
+
+@dataclass
+class _Pending:
+    audio: np.ndarray
+    language: str | None
+    future: Future = field(default_factory=Future)
+
+
+class TranscriptionBatcher:
+    def __init__(self, model, max_batch_size: int = 8, max_wait_ms: float = 10.0, pipeline=None):
+        if pipeline is None:
+            from faster_whisper import BatchedInferencePipeline
+
+            pipeline = BatchedInferencePipeline(model)
+
+        self.model = model
+        self.pipeline = pipeline
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: queue.Queue[_Pending | None] = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name="whisper-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, audio: np.ndarray, language: str | None) -> Future:
+        pending = _Pending(audio=audio, language=language)
+        if self._closed:
+            pending.future.set_exception(RuntimeError("Transcription batcher is closed"))
+        else:
+            self._queue.put(pending)
+        return pending.future
+
+    def transcribe(self, audio: np.ndarray, language: str | None) -> tuple[str, str]:
+        return self.submit(audio, language).result()
+
+    def close(self) -> None:
+        # Requests queued before the close are still decoded; any that raced in after it fail.
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                item.future.set_exception(RuntimeError("Transcription batcher is closed"))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "batches": self._batches,
+                "requests": self._requests,
+                "avg_batch_size": round(self._requests / self._batches, 2) if self._batches else 0.0,
+            }
+
+    def _collect(self, first: _Pending) -> tuple[list[_Pending], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _loop(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, stopping = self._collect(first)
+
+            groups: dict[str | None, list[_Pending]] = {}
+            for item in batch:
+                if item.language is None:
+                    # Language detection runs once per pipeline call, so auto-detect requests go alone.
+                    self._run_group([item], None)
+                else:
+                    groups.setdefault(item.language, []).append(item)
+            for language, items in groups.items():
+                self._run_group(items, language)
+
+            with self._lock:
+                self._batches += 1
+                self._requests += len(batch)
+
+    def _run_group(self, items: list[_Pending], language: str | None) -> None:
+        try:
+            if len(items) == 1:
+                results = [self._transcribe_single(items[0].audio, language)]
+            else:
+                results = self._transcribe_batch(items, language)
+        except Exception as e:
+            logger.exception("Batched transcription failed")
+            for item in items:
+                item.future.set_exception(e)
+            return
+
+        for item, result in zip(items, results):
+            item.future.set_result(result)
+
+    def _transcribe_single(self, audio: np.ndarray, language: str | None) -> tuple[str, str]:
+        segments, info = self.model.transcribe(
+            audio,
+            language=language,
+            vad_filter=True,
+            beam_size=1,
+            temperature=0.0,
+        )
+        return " ".join(seg.text for seg in segments), info.language
+
+    def _speech_windows(self, audio: np.ndarray) -> list[tuple[int, int]]:
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+        speech = get_speech_timestamps(audio, VadOptions(max_speech_duration_s=30, min_silence_duration_ms=160))
+        windows: list[list[int]] = []
+        for ts in speech:
+            if windows and ts["end"] - windows[-1][0] <= CHUNK_SAMPLES:
+                windows[-1][1] = ts["end"]
+            else:
+                windows.append([ts["start"], ts["end"]])
+        return [(start, end) for start, end in windows]
+
+    def _transcribe_batch(self, items: list[_Pending], language: str) -> list[tuple[str, str]]:
+        # Requests are laid end to end in one buffer and each speech window becomes a clip, so
+        # the pipeline decodes clips from different callers in the same encoder/decoder pass.
+        clip_starts: list[int] = []
+        clip_owners: list[int] = []
+        clip_timestamps: list[dict] = []
+        offset = 0
+        for owner, item in enumerate(items):
+            for start, end in self._speech_windows(item.audio):
+                clip_starts.append(offset + start)
+                clip_owners.append(owner)
+                clip_timestamps.append({"start": (offset + start) / SAMPLE_RATE, "end": (offset + end) / SAMPLE_RATE})
+            offset += len(item.audio)
+
+        texts: list[list[str]] = [[] for _ in items]
+        if clip_timestamps:
+            segments, _ = self.pipeline.transcribe(
+                np.concatenate([item.audio for item in items]),
+                language=language,
+                clip_timestamps=clip_timestamps,
+                vad_filter=False,
+                beam_size=1,
+                temperature=0.0,
+                batch_size=self.max_batch_size,
+            )
+            for seg in segments:
+                # Segment times are offsets into the joined buffer; map each back to its clip.
+                clip = max(0, bisect.bisect_right(clip_starts, (seg.start + 1e-3) * SAMPLE_RATE) - 1)
+                texts[clip_owners[clip]].append(seg.text)
+
+        return [(" ".join(parts), language) for parts in texts]
@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_segmentation import StreamingSegmenter, extract_complete_sentences  # noqa: E402
+
+PROSE = (
+    "Claro, posso ajudar com isso. O Dr. Silva atende às 9.30 de segunda a sexta, e a consulta "
+    "custa cerca de 150 reais. Você prefere marcar para esta semana ou para a próxima? "
+)
+# Lists and code blocks arrive without sentence boundaries, which is the rescanning worst case.
+RUN_ON = "item um, item dois, item três e mais um item "
+
+
+def tokens(text: str, size: int = 4) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def rescanning(stream: list[str]) -> list[str]:
+    sentences: list[str] = []
+    buffer = ""
+    for token in stream:
+        buffer += token
+        ready, buffer = extract_complete_sentences(buffer)
+        sentences += ready
+    if buffer.strip():
+        sentences.append(buffer.strip())
+    return sentences
+
+
+def incremental(stream: list[str]) -> list[str]:
+    segmenter = StreamingSegmenter()
+    sentences: list[str] = []
+    for token in stream:
+        sentences += segmenter.feed(token)
+    return sentences + segmenter.flush()
+
+
+def best_of(fn, stream: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(stream)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare streaming sentence segmenters on token streams")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 4_000, 16_000], help="Reply lengths in characters")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'text':<8} {'chars':>7} {'rescan ms':>10} {'stream ms':>10} {'speedup':>8}")
+    for name, unit in (("prose", PROSE), ("run-on", RUN_ON)):
+        for size in args.sizes:
+            stream = tokens((unit * (size // len(unit) + 1))[:size])
+            assert rescanning(stream) == incremental(stream)
+            old = best_of(rescanning, stream, args.repeat)
+            new = best_of(incremental, stream, args.repeat)
+            print(f"{name:<8} {size:>7} {old * 1000:>10.2f} {new * 1000:>10.2f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
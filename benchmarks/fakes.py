@@ -0,0 +1,132 @@
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from playback import SAMPLE_RATE, SpeechPlayer
+
+REPLY = (
+    "Claro, posso ajudar com isso. A consulta pode ser marcada para amanhã de manhã ou à tarde. "
+    "Você prefere algum horário específico? Se quiser, também envio um lembrete por mensagem."
+)
+
+
+class Latency:
+    # Base delay plus uniform jitter, drawn from a seeded generator so runs are comparable.
+    def __init__(self, base_ms: float, jitter_ms: float = 0.0, seed: int = 0):
+        self.base = base_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            return self.base + self._random.uniform(0, self.jitter)
+
+    def sleep(self) -> None:
+        delay = self.sample()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class FakeAudioStream:
+    def __init__(self, data: bytes, chunk_latency: Latency):
+        self.data = data
+        self.chunk_latency = chunk_latency
+
+    def read(self) -> bytes:
+        for _ in self.iter_chunks(4096):
+            pass
+        return self.data
+
+    def iter_chunks(self, chunk_size: int):
+        for start in range(0, len(self.data), chunk_size):
+            self.chunk_latency.sleep()
+            yield self.data[start : start + chunk_size]
+
+
+class FakePolly:
+    # Answers with silent 16 kHz PCM whose length follows the text (~15 characters per second of
+    # speech), after a first-byte delay and a per-chunk streaming delay.
+    def __init__(self, first_byte: Latency, chunk: Latency, chars_per_second: float = 15.0):
+        self.first_byte = first_byte
+        self.chunk = chunk
+        self.chars_per_second = chars_per_second
+
+    def synthesize_speech(self, Text: str, **kwargs):
+        self.first_byte.sleep()
+        samples = int(len(Text) / self.chars_per_second * SAMPLE_RATE)
+        return {"AudioStream": FakeAudioStream(bytes(samples * 2), self.chunk)}
+
+
+class FakeCompletions:
+    def __init__(self, first_token: Latency, token: Latency, reply: str = REPLY, token_chars: int = 4):
+        self.first_token = first_token
+        self.token = token
+        self.reply = reply
+        self.token_chars = token_chars
+
+    def create(self, model, messages, stream=True, **kwargs):
+        self.first_token.sleep()
+        for start in range(0, len(self.reply), self.token_chars):
+            if start:
+                self.token.sleep()
+            delta = SimpleNamespace(content=self.reply[start : start + self.token_chars])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+class FakeOpenAI:
+    def __init__(self, first_token: Latency, token: Latency):
+        self.chat = SimpleNamespace(completions=FakeCompletions(first_token, token))
+
+
+class FakeWhisperModel:
+    # Costs a fixed overhead plus `realtime_factor` seconds per second of audio. Sleeping releases
+    # the GIL the way CTranslate2 does, so concurrency behaves like the real model; `lock`
+    # serializes decodes like a single GPU/CPU model instance.
+    def __init__(self, overhead: Latency, realtime_factor: float = 0.1, text: str = "ola mundo"):
+        self.overhead = overhead
+        self.realtime_factor = realtime_factor
+        self.text = text
+        self.lock = threading.Lock()
+
+    def transcribe(self, audio, language=None, **kwargs):
+        duration = len(audio) / SAMPLE_RATE
+        with self.lock:
+            time.sleep(self.overhead.sample() + duration * self.realtime_factor)
+        segments = [SimpleNamespace(start=0.0, end=duration, text=f" {self.text}", avg_logprob=-0.3)]
+        return iter(segments), SimpleNamespace(duration=duration, language=language)
+
+
+def make_fake_whisper_model(overhead_ms: float, jitter_ms: float, seed: int, realtime_factor: float):
+    # Picklable factory so worker-pool replicas can build their own fake in the child process.
+    return FakeWhisperModel(Latency(overhead_ms, jitter_ms, seed), realtime_factor=realtime_factor)
+
+
+class SimulatedPlayer(SpeechPlayer):
+    # Consumes the ring buffer from a thread at `speed` times real time instead of opening an
+    # output device.
+    def __init__(self, speed: float = 20.0, **kwargs):
+        super().__init__(**kwargs)
+        self.speed = speed
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._consume, name="simulated-playback", daemon=True)
+        self._thread.start()
+
+    def _consume(self) -> None:
+        block = np.zeros(self.blocksize, dtype=np.int16)
+        interval = self.blocksize / SAMPLE_RATE / self.speed
+        while not self._stopped.wait(interval):
+            self.ring.read_into(block)
+
+    def close(self) -> None:
+        self._stopped.set()
+        self.ring.close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
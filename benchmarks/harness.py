@@ -0,0 +1,323 @@
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+import wave
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+
+from api import create_app  # noqa: E402
+from benchmarks.fakes import (  # noqa: E402
+    FakeOpenAI,
+    FakePolly,
+    FakeWhisperModel,
+    Latency,
+    SimulatedPlayer,
+    make_fake_whisper_model,
+)
+from inference import InferenceExecutor  # noqa: E402
+from main import VoiceAgent  # noqa: E402
+from voice_runtime import RuntimeConfig, RuntimeServices  # noqa: E402
+from whisper_pool import WhisperProcessPool  # noqa: E402
+
+SCENARIOS = ("transcribe", "tts", "agent")
+TTS_TEXT = (
+    "Olá! Obrigado por entrar em contato. Sua consulta está confirmada para amanhã às dez horas. "
+    "Se precisar remarcar, é só responder esta mensagem."
+)
+
+
+def build_services(args) -> RuntimeServices:
+    config = RuntimeConfig(
+        llm_model="bench",
+        whisper_size=args.whisper_model or "fake",
+        whisper_device="cpu",
+        whisper_compute_type="int8",
+        aws_region="us-east-1",
+        language="pt",
+        tts_cache_max_bytes=args.tts_cache_bytes,
+        whisper_replicas=args.whisper_replicas,
+        whisper_cpu_threads=args.whisper_cpu_threads,
+    )
+    whisper_model = None
+    if not args.whisper_model and args.whisper_replicas > 0:
+        whisper_model = WhisperProcessPool(
+            {
+                "overhead_ms": args.whisper_overhead_ms,
+                "jitter_ms": args.whisper_jitter_ms,
+                "seed": args.seed,
+                "realtime_factor": args.whisper_rtf,
+            },
+            args.whisper_replicas,
+            factory=make_fake_whisper_model,
+        )
+    elif not args.whisper_model:
+        whisper_model = FakeWhisperModel(
+            Latency(args.whisper_overhead_ms, args.whisper_jitter_ms, args.seed), realtime_factor=args.whisper_rtf
+        )
+    return RuntimeServices(
+        config,
+        openai_client=FakeOpenAI(
+            Latency(args.llm_first_token_ms, args.llm_jitter_ms, args.seed + 1),
+            Latency(args.llm_token_ms, 0, args.seed + 2),
+        ),
+        polly_client=FakePolly(
+            Latency(args.polly_ms, args.polly_jitter_ms, args.seed + 3),
+            Latency(args.polly_chunk_ms, 0, args.seed + 4),
+        ),
+        whisper_model=whisper_model,
+    )
+
+
+def make_wav(seconds: float) -> bytes:
+    samples = (np.sin(np.arange(int(seconds * 16000)) * 0.05) * 8000).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float, **extra) -> dict:
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(float(np.percentile(ms, 50)), 1),
+        "p95_ms": round(float(np.percentile(ms, 95)), 1),
+        "p99_ms": round(float(np.percentile(ms, 99)), 1),
+        "max_ms": round(float(ms.max()), 1),
+        "rss_mb": round(rss_mb(), 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        **extra,
+    }
+
+
+async def drive_http(args, concurrency: int, send) -> dict:
+    app = create_app(
+        services_factory=lambda: build_services(args),
+        executor_factory=lambda: InferenceExecutor(workers=args.inference_workers, max_queue=args.inference_queue),
+    )
+    latencies: list[float] = []
+    errors = 0
+    pending = iter(range(args.requests))
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+            async def worker() -> None:
+                nonlocal errors
+                for _ in pending:
+                    started = time.perf_counter()
+                    response = await send(client)
+                    if response.status_code == 200:
+                        latencies.append(time.perf_counter() - started)
+                    else:
+                        errors += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+    return summarize(latencies, errors, elapsed)
+
+
+def bench_transcribe(args, concurrency: int) -> dict:
+    upload = make_wav(args.audio_seconds)
+
+    async def send(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.post("/transcribe", files={"file": ("bench.wav", upload, "audio/wav")})
+
+    return asyncio.run(drive_http(args, concurrency, send))
+
+
+def bench_tts(args, concurrency: int) -> dict:
+    async def send(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.post("/tts", json={"text": TTS_TEXT, "language": "pt", "format": "pcm"})
+
+    return asyncio.run(drive_http(args, concurrency, send))
+
+
+def bench_agent(args, concurrency: int) -> dict:
+    # Each concurrent user gets its own VoiceAgent; they share one RuntimeServices like
+    # agents sharing a model server would.
+    services = build_services(args)
+    audio = np.zeros(int(args.audio_seconds * 16000), dtype=np.float32)
+    latencies: list[float] = []
+    first_audio: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def user() -> None:
+        nonlocal errors
+        agent = VoiceAgent(services, player=SimulatedPlayer(speed=args.playback_speed))
+        try:
+            for _ in range(args.turns):
+                started = time.perf_counter()
+                try:
+                    agent.handle_turn(audio)
+                except Exception:
+                    with lock:
+                        errors += 1
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                    if "playback_start" in agent.trace.stages:
+                        first_audio.append(agent.trace.stages["playback_start"])
+        finally:
+            agent.shutdown()
+
+    with redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        threads = [threading.Thread(target=user) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    services.close()
+
+    first_audio_ms = np.array(first_audio) * 1000 if first_audio else np.zeros(1)
+    return summarize(
+        latencies,
+        errors,
+        elapsed,
+        first_audio_p50_ms=round(float(np.percentile(first_audio_ms, 50)), 1),
+        first_audio_p95_ms=round(float(np.percentile(first_audio_ms, 95)), 1),
+    )
+
+
+RUNNERS = {"transcribe": bench_transcribe, "tts": bench_tts, "agent": bench_agent}
+
+
+def run(args) -> dict:
+    results = []
+    for scenario in args.scenarios:
+        for concurrency in args.concurrency:
+            result = {"scenario": scenario, "concurrency": concurrency, **RUNNERS[scenario](args, concurrency)}
+            results.append(result)
+            print(
+                f"{scenario:<11} c={concurrency:<3} {result['throughput_rps']:>8.2f} req/s  "
+                f"p50 {result['p50_ms']:>8.1f}  p95 {result['p95_ms']:>8.1f}  p99 {result['p99_ms']:>8.1f} ms  "
+                f"errors {result['errors']:<3} rss {result['rss_mb']:.0f} MB"
+            )
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": {key: value for key, value in vars(args).items() if key not in {"output", "compare"}},
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    previous = {(row["scenario"], row["concurrency"]): row for row in baseline["results"]}
+    regressions = []
+    print(f"\nComparison with baseline from {baseline.get('created', '?')}:")
+    for row in report["results"]:
+        old = previous.get((row["scenario"], row["concurrency"]))
+        if old is None:
+            continue
+        p95_change = row["p95_ms"] / old["p95_ms"] - 1 if old["p95_ms"] else 0.0
+        rps_change = row["throughput_rps"] / old["throughput_rps"] - 1 if old["throughput_rps"] else 0.0
+        flag = ""
+        if p95_change > threshold or rps_change < -threshold:
+            flag = "  REGRESSION"
+            regressions.append(f"{row['scenario']} c={row['concurrency']}")
+        print(
+            f"{row['scenario']:<11} c={row['concurrency']:<3} p95 {p95_change:+7.1%}  "
+            f"throughput {rps_change:+7.1%}{flag}"
+        )
+    return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Offline load test of the API and voice pipeline with stand-in backends")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=64, help="HTTP requests per concurrency level")
+    parser.add_argument("--turns", type=int, default=3, help="Conversation turns per simulated agent user")
+    parser.add_argument("--audio-seconds", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=0)
+
+    backends = parser.add_argument_group("stand-in backends")
+    backends.add_argument("--polly-ms", type=float, default=120)
+    backends.add_argument("--polly-jitter-ms", type=float, default=60)
+    backends.add_argument("--polly-chunk-ms", type=float, default=1)
+    backends.add_argument("--llm-first-token-ms", type=float, default=300)
+    backends.add_argument("--llm-jitter-ms", type=float, default=150)
+    backends.add_argument("--llm-token-ms", type=float, default=15)
+    backends.add_argument("--whisper-overhead-ms", type=float, default=40)
+    backends.add_argument("--whisper-jitter-ms", type=float, default=20)
+    backends.add_argument("--whisper-rtf", type=float, default=0.1, help="Decode seconds per second of audio")
+    backends.add_argument(
+        "--whisper-model", help="Load a real faster-whisper model (e.g. tiny) instead of the fake; must be cached locally"
+    )
+    backends.add_argument("--playback-speed", type=float, default=20, help="Simulated playback speed vs real time")
+
+    runtime = parser.add_argument_group("runtime")
+    runtime.add_argument("--inference-workers", type=int, default=1)
+    runtime.add_argument("--inference-queue", type=int, default=64)
+    runtime.add_argument("--whisper-replicas", type=int, default=0, help="Decode in this many worker processes")
+    runtime.add_argument("--whisper-cpu-threads", type=int, default=0)
+    runtime.add_argument("--tts-cache-bytes", type=int, default=0, help="TTS cache budget (0 measures Polly every time)")
+
+    parser.add_argument("--output", help="Where to save results (default benchmarks/results/bench-<time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--regression-threshold", type=float, default=0.10)
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    report = run(args)
+
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.regression_threshold)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
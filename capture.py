@@ -0,0 +1,148 @@
+import sys
+import threading
+import time
+from typing import Callable
+
+import numpy as np
+
+from voice_activity import FRAME_SAMPLES, SAMPLE_RATE, SpeechEndpointer
+
+
+class CaptureBuffer:
+    # Preallocated float32 buffer addressed by absolute sample positions. Until speech is
+    # anchored it behaves like a ring (old silence is shifted out lazily when the buffer fills);
+    # once anchored, the utterance is written linearly from the front so it can be returned as
+    # a single contiguous view.
+    def __init__(self, max_seconds: float, pre_roll_seconds: float):
+        self.pre_roll = int(pre_roll_seconds * SAMPLE_RATE)
+        self._data = np.zeros(int((max_seconds + pre_roll_seconds) * SAMPLE_RATE) + FRAME_SAMPLES, dtype=np.float32)
+        self._cond = threading.Condition()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._cond:
+            self._base = 0
+            self._written = 0
+            self._anchored = False
+
+    @property
+    def written(self) -> int:
+        with self._cond:
+            return self._written
+
+    def append(self, samples: np.ndarray) -> None:
+        with self._cond:
+            used = self._written - self._base
+            if used + len(samples) > len(self._data):
+                if self._anchored:
+                    # Past max duration: the reader stops at its limit, so drop the overflow.
+                    samples = samples[: len(self._data) - used]
+                else:
+                    keep = min(used, self.pre_roll + FRAME_SAMPLES)
+                    self._data[:keep] = self._data[used - keep : used]
+                    self._base = self._written - keep
+                    used = keep
+            self._data[used : used + len(samples)] = samples
+            self._written += len(samples)
+            self._cond.notify_all()
+
+    def read_frame(self, position: int, timeout: float) -> np.ndarray | None:
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._written >= position + FRAME_SAMPLES, timeout):
+                return None
+            start = max(position, self._base) - self._base
+            return self._data[start : start + FRAME_SAMPLES].copy()
+
+    def anchor(self, position: int) -> int:
+        with self._cond:
+            position = max(position, self._base)
+            used = self._written - self._base
+            offset = position - self._base
+            self._data[: used - offset] = self._data[offset:used]
+            self._base = position
+            self._anchored = True
+            return position
+
+    def view(self, start: int, end: int) -> np.ndarray:
+        with self._cond:
+            return self._data[start - self._base : min(end, self._written) - self._base]
+
+
+class MicrophoneCapture:
+    def __init__(
+        self,
+        vad,
+        max_seconds: float = 20.0,
+        min_silence_ms: float = 800,
+        pre_roll_ms: float = 300,
+    ):
+        self.max_samples = int(max_seconds * SAMPLE_RATE)
+        self.endpointer = SpeechEndpointer(vad, min_silence_ms=min_silence_ms, pre_roll_ms=0)
+        self.buffer = CaptureBuffer(max_seconds, pre_roll_ms / 1000)
+        self._speech_start: int | None = None
+        # Seconds of audio between the end of speech and the end-of-speech decision.
+        self.endpoint_delay = 0.0
+
+    def _callback(self, indata, frames, callback_time, status) -> None:
+        if status:
+            print(status, file=sys.stderr)
+        self.buffer.append(indata[:, 0])
+
+    def current_utterance(self) -> np.ndarray:
+        # Audio captured so far for the utterance in progress; safe to call from other threads.
+        speech_start = self._speech_start
+        if speech_start is None:
+            return np.zeros(0, dtype=np.float32)
+        return self.buffer.view(speech_start, self.buffer.written)
+
+    def record(self, on_event: Callable[[str], None] | None = None) -> np.ndarray | None:
+        # Returns a view into the capture buffer that stays valid until the next record() call.
+        import sounddevice as sd
+
+        def emit(event: str) -> None:
+            if on_event is not None:
+                on_event(event)
+
+        self.buffer.reset()
+        self.endpointer.reset()
+        position = 0
+        self._speech_start = speech_start = None
+        self.endpoint_delay = 0.0
+        listen_started = time.monotonic()
+
+        stream = sd.InputStream(
+            samplerate=SAMPLE_RATE,
+            channels=1,
+            dtype="float32",
+            blocksize=FRAME_SAMPLES,
+            callback=self._callback,
+        )
+        with stream:
+            while True:
+                frame = self.buffer.read_frame(position, timeout=0.5)
+                if frame is None:
+                    if speech_start is None and time.monotonic() - listen_started > self.max_samples / SAMPLE_RATE:
+                        emit("max_duration")
+                        return None
+                    continue
+
+                event = self.endpointer.process(frame)
+                position += FRAME_SAMPLES
+
+                if event == "start":
+                    speech_start = self.buffer.anchor(position - FRAME_SAMPLES - self.buffer.pre_roll)
+                    self._speech_start = speech_start
+                    emit("speech_start")
+                elif event == "end":
+                    speech_end = position - self.endpointer.min_silence_frames * FRAME_SAMPLES
+                    self.endpoint_delay = (self.buffer.written - speech_end) / SAMPLE_RATE
+                    emit("speech_end")
+                    return self.buffer.view(speech_start, position)
+
+                if speech_start is None:
+                    if position > self.max_samples:
+                        emit("max_duration")
+                        return None
+                elif position - speech_start >= self.max_samples:
+                    emit("max_duration")
+                    return self.buffer.view(speech_start, position)
@@ -0,0 +1,120 @@
+import threading
+from typing import AsyncIterator, Iterator
+
+from audio_encoding import AudioFormat
+from metrics import Trace
+from response_cache import CachedReply
+from text_segmentation import StreamingSegmenter
+from voice_runtime import RuntimeServices
+
+
+class Conversation:
+    def __init__(self, services: RuntimeServices, language: str | None = None, max_history: int = 4):
+        self.services = services
+        self.language = language or services.language
+        self.max_history = max_history
+        self.history: list[dict] = []
+
+    def build_messages(self, user_text: str) -> list[dict]:
+        system_prompt = self.services.voice_config[self.language]["system_prompt"]
+
+        messages = [{"role": "system", "content": system_prompt}]
+        if len(self.history) > self.max_history:
+            self.history = self.history[-self.max_history :]
+        messages += self.history
+        messages.append({"role": "user", "content": user_text})
+        return messages
+
+    def _request(self, user_text: str) -> dict:
+        return {"model": self.services.config.llm_model, "messages": self.build_messages(user_text), "stream": True}
+
+    def _segmenter(self) -> StreamingSegmenter:
+        return StreamingSegmenter(
+            first_clause_chars=self.services.config.segment_first_clause_chars,
+            min_chars=self.services.config.segment_min_chars,
+        )
+
+    @staticmethod
+    def _feed(segmenter: StreamingSegmenter, chunk, trace: Trace, llm_started: float) -> list[str]:
+        if not chunk.choices:
+            return []
+        content = chunk.choices[0].delta.content
+        if not content:
+            return []
+
+        trace.mark_once("llm_first_token", trace.elapsed() - llm_started)
+        sentences = segmenter.feed(content)
+        if sentences:
+            trace.mark_once("first_sentence", trace.elapsed() - llm_started)
+        return sentences
+
+    @staticmethod
+    def _flush(segmenter: StreamingSegmenter, trace: Trace, llm_started: float) -> list[str]:
+        trace.mark("llm_total", trace.elapsed() - llm_started)
+        sentences = segmenter.flush()
+        if sentences:
+            trace.mark_once("first_sentence", trace.elapsed() - llm_started)
+        return sentences
+
+    def stream_reply(
+        self, user_text: str, cancelled: threading.Event | None = None, trace: Trace | None = None
+    ) -> Iterator[str]:
+        trace = trace if trace is not None else Trace("reply")
+        llm_started = trace.elapsed()
+        stream = self.services.openai_client.chat.completions.create(**self._request(user_text))
+
+        segmenter = self._segmenter()
+        try:
+            for chunk in stream:
+                if cancelled is not None and cancelled.is_set():
+                    return
+                yield from self._feed(segmenter, chunk, trace, llm_started)
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+        yield from self._flush(segmenter, trace, llm_started)
+
+    async def astream_reply(self, user_text: str, trace: Trace | None = None) -> AsyncIterator[str]:
+        # Same as stream_reply over the async client; cancelling the consuming task stops the stream.
+        trace = trace if trace is not None else Trace("reply")
+        llm_started = trace.elapsed()
+        stream = await self.services.async_openai.chat.completions.create(**self._request(user_text))
+
+        segmenter = self._segmenter()
+        try:
+            async for chunk in stream:
+                for sentence in self._feed(segmenter, chunk, trace, llm_started):
+                    yield sentence
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                await close()
+
+        for sentence in self._flush(segmenter, trace, llm_started):
+            yield sentence
+
+    def _cache_args(self, user_text: str, output_format: str | AudioFormat) -> tuple:
+        system_prompt = self.services.voice_config[self.language]["system_prompt"]
+        fmt = AudioFormat.of(output_format)
+        audio_format = f"{fmt.tag}@{fmt.sample_rate}"
+        return user_text, self.language, system_prompt, self.services.config.llm_model, audio_format
+
+    def cached_reply(self, user_text: str, output_format: str | AudioFormat) -> CachedReply | None:
+        cache = getattr(self.services, "response_cache", None)
+        if cache is None:
+            return None
+        return cache.get(*self._cache_args(user_text, output_format), opening=not self.history)
+
+    def remember(
+        self, user_text: str, output_format: str | AudioFormat, sentences: list[str], audio: list[bytes]
+    ) -> None:
+        # Call before record(): whether the turn opened the conversation decides if it may be cached.
+        cache = getattr(self.services, "response_cache", None)
+        if cache is not None:
+            cache.put(*self._cache_args(user_text, output_format), sentences, audio, opening=not self.history)
+
+    def record(self, user_text: str, reply: str) -> None:
+        self.history.append({"role": "user", "content": user_text})
+        self.history.append({"role": "assistant", "content": reply})
@@ -0,0 +1,233 @@
+import asyncio
+import functools
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+from contextlib import suppress
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+# Lower rank runs first. Live conversation turns and streams are "interactive"; backfill jobs are "batch".
+PRIORITIES = {"interactive": 0, "normal": 1, "batch": 2}
+
+
+class QueueFullError(RuntimeError):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Inference queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(RuntimeError):
+    pass
+
+
+class UnknownPriorityError(ValueError):
+    pass
+
+
+@dataclass(order=True)
+class _Job:
+    rank: int
+    deadline: float
+    seq: int
+    future: Future = field(compare=False)
+    task: Callable[[], Any] = field(compare=False)
+    submitted_at: float = field(compare=False)
+    queued: bool = field(default=True, compare=False)
+
+
+class InferenceExecutor:
+    # Worker threads fed from a heap ordered by priority, then deadline, then arrival. A job whose
+    # deadline passes while it waits fails with DeadlineExceededError instead of running, and a
+    # full queue makes room for a higher-priority job by rejecting the newest lower-priority one.
+    def __init__(self, workers: int = 1, max_queue: int = 16, retry_after: int = 1):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = max(1, retry_after)
+
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._heap: list[_Job] = []
+        self._seq = itertools.count()
+        self._closed = False
+        self._queued = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._expired = 0
+        self._preempted = 0
+        self._waits: deque[float] = deque(maxlen=1024)
+        self._run_times: deque[float] = deque(maxlen=1024)
+        self._threads = [
+            threading.Thread(target=self._work, name=f"inference_{i}", daemon=True) for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @classmethod
+    def from_env(cls) -> "InferenceExecutor":
+        return cls(
+            workers=int(os.getenv("INFERENCE_WORKERS", "1")),
+            max_queue=int(os.getenv("INFERENCE_QUEUE_SIZE", "16")),
+            retry_after=int(os.getenv("INFERENCE_RETRY_AFTER", "1")),
+        )
+
+    @staticmethod
+    def rank(priority: str) -> int:
+        if priority not in PRIORITIES:
+            raise UnknownPriorityError(f"Priority '{priority}' not supported. Options: {list(PRIORITIES)}")
+        return PRIORITIES[priority]
+
+    def _estimate_retry_after(self) -> int:
+        if not self._run_times:
+            return self.retry_after
+        avg_run = sum(self._run_times) / len(self._run_times)
+        backlog = (self._queued + self._in_flight) / self.workers
+        return max(self.retry_after, math.ceil(avg_run * backlog))
+
+    def _admit(self, job: _Job) -> _Job | None:
+        # Returns the queued job displaced to make room, if any. Caller holds the lock.
+        if self._queued + self._in_flight < self.workers + self.max_queue:
+            return None
+        queued = [other for other in self._heap if other.queued and other.rank > job.rank]
+        if not queued:
+            self._rejected += 1
+            raise QueueFullError(self._estimate_retry_after())
+        victim = max(queued, key=lambda other: (other.rank, other.seq))
+        victim.queued = False
+        self._queued -= 1
+        self._rejected += 1
+        self._preempted += 1
+        return victim
+
+    def _on_done(self, job: _Job) -> None:
+        # A future cancelled before a worker picked it up never runs the task body.
+        if job.future.cancelled():
+            with self._lock:
+                if job.queued:
+                    job.queued = False
+                    self._queued -= 1
+
+    def submit(
+        self, fn: Callable[..., Any], *args: Any, priority: str = "normal", deadline: float | None = None, **kwargs: Any
+    ) -> Future:
+        # `deadline` is a time.monotonic() value; None waits as long as it takes.
+        rank = self.rank(priority)
+        now = time.monotonic()
+        if deadline is not None and deadline <= now:
+            with self._lock:
+                self._expired += 1
+            raise DeadlineExceededError("Deadline passed before the request was queued")
+
+        job = _Job(
+            rank,
+            math.inf if deadline is None else deadline,
+            next(self._seq),
+            Future(),
+            functools.partial(fn, *args, **kwargs),
+            now,
+        )
+        with self._ready:
+            if self._closed:
+                raise RuntimeError("Inference executor is shut down")
+            victim = self._admit(job)
+            self._queued += 1
+            heapq.heappush(self._heap, job)
+            self._ready.notify()
+        if victim is not None:
+            # The victim may have been cancelled by its caller in the meantime.
+            with suppress(InvalidStateError):
+                victim.future.set_exception(QueueFullError(self._estimate_retry_after()))
+        job.future.add_done_callback(lambda _: self._on_done(job))
+        return job.future
+
+    def _next(self) -> _Job | None:
+        with self._ready:
+            while True:
+                while self._heap and not self._heap[0].queued:
+                    heapq.heappop(self._heap)
+                if self._heap:
+                    job = heapq.heappop(self._heap)
+                    job.queued = False
+                    self._queued -= 1
+                    return job
+                if self._closed:
+                    return None
+                self._ready.wait()
+
+    def _work(self) -> None:
+        while (job := self._next()) is not None:
+            # Claimed first: the caller may cancel between _next() and here, and a cancelled future
+            # rejects set_exception() as well.
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            started_at = time.monotonic()
+            if started_at >= job.deadline:
+                with self._lock:
+                    self._expired += 1
+                waited = started_at - job.submitted_at
+                job.future.set_exception(DeadlineExceededError(f"Deadline passed after {waited:.2f}s in the queue"))
+                continue
+            with self._lock:
+                self._in_flight += 1
+                self._waits.append(started_at - job.submitted_at)
+            try:
+                result = job.task()
+            except BaseException as e:
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+            finally:
+                finished_at = time.monotonic()
+                with self._lock:
+                    self._in_flight -= 1
+                    self._completed += 1
+                    self._run_times.append(finished_at - started_at)
+
+    async def run(
+        self, fn: Callable[..., Any], *args: Any, priority: str = "normal", deadline: float | None = None, **kwargs: Any
+    ) -> Any:
+        return await asyncio.wrap_future(self.submit(fn, *args, priority=priority, deadline=deadline, **kwargs))
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            runs = list(self._run_times)
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queued,
+                "queue_by_priority": {
+                    name: sum(1 for job in self._heap if job.queued and job.rank == rank)
+                    for name, rank in PRIORITIES.items()
+                },
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "preempted": self._preempted,
+                "expired": self._expired,
+                "wait_ms_p50": _percentile_ms(waits, 0.50),
+                "wait_ms_p95": _percentile_ms(waits, 0.95),
+                "wait_ms_max": round(waits[-1] * 1000, 2) if waits else 0.0,
+                "run_ms_avg": round(sum(runs) / len(runs) * 1000, 2) if runs else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        with self._ready:
+            self._closed = True
+            pending = [job for job in self._heap if job.queued]
+            self._ready.notify_all()
+        for job in pending:
+            job.future.cancel()
+
+
+def _percentile_ms(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return round(sorted_values[idx] * 1000, 2)
@@ -0,0 +1,93 @@
+import json
+import os
+import unicodedata
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+# Piper's sentence markers and the pad inserted after every phoneme.
+BOS, EOS, PAD = "^", "$", "_"
+
+
+class LocalTTSError(RuntimeError):
+    pass
+
+
+class LocalTTS:
+    # In-process neural TTS for Piper voices (VITS exported to ONNX, with a `<model>.onnx.json`
+    # config). Produces the same 16-bit mono PCM as Polly's `pcm` output, resampled from the
+    # voice's native rate. Models and sessions are CPU-only, like the Silero VAD.
+    def __init__(self, model_path: str, config_path: str | None = None, threads: int = 0, session=None):
+        config_path = config_path or f"{model_path}.json"
+        try:
+            with open(config_path, encoding="utf-8") as f:
+                config = json.load(f)
+        except OSError as e:
+            raise LocalTTSError(f"Local TTS voice config not found: {config_path}") from e
+
+        self.name = os.path.splitext(os.path.basename(model_path))[0]
+        self.sample_rate = config["audio"]["sample_rate"]
+        self.id_map: dict[str, list[int]] = config["phoneme_id_map"]
+        self.phoneme_type = config.get("phoneme_type", "espeak")
+        self.espeak_voice = config.get("espeak", {}).get("voice", "en-us")
+        inference = config.get("inference", {})
+        self.scales = np.array(
+            [inference.get("noise_scale", 0.667), inference.get("length_scale", 1.0), inference.get("noise_w", 0.8)],
+            dtype=np.float32,
+        )
+        self.multi_speaker = config.get("num_speakers", 1) > 1
+        self._phonemize = self._phonemizer()
+        self.session = session if session is not None else self._load(model_path, threads)
+
+    @staticmethod
+    def _load(model_path: str, threads: int):
+        import onnxruntime
+
+        opts = onnxruntime.SessionOptions()
+        if threads > 0:
+            opts.intra_op_num_threads = threads
+        opts.log_severity_level = 3
+        return onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"], sess_options=opts)
+
+    def _phonemizer(self):
+        if self.phoneme_type == "text":
+            return lambda text: list(unicodedata.normalize("NFD", text))
+        try:
+            from piper_phonemize import phonemize_espeak
+        except ImportError as e:
+            raise LocalTTSError("This voice needs espeak phonemes: pip install piper-phonemize") from e
+        return lambda text: [p for sentence in phonemize_espeak(text, self.espeak_voice) for p in sentence]
+
+    def phoneme_ids(self, text: str) -> list[int]:
+        ids = [*self.id_map[BOS], *self.id_map[PAD]]
+        for phoneme in self._phonemize(text):
+            # Phonemes the voice was not trained on are skipped, as Piper does.
+            if phoneme in self.id_map:
+                ids += self.id_map[phoneme]
+                ids += self.id_map[PAD]
+        ids += self.id_map[EOS]
+        return ids
+
+    def synthesize(self, text: str, sample_rate: int = SAMPLE_RATE) -> bytes:
+        ids = np.array([self.phoneme_ids(text)], dtype=np.int64)
+        inputs = {"input": ids, "input_lengths": np.array([ids.shape[1]], dtype=np.int64), "scales": self.scales}
+        if self.multi_speaker:
+            inputs["sid"] = np.array([0], dtype=np.int64)
+        audio = np.asarray(self.session.run(None, inputs)[0], dtype=np.float32).reshape(-1)
+        return to_pcm16(audio, self.sample_rate, sample_rate)
+
+
+def to_pcm16(audio: np.ndarray, source_rate: int, target_rate: int) -> bytes:
+    # Peak-normalized like Piper's own output, then resampled with PyAV (libswresample).
+    peak = float(np.max(np.abs(audio))) if len(audio) else 0.0
+    pcm = (audio * (32767.0 / max(0.01, peak))).clip(-32768, 32767).astype(np.int16)
+    if source_rate == target_rate or not len(pcm):
+        return pcm.tobytes()
+
+    import av
+
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=target_rate)
+    frame = av.AudioFrame.from_ndarray(pcm.reshape(1, -1), format="s16", layout="mono")
+    frame.sample_rate = source_rate
+    frames = resampler.resample(frame) + resampler.resample(None)
+    return b"".join(f.to_ndarray().tobytes() for f in frames)
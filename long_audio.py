@@ -0,0 +1,36 @@
+import numpy as np
+
+from voice_activity import FRAME_SAMPLES, SAMPLE_RATE
+
+
+def _quietest_cut(window: np.ndarray, vad) -> int:
+    # Middle of the longest unvoiced run; without any pause, the lowest-energy frame.
+    vad.reset()
+    frames = len(window) // FRAME_SAMPLES
+    voiced = [vad.is_speech(window[i * FRAME_SAMPLES : (i + 1) * FRAME_SAMPLES]) for i in range(frames)]
+    best_start = best_length = run_start = 0
+    for i, is_voiced in enumerate([*voiced, True]):
+        if not is_voiced:
+            continue
+        if i - run_start > best_length:
+            best_start, best_length = run_start, i - run_start
+        run_start = i + 1
+    if best_length:
+        return (best_start + best_length // 2) * FRAME_SAMPLES
+    energy = np.square(window[: frames * FRAME_SAMPLES].reshape(frames, FRAME_SAMPLES)).mean(axis=1)
+    return int(np.argmin(energy)) * FRAME_SAMPLES
+
+
+def split_at_silence(audio: np.ndarray, vad, chunk_s: float = 30.0) -> list[tuple[int, int]]:
+    # (start, end) sample ranges of at most `chunk_s`, each cut at a pause in the second half of
+    # its span so no word straddles two chunks. Only those search windows go through the VAD.
+    max_samples = max(2 * FRAME_SAMPLES, int(chunk_s * SAMPLE_RATE))
+    bounds: list[tuple[int, int]] = []
+    start = 0
+    while len(audio) - start > max_samples:
+        low = start + max_samples // 2
+        cut = low + _quietest_cut(audio[low : start + max_samples], vad)
+        bounds.append((start, cut))
+        start = cut
+    bounds.append((start, len(audio)))
+    return bounds
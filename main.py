@@ -2,200 +2,282 @@ import argparse
 import logging
 import os
 import queue
-import re
 import sys
 import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 import numpy as np
-import sounddevice as sd
-import soundfile as sf
 
+from capture import MicrophoneCapture
+from conversation import Conversation
+from metrics import Trace
+from playback import SpeechPlayer
+from streaming_stt import IncrementalTranscriber
+from voice_activity import make_vad
 from voice_runtime import RuntimeServices
 
 logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
 logger = logging.getLogger(__name__)
 
 SAMPLE_RATE = 16000
-CHANNELS = 1
-DTYPE = "int16"
 
 # VAD Parameters
 SILENCE_THRESHOLD = 0.015
 SILENCE_DURATION = 0.8
 MAX_DURATION = 20.0
+# Audio kept from before the detected onset so the first word is not clipped
+PRE_ROLL_DURATION = 0.3
 
-ABBREVIATIONS = {
-    "dr.",
-    "dra.",
-    "mr.",
-    "mrs.",
-    "ms.",
-    "sr.",
-    "sra.",
-    "vs.",
-    "etc.",
-    "e.g.",
-    "i.e.",
-}
+# Sentences synthesized ahead of the one currently playing
+TTS_PREFETCH = 2
 
 
 class VoiceAgent:
-    def __init__(self, services: RuntimeServices):
+    def __init__(
+        self,
+        services: RuntimeServices,
+        tts_prefetch: int = TTS_PREFETCH,
+        vad: str = "energy",
+        stt_mode: str = "full",
+        player: SpeechPlayer | None = None,
+        barge_in: bool = False,
+    ):
         self.services = services
-        self.history = []
-        self.tts_queue: queue.Queue[str | None] = queue.Queue()
+        self.stt_mode = stt_mode
+        self.barge_in = barge_in
+        self.speculative: IncrementalTranscriber | None = None
+        self.trace: Trace | None = None
+        self.conversation = Conversation(services)
+        self.capture = MicrophoneCapture(
+            make_vad(vad, threshold=SILENCE_THRESHOLD if vad == "energy" else None),
+            max_seconds=MAX_DURATION,
+            min_silence_ms=SILENCE_DURATION * 1000,
+            pre_roll_ms=PRE_ROLL_DURATION * 1000,
+        )
+        self.player = player if player is not None else SpeechPlayer()
+        self.player.start()
+
+        # Sentences to synthesize, or (sentence, audio) pairs already synthesized (cached replies).
+        self.tts_queue: queue.Queue[str | tuple[str, np.ndarray] | None] = queue.Queue()
+        # Bounded so synthesis runs at most `tts_prefetch` sentences ahead of playback.
+        self.playback_queue: queue.Queue[tuple[str, Future] | None] = queue.Queue(maxsize=max(1, tts_prefetch))
+        self.synth_pool = ThreadPoolExecutor(max_workers=max(1, tts_prefetch), thread_name_prefix="tts-synth")
+        # Audio of the current turn's sentences, kept so the whole reply can go to the response cache.
+        self.turn_audio: list[Future] = []
+        # Sentences of the current reply with the player position their audio starts at.
+        self.turn_played: list[tuple[str, int]] = []
+        # Set by interrupt(); the LLM stream and both workers drop the rest of the reply.
+        self.turn_cancelled = threading.Event()
+        self.interrupted_at: int | None = None
+        self._turn_lock = threading.Lock()
+        self.reply_thread: threading.Thread | None = None
         self.tts_thread = threading.Thread(target=self._tts_worker, daemon=True)
+        self.playback_thread = threading.Thread(target=self._playback_worker, daemon=True)
         self.tts_thread.start()
+        self.playback_thread.start()
+
+    def _synthesize(self, text: str) -> np.ndarray:
+        audio_stream = self.services.synthesize_speech(text, self.conversation.language, "pcm")
+        return np.frombuffer(audio_stream, dtype=np.int16)
 
     def _tts_worker(self) -> None:
         while True:
-            text = self.tts_queue.get()
-            if text is None:
-                self.tts_queue.task_done()
+            item = self.tts_queue.get()
+            if item is None:
+                self.playback_queue.put(None)
                 break
 
-            if not text.strip():
+            if self.turn_cancelled.is_set() or (isinstance(item, str) and not item.strip()):
                 self.tts_queue.task_done()
                 continue
 
+            if isinstance(item, tuple):
+                sentence, audio = item
+                pending: Future = Future()
+                pending.set_result(audio)
+            else:
+                sentence = item
+                pending = self.synth_pool.submit(self._synthesize, sentence)
+                self.turn_audio.append(pending)
+            self.playback_queue.put((sentence, pending))
+
+    def _await_audio(self, pending: Future) -> np.ndarray | None:
+        # Polls so an interruption is noticed while Polly is still answering.
+        while not self.turn_cancelled.is_set():
+            try:
+                return pending.result(timeout=0.02)
+            except FutureTimeoutError:
+                # Not the builtin TimeoutError before Python 3.11.
+                continue
+        pending.cancel()
+        return None
+
+    def _playback_worker(self) -> None:
+        # Sentences are marked done once their audio is in the ring buffer; the output stream
+        # plays them back to back while later sentences are still being synthesized.
+        while True:
+            item = self.playback_queue.get()
+            if item is None:
+                self.tts_queue.task_done()
+                break
+
+            sentence, pending = item
             try:
-                audio_stream = self.services.synthesize_speech(text, self.services.language, "pcm")
-                audio_np = np.frombuffer(audio_stream, dtype=np.int16)
-                sd.play(audio_np, samplerate=16000)
-                sd.wait()
+                audio = self._await_audio(pending)
+                with self._turn_lock:
+                    # interrupt() clears the player under the same lock, so audio that passes this
+                    # check is either written before the clear or dropped by the generation change.
+                    if audio is not None and not self.turn_cancelled.is_set():
+                        generation = self.player.ring.generation
+                        self.turn_played.append((sentence, self.player.ring.written))
+                    else:
+                        audio = None
+                if audio is not None:
+                    if self.trace is not None:
+                        self.trace.mark_once("playback_start")
+                    self.player.enqueue(audio, generation)
             except Exception as e:
                 logger.exception("TTS worker failed: %s", e)
 
             self.tts_queue.task_done()
 
-    def shutdown(self) -> None:
-        self.tts_queue.put(None)
+    def wait_until_spoken(self) -> None:
         self.tts_queue.join()
+        self.player.drain()
 
-    def record_vad(self, filename: str = "input.wav") -> bool:
-        print("🎤 Listening... (Speak now)")
-
-        q: queue.Queue[np.ndarray] = queue.Queue()
-
-        def callback(indata, frames, callback_time, status):
-            if status:
-                print(status, file=sys.stderr)
-            q.put(indata.copy())
-
-        audio_data = []
-        silence_start = None
-        speaking_started = False
-
-        stream = sd.InputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, dtype=DTYPE, callback=callback)
-        start_time = time.time()
-
-        with stream:
-            while True:
-                chunk = q.get()
-                audio_data.append(chunk)
-
-                chunk_f = chunk.astype(np.float32) / 32768.0
-                rms = np.sqrt(np.mean(chunk_f**2))
-
-                if not speaking_started and rms > SILENCE_THRESHOLD:
-                    speaking_started = True
-                    print("   (Voice detected...)")
-
-                if speaking_started:
-                    if rms < SILENCE_THRESHOLD:
-                        if silence_start is None:
-                            silence_start = time.time()
-                        elif time.time() - silence_start > SILENCE_DURATION:
-                            print("   (Silence detected, stopping.)")
-                            break
-                    else:
-                        silence_start = None
-
-                if time.time() - start_time > MAX_DURATION:
-                    print("   (Max duration reached.)")
-                    break
-
-        if not audio_data:
+    def interrupt(self) -> bool:
+        # Barge-in: stop the reply being spoken. Returns False when nothing was playing.
+        reply = self.reply_thread
+        if reply is None or not reply.is_alive() or self.turn_cancelled.is_set():
             return False
-
-        full_audio = np.concatenate(audio_data, axis=0)
-        sf.write(filename, full_audio, SAMPLE_RATE)
+        with self._turn_lock:
+            self.turn_cancelled.set()
+            self.interrupted_at = self.player.ring.played
+            self.player.stop()
         return True
 
-    def transcribe(self, filename: str) -> str:
-        text, _ = self.services.transcribe_file(filename)
-        return text
-
-    @staticmethod
-    def _is_sentence_boundary(buffer: str, idx: int) -> bool:
-        char = buffer[idx]
-        if char not in ".!?":
-            return False
-
-        if char == "." and idx > 0 and idx + 1 < len(buffer):
-            if buffer[idx - 1].isdigit() and buffer[idx + 1].isdigit():
-                return False
-
-        token_match = re.search(r"(\b[\w.]+)$", buffer[: idx + 1])
-        if token_match and token_match.group(1).lower() in ABBREVIATIONS:
-            return False
-
-        if idx + 1 >= len(buffer):
-            return False
-
-        return buffer[idx + 1].isspace()
-
-    @classmethod
-    def _extract_complete_sentences(cls, buffer: str) -> tuple[list[str], str]:
-        sentences: list[str] = []
-        cursor = 0
-        for idx in range(len(buffer)):
-            if cls._is_sentence_boundary(buffer, idx):
-                sentence = buffer[cursor : idx + 1].strip()
-                if sentence:
-                    sentences.append(sentence)
-                cursor = idx + 1
+    def shutdown(self) -> None:
+        self.finish_reply()
+        self.tts_queue.put(None)
+        self.wait_until_spoken()
+        self.player.close()
+        self.synth_pool.shutdown()
 
-        remainder = buffer[cursor:].lstrip()
-        return sentences, remainder
+    def record_vad(self) -> np.ndarray | None:
+        print("🎤 Listening... (Speak now)")
 
-    def generate_and_speak(self, user_text: str) -> None:
-        system_prompt = self.services.current_config["system_prompt"]
+        if self.stt_mode == "incremental":
+            self.speculative = IncrementalTranscriber(self.services.transcribe_segments)
+
+        def on_event(event: str) -> None:
+            if event == "speech_start":
+                print("   (Voice detected...)")
+                if self.barge_in and self.interrupt():
+                    print("   (Interrupted.)")
+                if self.speculative is not None:
+                    self.speculative.start(self.capture.current_utterance)
+            elif event == "speech_end":
+                print("   (Silence detected, stopping.)")
+            elif event == "max_duration":
+                print("   (Max duration reached.)")
+
+        return self.capture.record(on_event)
+
+    def transcribe(self, audio: str | np.ndarray) -> str:
+        if self.speculative is not None and not isinstance(audio, str):
+            speculative, self.speculative = self.speculative, None
+            text = speculative.finish(audio)
+            logger.info(
+                "Incremental STT: %.2fs of %.2fs decoded after end of speech",
+                speculative.tail_samples / SAMPLE_RATE,
+                len(audio) / SAMPLE_RATE,
+            )
+            return text
+        text, _ = self.services.transcribe_file(audio)
+        return text
 
-        messages = [{"role": "system", "content": system_prompt}]
-        if len(self.history) > 4:
-            self.history = self.history[-4:]
-        messages += self.history
-        messages.append({"role": "user", "content": user_text})
+    def generate_and_speak(self, user_text: str) -> tuple[list[str], bool]:
+        # Queues the reply for synthesis; returns its sentences and whether it came from the cache.
+        cached = self.conversation.cached_reply(user_text, "pcm")
+        if cached is not None:
+            print("⚡ Cached reply.")
+            if self.trace is not None:
+                self.trace.fields["response_cache"] = "hit"
+            for sentence, audio in zip(cached.sentences, cached.audio):
+                self.tts_queue.put((sentence, np.frombuffer(audio, dtype=np.int16)))
+            return list(cached.sentences), True
 
         print("🤖 Thinking...", end="", flush=True)
-        stream = self.services.openai_client.chat.completions.create(
-            model=self.services.config.llm_model,
-            messages=messages,
-            stream=True,
-        )
-
-        buffer = ""
-        full_response = ""
-
-        for chunk in stream:
-            content = chunk.choices[0].delta.content
-            if not content:
-                continue
-
-            buffer += content
-            full_response += content
-            ready_sentences, buffer = self._extract_complete_sentences(buffer)
-            for sentence in ready_sentences:
-                self.tts_queue.put(sentence)
-
-        if buffer.strip():
-            self.tts_queue.put(buffer.strip())
-
-        self.history.append({"role": "user", "content": user_text})
-        self.history.append({"role": "assistant", "content": full_response})
-        print("\n✅ Full response generated.")
+        self.turn_audio = []
+        spoken: list[str] = []
+        for sentence in self.conversation.stream_reply(user_text, self.turn_cancelled, self.trace):
+            spoken.append(sentence)
+            self.tts_queue.put(sentence)
+
+        if not self.turn_cancelled.is_set():
+            print("\n✅ Full response generated.")
+        return spoken, False
+
+    def _remember_reply(self, user_text: str, spoken: list[str]) -> None:
+        # Called once the reply has played, so every sentence's audio is final.
+        if not spoken or len(self.turn_audio) != len(spoken):
+            return
+        try:
+            audio = [pending.result().tobytes() for pending in self.turn_audio]
+        except Exception:
+            return
+        self.conversation.remember(user_text, "pcm", spoken, audio)
+
+    def _reply(self, user_text: str, trace: Trace) -> None:
+        spoken, cached = self.generate_and_speak(user_text)
+        self.wait_until_spoken()
+        if self.turn_cancelled.is_set():
+            # Keep only sentences the user started hearing; the rest never reached the speaker.
+            heard = [sentence for sentence, start in self.turn_played if start < self.interrupted_at]
+            trace.fields["interrupted"] = True
+            trace.fields["sentences_heard"] = len(heard)
+            self.conversation.record(user_text, " ".join(heard))
+        else:
+            if not cached:
+                self._remember_reply(user_text, spoken)
+            self.conversation.record(user_text, " ".join(spoken))
+        trace.mark("turn_total")
+        trace.log()
+
+    def start_reply(self, user_text: str) -> None:
+        self.finish_reply()
+        self.turn_cancelled.clear()
+        self.interrupted_at = None
+        self.turn_played = []
+        self.reply_thread = threading.Thread(target=self._reply, args=(user_text, self.trace), daemon=True)
+        self.reply_thread.start()
+
+    def finish_reply(self) -> None:
+        if self.reply_thread is not None:
+            self.reply_thread.join()
+            self.reply_thread = None
+
+    def handle_turn(self, audio: str | np.ndarray, endpoint_delay: float | None = None) -> str:
+        # One user turn: transcribe and reply. Returns once the reply has been played, or right
+        # away with barge-in, so the next utterance can interrupt it.
+        self.finish_reply()
+        self.trace = Trace("turn", stt_mode=self.stt_mode)
+        if endpoint_delay is not None:
+            self.trace.mark("vad_end", endpoint_delay)
+        t0 = time.time()
+        text = self.transcribe(audio)
+        t_stt = time.time() - t0
+        self.trace.mark("stt", t_stt)
+        if not text.strip():
+            return ""
+
+        print(f"🗣️  You: {text} (STT {t_stt:.2f}s, {self.stt_mode})")
+        self.start_reply(text)
+        if not self.barge_in:
+            self.finish_reply()
+        return text
 
     def run(self, file_input: str | None = None) -> None:
         print(f"🌍 Language Mode: {self.services.language} (Voice: {self.services.current_config['voice_id']})")
@@ -204,31 +286,28 @@ class VoiceAgent:
         try:
             while True:
                 if file_input:
-                    filename = file_input
-                    if not os.path.exists(filename):
-                        print(f"❌ File not found: {filename}")
+                    audio = file_input
+                    if not os.path.exists(audio):
+                        print(f"❌ File not found: {audio}")
                         return
-                    print(f"📂 Using file: {filename}")
+                    print(f"📂 Using file: {audio}")
                 else:
-                    filename = "current_input.wav"
-                    if not self.record_vad(filename):
+                    audio = self.record_vad()
+                    if audio is None or not len(audio):
+                        if self.speculative is not None:
+                            self.speculative.finish(np.zeros(0, dtype=np.float32))
+                            self.speculative = None
                         continue
 
-                t0 = time.time()
-                text = self.transcribe(filename)
-                t_stt = time.time() - t0
-
-                if not text.strip():
+                endpoint_delay = None if isinstance(audio, str) else self.capture.endpoint_delay
+                if not self.handle_turn(audio, endpoint_delay):
                     print("⚠️ (Nothing heard)")
                     if file_input:
                         break
                     continue
 
-                print(f"🗣️  You: {text} ({t_stt:.2f}s)")
-                self.generate_and_speak(text)
-                self.tts_queue.join()
-
                 if file_input:
+                    self.finish_reply()
                     print("✅ File processing complete.")
                     break
         except KeyboardInterrupt:
@@ -237,19 +316,81 @@ class VoiceAgent:
             self.shutdown()
 
 
+def run_batch(args: argparse.Namespace) -> int:
+    from batch_pipeline import TRANSCRIPT_FILE, BatchPipeline, load_utterances
+
+    try:
+        utterances = load_utterances(args.batch)
+        services = RuntimeServices.from_env()
+        pipeline = BatchPipeline(
+            services,
+            args.output_dir,
+            output_format=args.format,
+            stt_workers=args.stt_workers,
+            llm_workers=args.llm_workers,
+            tts_workers=args.tts_workers,
+        )
+    except Exception as e:
+        print(f"❌ Initialization error: {e}")
+        return 1
+
+    print(f"📂 {len(utterances)} utterances from {args.batch} -> {args.output_dir}")
+    try:
+        summary = pipeline.run(utterances)
+    finally:
+        pipeline.close()
+        services.close()
+    print(
+        f"✅ {summary['utterances']} utterances in {summary['elapsed_s']}s ({summary['per_second']}/s), "
+        f"{summary['failed']} failed. See {os.path.join(args.output_dir, TRANSCRIPT_FILE)}"
+    )
+    return 1 if summary["failed"] else 0
+
+
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--file", type=str, help="Use existing audio file instead of microphone")
+    parser.add_argument(
+        "--vad",
+        choices=["energy", "silero"],
+        default="energy",
+        help="End-of-speech detector: fixed RMS threshold or Silero (ONNX)",
+    )
+    parser.add_argument(
+        "--stt-mode",
+        choices=["full", "incremental"],
+        default="full",
+        help="Transcribe after end of speech, or speculatively while the user is still talking",
+    )
+    parser.add_argument(
+        "--barge-in",
+        action="store_true",
+        help="Keep listening while the reply plays and stop it when the user speaks (use a headset)",
+    )
+    batch = parser.add_argument_group("batch mode (no microphone or speaker)")
+    batch.add_argument(
+        "--batch", type=str, help="Directory of audio files, or a manifest (.jsonl or one path per line)"
+    )
+    batch.add_argument("--output-dir", type=str, default="batch_output", help="Where replies and transcript.jsonl go")
+    batch.add_argument("--format", choices=["wav", "opus", "pcm"], default="wav", help="Audio format of the replies")
+    batch.add_argument("--stt-workers", type=int, default=1, help="Concurrent transcriptions")
+    batch.add_argument("--llm-workers", type=int, default=4, help="Concurrent LLM replies")
+    batch.add_argument("--tts-workers", type=int, default=4, help="Concurrent reply syntheses")
     args = parser.parse_args()
 
+    if args.batch:
+        sys.exit(run_batch(args))
+
     print("🚀 Initializing clients...")
     try:
-        services = RuntimeServices.from_env()
+        # Whisper loads in the background while the audio devices and VAD are set up.
+        services = RuntimeServices.from_env(background=True)
+        agent = VoiceAgent(services, vad=args.vad, stt_mode=args.stt_mode, barge_in=args.barge_in)
+        services.wait_ready()
     except Exception as e:
         print(f"❌ Initialization error: {e}")
         sys.exit(1)
 
-    agent = VoiceAgent(services)
     agent.run(file_input=args.file)
 
 
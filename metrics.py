@@ -0,0 +1,148 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+trace_logger = logging.getLogger("voice.trace")
+
+TRACE_LOG = os.getenv("TRACE_LOG", "").lower() in {"1", "true", "yes"}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0, 30.0)
+AUDIO_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 300.0)
+RATIO_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0)
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(pairs: list[tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: tuple[float, ...], labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(key, list(counts), total) for key, (counts, total) in sorted(self._series.items())]
+        for key, counts, total in snapshot:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(
+        self, name: str, documentation: str, buckets: tuple[float, ...] = LATENCY_BUCKETS, labelnames=()
+    ) -> Histogram:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, documentation, buckets, tuple(labelnames))
+            return self._metrics[name]
+
+    def render(self) -> str:
+        # Prometheus text exposition format, version 0.0.4.
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+STAGE_SECONDS = REGISTRY.histogram(
+    "voice_stage_seconds", "Latency of each voice pipeline stage in seconds.", labelnames=("stage",)
+)
+WHISPER_AUDIO_SECONDS = REGISTRY.histogram(
+    "voice_whisper_audio_seconds", "Duration of audio passed to Whisper in seconds.", AUDIO_BUCKETS
+)
+WHISPER_REALTIME_FACTOR = REGISTRY.histogram(
+    "voice_whisper_realtime_factor", "Whisper decode time divided by audio duration.", RATIO_BUCKETS
+)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+def observe_whisper(seconds: float, audio_seconds: float) -> None:
+    observe_stage("whisper_decode", seconds)
+    if audio_seconds > 0:
+        WHISPER_AUDIO_SECONDS.observe(audio_seconds)
+        WHISPER_REALTIME_FACTOR.observe(seconds / audio_seconds)
+
+
+class Trace:
+    # Per-turn (or per-request) timeline. Every mark feeds the stage histogram; when TRACE_LOG is
+    # set, log() also writes the whole turn as one JSON line so a slow request can be
+    # attributed to a single hop.
+    def __init__(self, kind: str, **fields):
+        self.kind = kind
+        self.fields = fields
+        self.started = time.perf_counter()
+        self.stages: dict[str, float] = {}
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def mark(self, stage: str, seconds: float | None = None) -> None:
+        seconds = self.elapsed() if seconds is None else seconds
+        self.stages[stage] = seconds
+        observe_stage(stage, seconds)
+
+    def mark_once(self, stage: str, seconds: float | None = None) -> None:
+        if stage not in self.stages:
+            self.mark(stage, seconds)
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(stage, time.perf_counter() - started)
+
+    def log(self) -> None:
+        if not TRACE_LOG:
+            return
+        record = {
+            "kind": self.kind,
+            **self.fields,
+            "total_ms": round(self.elapsed() * 1000, 1),
+            "stages_ms": {stage: round(seconds * 1000, 1) for stage, seconds in self.stages.items()},
+        }
+        trace_logger.info(json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,179 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# Approximate resident size of CTranslate2 Whisper models at float16; int8 roughly halves it and
+# float32 doubles it. Used only to keep the set of loaded models under the memory budget.
+FLOAT16_MODEL_MB = {
+    "tiny": 80,
+    "tiny.en": 80,
+    "base": 150,
+    "base.en": 150,
+    "small": 500,
+    "small.en": 500,
+    "distil-small.en": 350,
+    "medium": 1550,
+    "medium.en": 1550,
+    "distil-medium.en": 800,
+    "large-v1": 3100,
+    "large-v2": 3100,
+    "large-v3": 3100,
+    "large": 3100,
+    "distil-large-v2": 1550,
+    "distil-large-v3": 1550,
+    "distil-large-v3.5": 1550,
+    "large-v3-turbo": 1650,
+    "turbo": 1650,
+}
+UNKNOWN_MODEL_MB = 1500
+COMPUTE_TYPE_SCALE = {"float32": 2.0, "float16": 1.0, "bfloat16": 1.0, "int8_float16": 0.5, "int8": 0.5}
+
+
+class UnknownModelError(ValueError):
+    pass
+
+
+def _close(model: Any) -> None:
+    close = getattr(model, "close", None)
+    if close is not None:
+        close()
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    size: str
+    compute_type: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.size}:{self.compute_type}"
+
+    @classmethod
+    def parse(cls, text: str, default_compute_type: str) -> "ModelSpec":
+        # "small" or "large-v3:int8_float16"
+        size, _, compute_type = text.strip().partition(":")
+        return cls(size, compute_type or default_compute_type)
+
+    def estimated_bytes(self) -> int:
+        megabytes = FLOAT16_MODEL_MB.get(self.size, UNKNOWN_MODEL_MB) * COMPUTE_TYPE_SCALE.get(self.compute_type, 1.0)
+        return int(megabytes * 1024 * 1024)
+
+
+class ModelRegistry:
+    # Loaded Whisper models keyed by size and compute type, evicted least-recently-used once their
+    # estimated size exceeds the budget. Pinned models (the default one) are never evicted;
+    # concurrent requests for a model that is still loading wait for the same load. `copies` scales
+    # the estimates when every model is loaded as several replicas (worker-pool mode).
+    def __init__(
+        self,
+        loader: Callable[[ModelSpec], Any],
+        budget_bytes: int = 0,
+        allowed: set[str] | None = None,
+        copies: int = 1,
+    ):
+        self._loader = loader
+        self.budget_bytes = budget_bytes
+        self.allowed = allowed
+        self.copies = max(1, copies)
+        self._models: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+        self._pinned: set[str] = set()
+        self._loading: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def add(self, spec: ModelSpec, model: Any, pinned: bool = False) -> None:
+        with self._lock:
+            self._models[spec.key] = (model, self._size(spec))
+            if pinned:
+                self._pinned.add(spec.key)
+
+    def check(self, spec: ModelSpec) -> None:
+        if self.allowed is not None and spec.key not in self.allowed:
+            raise UnknownModelError(f"Model '{spec.key}' is not enabled. Options: {sorted(self.allowed)}")
+
+    def get(self, spec: ModelSpec) -> Any:
+        self.check(spec)
+        with self._lock:
+            entry = self._models.get(spec.key)
+            if entry is not None:
+                self._models.move_to_end(spec.key)
+                self.hits += 1
+                return entry[0]
+            future = self._loading.get(spec.key)
+            owner = future is None
+            evicted = []
+            if owner:
+                future = self._loading[spec.key] = Future()
+                evicted = self._make_room(self._size(spec))
+
+        for model in evicted:
+            _close(model)
+        if not owner:
+            return future.result()
+
+        try:
+            model = self._loader(spec)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[spec.key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._models[spec.key] = (model, self._size(spec))
+            del self._loading[spec.key]
+            self.loads += 1
+        future.set_result(model)
+        return model
+
+    def _size(self, spec: ModelSpec) -> int:
+        return spec.estimated_bytes() * self.copies
+
+    def _make_room(self, needed: int) -> list[Any]:
+        # Called with the lock held, before loading, so the old model is released first. Requests
+        # still decoding on an evicted model keep it alive until they finish; the caller closes
+        # evicted worker pools, which lets their queued jobs finish before the processes exit.
+        evicted: list[Any] = []
+        if self.budget_bytes <= 0:
+            return evicted
+        used = sum(size for _, size in self._models.values())
+        for key in list(self._models):
+            if used + needed <= self.budget_bytes:
+                return evicted
+            if key in self._pinned:
+                continue
+            model, size = self._models.pop(key)
+            used -= size
+            evicted.append(model)
+            self.evictions += 1
+            logger.info("Evicted Whisper model %s to stay within the memory budget", key)
+        if used + needed > self.budget_bytes:
+            logger.warning("Loading a Whisper model beyond the memory budget (%d MB)", self.budget_bytes // 2**20)
+        return evicted
+
+    def close(self) -> None:
+        with self._lock:
+            models = [model for model, _ in self._models.values()]
+            self._models.clear()
+            self._pinned.clear()
+        for model in models:
+            _close(model)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": list(self._models),
+                "loading": list(self._loading),
+                "estimated_bytes": sum(size for _, size in self._models.values()),
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
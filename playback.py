@@ -0,0 +1,133 @@
+import threading
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+class PCMRingBuffer:
+    def __init__(self, capacity: int):
+        self._data = np.zeros(capacity, dtype=np.int16)
+        self._capacity = capacity
+        self._cond = threading.Condition()
+        self._read = 0
+        self._written = 0
+        self._closed = False
+        # Bumped by clear(), so writes queued for audio that was cut off are dropped too.
+        self._generation = 0
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return self._written - self._read
+
+    @property
+    def generation(self) -> int:
+        with self._cond:
+            return self._generation
+
+    @property
+    def played(self) -> int:
+        # Samples handed to the output (or dropped by clear()) since the buffer was created.
+        with self._cond:
+            return self._read
+
+    @property
+    def written(self) -> int:
+        with self._cond:
+            return self._written
+
+    def write(self, samples: np.ndarray, generation: int | None = None) -> bool:
+        # Blocks while the buffer is full; long clips are written piecewise as playback frees space.
+        # Returns False if the buffer was closed, or cleared after `generation` was read.
+        offset = 0
+        while offset < len(samples):
+            with self._cond:
+                if generation is None:
+                    generation = self._generation
+                while (
+                    self._written - self._read >= self._capacity
+                    and not self._closed
+                    and self._generation == generation
+                ):
+                    self._cond.wait()
+                if self._closed or self._generation != generation:
+                    return False
+                free = self._capacity - (self._written - self._read)
+                count = min(free, len(samples) - offset)
+                start = self._written % self._capacity
+                first = min(count, self._capacity - start)
+                self._data[start : start + first] = samples[offset : offset + first]
+                self._data[: count - first] = samples[offset + first : offset + count]
+                self._written += count
+                offset += count
+        return True
+
+    def read_into(self, out: np.ndarray) -> int:
+        # Called from the audio callback: never blocks, pads with silence on underrun.
+        with self._cond:
+            count = min(len(out), self._written - self._read)
+            start = self._read % self._capacity
+            first = min(count, self._capacity - start)
+            out[:first] = self._data[start : start + first]
+            out[first:count] = self._data[: count - first]
+            out[count:] = 0
+            self._read += count
+            self._cond.notify_all()
+            return count
+
+    def wait_empty(self, timeout: float | None = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self._written == self._read or self._closed, timeout)
+
+    def clear(self) -> None:
+        with self._cond:
+            self._read = self._written
+            self._generation += 1
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class SpeechPlayer:
+    # One long-lived output stream fed from a ring buffer, so consecutive clips play back to
+    # back instead of reopening the device (and waiting on it) for every sentence.
+    def __init__(self, buffer_seconds: float = 30.0, blocksize: int = 512):
+        self.ring = PCMRingBuffer(int(buffer_seconds * SAMPLE_RATE))
+        self.blocksize = blocksize
+        self._stream = None
+
+    def start(self) -> None:
+        import sounddevice as sd
+
+        self._stream = sd.OutputStream(
+            samplerate=SAMPLE_RATE,
+            channels=1,
+            dtype="int16",
+            blocksize=self.blocksize,
+            callback=self._callback,
+        )
+        self._stream.start()
+
+    def _callback(self, outdata, frames, callback_time, status) -> None:
+        self.ring.read_into(outdata[:, 0])
+
+    def enqueue(self, pcm: np.ndarray, generation: int | None = None) -> bool:
+        return self.ring.write(pcm, generation)
+
+    def drain(self, timeout: float | None = None) -> bool:
+        return self.ring.wait_empty(timeout)
+
+    def stop(self) -> None:
+        # Playback goes silent from the next output block (blocksize / 16 kHz, 32 ms by default).
+        self.ring.clear()
+
+    def close(self) -> None:
+        self.ring.close()
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
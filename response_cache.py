@@ -0,0 +1,140 @@
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass(frozen=True)
+class CachedReply:
+    sentences: tuple[str, ...]
+    # Synthesized audio per sentence, in the output format the entry was stored for.
+    audio: tuple[bytes, ...]
+    expires_at: float
+
+    @property
+    def size(self) -> int:
+        return sum(len(audio) for audio in self.audio) + sum(len(s.encode("utf-8")) for s in self.sentences)
+
+
+def normalize(text: str) -> str:
+    # "Olá!", "olá" and " OLÁ. " are the same utterance; punctuation and case come from Whisper, not the user.
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+class ResponseCache:
+    # Whole replies (sentences plus their audio) for short, context-free utterances. The key leaves
+    # out the conversation history, so only turns that open a conversation are cached by default;
+    # an `allow` pattern (matched against the normalized transcript) names turns that are safe at
+    # any point, and `deny` always wins.
+    def __init__(
+        self,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl_s: float = 3600.0,
+        max_chars: int = 80,
+        allow: str | None = None,
+        deny: str | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.max_chars = max_chars
+        self.allow = re.compile(allow) if allow else None
+        self.deny = re.compile(deny) if deny else None
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, CachedReply] = OrderedDict()
+        self._bytes = 0
+        self._counters = {"hits": 0, "misses": 0, "expired": 0, "skipped": 0, "evictions": 0}
+
+    def cacheable(self, normalized: str, opening: bool = False) -> bool:
+        if not normalized or len(normalized) > self.max_chars:
+            return False
+        if self.deny is not None and self.deny.search(normalized):
+            return False
+        if self.allow is None:
+            # Mid-conversation turns like "yes" or "repeat that" mean something different every time.
+            return opening
+        return self.allow.fullmatch(normalized) is not None
+
+    @staticmethod
+    def key(normalized: str, language: str, system_prompt: str, model: str, output_format: str) -> str:
+        material = "\0".join((normalized, language, system_prompt, model, output_format))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(
+        self,
+        user_text: str,
+        language: str,
+        system_prompt: str,
+        model: str,
+        output_format: str,
+        opening: bool = False,
+    ) -> CachedReply | None:
+        normalized = normalize(user_text)
+        with self._lock:
+            if not self.cacheable(normalized, opening):
+                self._counters["skipped"] += 1
+                return None
+            key = self.key(normalized, language, system_prompt, model, output_format)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            if entry.expires_at <= self.clock():
+                self._remove(key)
+                self._counters["expired"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry
+
+    def put(
+        self,
+        user_text: str,
+        language: str,
+        system_prompt: str,
+        model: str,
+        output_format: str,
+        sentences: list[str],
+        audio: list[bytes],
+        opening: bool = False,
+    ) -> bool:
+        normalized = normalize(user_text)
+        if not sentences or len(sentences) != len(audio) or not self.cacheable(normalized, opening):
+            return False
+        entry = CachedReply(tuple(sentences), tuple(audio), self.clock() + self.ttl_s)
+        if entry.size > self.max_bytes:
+            return False
+
+        key = self.key(normalized, language, system_prompt, model, output_format)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._counters["evictions"] += 1
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl_s,
+            }
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
@@ -1,12 +1,21 @@
 import argparse
+import glob
+import hashlib
+import http.client
 import sys
 import json
 import os
+import shutil
+import tempfile
+import threading
 import urllib.request
 import urllib.error
+import urllib.parse
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 API_URL = "http://localhost:8000"
+UPLOAD_CHUNK = 64 * 1024
 
 def check_health():
     try:
@@ -31,6 +40,101 @@ def check_health():
 
 # --- FILE TOOLS (Zero Dependency) ---
 
+def _multipart(filename, boundary, fields=None):
+    # Returns (length, chunk factory): the file is read from disk while it is sent, never held whole.
+    head = ''.join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+        for name, value in (fields or {}).items()
+    )
+    head = (
+        head + f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="file"; filename="{os.path.basename(filename)}"\r\n'
+        'Content-Type: application/octet-stream\r\n\r\n'
+    ).encode()
+    tail = f'\r\n--{boundary}--\r\n'.encode()
+
+    def chunks():
+        yield head
+        with open(filename, 'rb') as f:
+            while True:
+                chunk = f.read(UPLOAD_CHUNK)
+                if not chunk:
+                    break
+                yield chunk
+        yield tail
+
+    return len(head) + os.path.getsize(filename) + len(tail), chunks
+
+
+class Connection:
+    # One keep-alive HTTP connection per worker thread, reopened when the server has dropped it.
+    _local = threading.local()
+
+    @classmethod
+    def request(cls, method, path, body=None, headers=None):
+        for attempt in range(2):
+            conn = getattr(cls._local, "conn", None)
+            if conn is None:
+                url = urllib.parse.urlsplit(API_URL)
+                conn_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+                conn = cls._local.conn = conn_class(url.hostname, url.port, timeout=300)
+            try:
+                conn.request(method, path, body=body() if callable(body) else body, headers=headers or {})
+                response = conn.getresponse()
+                return response.status, response
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                cls._local.conn = None
+                if attempt:
+                    raise
+
+
+def _file_hash(filename):
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        while True:
+            chunk = f.read(UPLOAD_CHUNK)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _store(cache_dir, cache_path, write):
+    # Each writer gets its own temp file, so duplicate inputs in one batch never interleave their bytes.
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def transcribe_request(filename, cache_dir=None, priority=None):
+    cache_path = None
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, f"{_file_hash(filename)}.json")
+        if os.path.exists(cache_path):
+            with open(cache_path) as f:
+                return json.load(f)
+
+    boundary = uuid.uuid4().hex
+    length, chunks = _multipart(filename, boundary, {'priority': priority} if priority else None)
+    headers = {'Content-Type': f'multipart/form-data; boundary={boundary}', 'Content-Length': str(length)}
+    status, response = Connection.request("POST", "/transcribe", body=chunks, headers=headers)
+    payload = response.read().decode()
+    if status != 200:
+        raise RuntimeError(f"API Error {status}: {payload}")
+    result = json.loads(payload)
+
+    if cache_path:
+        _store(cache_dir, cache_path, lambda f: f.write(json.dumps(result).encode()))
+    return result
+
+
 def transcribe(filename):
     if not os.path.exists(filename):
         print(f"❌ File not found: {filename}")
@@ -38,69 +142,137 @@ def transcribe(filename):
 
     try:
         print(f"📤 Transcribing {filename}...")
-        
-        # Multipart upload using standard library
-        boundary = uuid.uuid4().hex
-        headers = {'Content-Type': f'multipart/form-data; boundary={boundary}'}
-
-        data = b''
-        data += f'--{boundary}\r\n'.encode()
-        data += f'Content-Disposition: form-data; name="file"; filename="{os.path.basename(filename)}"\r\n'.encode()
-        data += b'Content-Type: application/octet-stream\r\n\r\n'
-        with open(filename, 'rb') as f:
-            data += f.read()
-        data += f'\r\n--{boundary}--\r\n'.encode()
-
-        req = urllib.request.Request(f"{API_URL}/transcribe", data=data, headers=headers)
-        
-        with urllib.request.urlopen(req) as response:
-            if response.status == 200:
-                resp_data = json.loads(response.read().decode())
-                text = resp_data.get("text", "")
-                print(f"📝 Transcription: \"{text}\"")
-            else:
-                print(f"❌ API Error: {response.read().decode()}")
-
+        text = transcribe_request(filename).get("text", "")
+        print(f"📝 Transcription: \"{text}\"")
     except Exception as e:
         print(f"❌ Error transcribing: {e}")
 
+def transcribe_long(filename):
+    # Hour-long recordings: segments are printed as JSON lines while the server is still decoding.
+    if not os.path.exists(filename):
+        print(f"❌ File not found: {filename}", file=sys.stderr)
+        return 1
+    boundary = uuid.uuid4().hex
+    length, chunks = _multipart(filename, boundary)
+    headers = {'Content-Type': f'multipart/form-data; boundary={boundary}', 'Content-Length': str(length)}
+    status, response = Connection.request("POST", "/transcribe/long", body=chunks, headers=headers)
+    if status != 200:
+        print(f"❌ API Error {status}: {response.read().decode()}", file=sys.stderr)
+        return 1
+    failed = 0
+    for line in response:
+        event = json.loads(line)
+        failed |= event.get("type") == "error"
+        print(json.dumps(event, ensure_ascii=False), flush=True)
+    return failed
+
+
+def _format_for(output_file):
+    # Determine format from extension; the server wraps or encodes WAV and Ogg/Opus itself.
+    ext = os.path.splitext(output_file)[1].lower()
+    if ext == ".wav":
+        return "wav"
+    if ext in (".ogg", ".opus"):
+        # Ogg/Opus is the WhatsApp voice-note format
+        return "opus"
+    return "mp3"
+
+
+def synthesize_request(text, output_file, cache_dir=None):
+    fmt = _format_for(output_file)
+    cache_path = None
+    if cache_dir:
+        key = hashlib.sha256(f"{fmt}\0{text}".encode('utf-8')).hexdigest()
+        cache_path = os.path.join(cache_dir, f"{key}.{fmt}")
+        if os.path.exists(cache_path):
+            shutil.copyfile(cache_path, output_file)
+            return output_file
+
+    data = json.dumps({"text": text, "format": fmt}).encode('utf-8')
+    status, response = Connection.request("POST", "/tts", body=data, headers={'Content-Type': 'application/json'})
+    if status != 200:
+        raise RuntimeError(f"API Error {status}: {response.read().decode()}")
+    with open(output_file, 'wb') as f:
+        while True:
+            chunk = response.read(8192)
+            if not chunk:
+                break
+            f.write(chunk)
+
+    if cache_path:
+        def copy(f):
+            with open(output_file, 'rb') as src:
+                shutil.copyfileobj(src, f)
+
+        _store(cache_dir, cache_path, copy)
+    return output_file
+
+
 def synthesize(text, output_file):
     if not text:
         print("❌ No text provided.")
         return
 
     try:
-        # Determine format from extension
-        ext = os.path.splitext(output_file)[1].lower()
-        fmt = "mp3"
-        if ext == ".wav":
-            fmt = "pcm"
-        elif ext == ".ogg":
-            # Force MP3 for OGG files to ensure WhatsApp mobile compatibility
-            fmt = "mp3"
-        elif ext == ".mp3":
-            fmt = "mp3"
-        
-        print(f"🗣️  Synthesizing to {output_file} (format: {fmt})...")
-        
-        headers = {'Content-Type': 'application/json'}
-        data = json.dumps({"text": text, "format": fmt}).encode('utf-8')
-        req = urllib.request.Request(f"{API_URL}/tts", data=data, headers=headers)
-        
-        with urllib.request.urlopen(req) as response:
-            with open(output_file, 'wb') as f:
-                # Read safely
-                while True:
-                    chunk = response.read(8192)
-                    if not chunk:
-                        break
-                    f.write(chunk)
-                
+        print(f"🗣️  Synthesizing to {output_file} (format: {_format_for(output_file)})...")
+        synthesize_request(text, output_file)
         print(f"✅ Audio saved to {output_file}")
 
     except Exception as e:
         print(f"❌ Error synthesizing: {e}")
 
+# --- BATCH TOOLS ---
+
+def _expand(patterns):
+    # Files, globs, or "-" to read one path per line from stdin.
+    files = []
+    for pattern in patterns:
+        if pattern == "-":
+            files += [line.strip() for line in sys.stdin if line.strip()]
+        else:
+            files += sorted(glob.glob(pattern, recursive=True)) or [pattern]
+    return files
+
+
+def _run_batch(items, fn, workers, label=lambda item: item):
+    # Results are printed as JSON lines in input order while up to `workers` requests run.
+    def safe(item):
+        try:
+            return {"input": label(item), **fn(item)}
+        except Exception as e:
+            return {"input": label(item), "error": str(e)}
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for result in pool.map(safe, items):
+            failed += "error" in result
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+    return failed
+
+
+def batch_transcribe(patterns, workers=4, cache_dir=None):
+    files = _expand(patterns)
+    # Sent as "batch" priority so the server keeps serving live conversations first.
+    return _run_batch(files, lambda filename: transcribe_request(filename, cache_dir, priority='batch'), workers)
+
+
+def batch_synthesize(source, output_dir, fmt="mp3", workers=4, cache_dir=None):
+    # One text per line of `source` ("-" for stdin); outputs are numbered by line.
+    if source == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    texts = [line.strip() for line in lines if line.strip()]
+    os.makedirs(output_dir, exist_ok=True)
+    ext = {"opus": "ogg"}.get(fmt, fmt)
+    items = [(text, os.path.join(output_dir, f"{i:04d}.{ext}")) for i, text in enumerate(texts, 1)]
+
+    def synth(item):
+        return {"output": synthesize_request(item[0], item[1], cache_dir)}
+
+    return _run_batch(items, synth, workers, label=lambda item: item[0])
+
 def main():
     parser = argparse.ArgumentParser(description="Voice Agent Skill Client")
     subparsers = parser.add_subparsers(dest="command", required=True)
@@ -110,9 +282,24 @@ def main():
     transcribe_parser = subparsers.add_parser("transcribe", help="Transcribe audio file")
     transcribe_parser.add_argument("file", type=str, help="Path to audio file")
     
+    long_parser = subparsers.add_parser("transcribe-long", help="Transcribe a long recording, streaming segments")
+    long_parser.add_argument("file", type=str, help="Path to audio file")
+
     synth_parser = subparsers.add_parser("synthesize", help="Synthesize text to file")
     synth_parser.add_argument("text", type=str, help="Text to speak")
     synth_parser.add_argument("--output", "-o", type=str, required=True, help="Output audio file path")
+
+    batch_stt = subparsers.add_parser("batch-transcribe", help="Transcribe many files concurrently (JSON lines)")
+    batch_stt.add_argument("files", nargs="+", help="Audio files or globs; '-' reads paths from stdin")
+    batch_stt.add_argument("--workers", "-j", type=int, default=4, help="Requests in flight")
+    batch_stt.add_argument("--cache", type=str, help="Directory caching results by file hash")
+
+    batch_tts = subparsers.add_parser("batch-synthesize", help="Synthesize one file per text line (JSON lines)")
+    batch_tts.add_argument("texts", help="File with one text per line, or '-' for stdin")
+    batch_tts.add_argument("--output-dir", "-o", type=str, required=True, help="Directory for numbered outputs")
+    batch_tts.add_argument("--format", choices=["mp3", "wav", "opus"], default="mp3", help="Output format")
+    batch_tts.add_argument("--workers", "-j", type=int, default=4, help="Requests in flight")
+    batch_tts.add_argument("--cache", type=str, help="Directory caching audio by text hash")
     
     args = parser.parse_args()
     
@@ -122,8 +309,17 @@ def main():
             sys.exit(1)
     elif args.command == "transcribe":
         transcribe(args.file)
+    elif args.command == "transcribe-long":
+        if transcribe_long(args.file):
+            sys.exit(1)
     elif args.command == "synthesize":
         synthesize(args.text, args.output)
+    elif args.command == "batch-transcribe":
+        if batch_transcribe(args.files, args.workers, args.cache):
+            sys.exit(1)
+    elif args.command == "batch-synthesize":
+        if batch_synthesize(args.texts, args.output_dir, args.format, args.workers, args.cache):
+            sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,265 @@
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
+
+from voice_activity import FRAME_SAMPLES, SAMPLE_RATE, SpeechEndpointer
+
+logger = logging.getLogger(__name__)
+
+# (audio, language, initial_prompt) -> ([(start_s, end_s, text), ...], language)
+TranscribeSegments = Callable[[np.ndarray, str | None, str | None], tuple[list[tuple[float, float, str]], str]]
+
+
+class AudioBuffer:
+    # Growable float32 buffer with amortized appends, so an utterance is never re-concatenated.
+    def __init__(self, capacity: int = SAMPLE_RATE * 4):
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def append(self, samples: np.ndarray) -> None:
+        needed = self._end + len(samples)
+        if needed > len(self._data):
+            size = len(self)
+            if size + len(samples) > len(self._data) // 2:
+                grown = np.zeros(max(len(self._data) * 2, size + len(samples)), dtype=np.float32)
+                grown[:size] = self._data[self._start : self._end]
+                self._data = grown
+            else:
+                self._data[:size] = self._data[self._start : self._end]
+            self._start, self._end = 0, size
+        self._data[self._end : self._end + len(samples)] = samples
+        self._end += len(samples)
+
+    def drop_front(self, count: int) -> None:
+        self._start = min(self._end, self._start + count)
+
+    def view(self) -> np.ndarray:
+        return self._data[self._start : self._end]
+
+
+@dataclass
+class _Utterance:
+    origin: int
+    buffer: AudioBuffer = field(default_factory=AudioBuffer)
+    # Global sample index of buffer[0]; moves forward as committed audio is dropped.
+    offset: int = 0
+    end: int = 0
+    committed: list[str] = field(default_factory=list)
+    previous_words: list[str] = field(default_factory=list)
+    since_partial: int = 0
+
+
+def _common_prefix(a: list[str], b: list[str]) -> list[str]:
+    size = 0
+    for left, right in zip(a, b):
+        if left != right:
+            break
+        size += 1
+    return b[:size]
+
+
+class StreamingTranscriber:
+    def __init__(
+        self,
+        transcribe_segments: TranscribeSegments,
+        vad,
+        language: str | None = None,
+        min_silence_ms: float = 500,
+        pre_roll_ms: float = 200,
+        partial_interval_ms: float = 600,
+        window_s: float = 10.0,
+        prompt_chars: int = 200,
+    ):
+        self.transcribe_segments = transcribe_segments
+        self.language = language
+        self.endpointer = SpeechEndpointer(vad, min_silence_ms=min_silence_ms, pre_roll_ms=pre_roll_ms)
+        self.partial_samples = int(partial_interval_ms / 1000 * SAMPLE_RATE)
+        self.window_samples = int(window_s * SAMPLE_RATE)
+        self.prompt_chars = prompt_chars
+
+        self._leftover = np.zeros(0, dtype=np.float32)
+        self._position = 0
+        self._current: _Utterance | None = None
+        self._closed: deque[_Utterance] = deque()
+
+    @property
+    def partial_due(self) -> bool:
+        return self._current is not None and self._current.since_partial >= self.partial_samples
+
+    @property
+    def final_ready(self) -> bool:
+        return bool(self._closed)
+
+    def push_pcm16(self, data: bytes) -> list[dict]:
+        samples = np.frombuffer(data, dtype="<i2", count=len(data) // 2).astype(np.float32) / 32768.0
+        return self.push(samples)
+
+    def push(self, samples: np.ndarray) -> list[dict]:
+        if len(self._leftover):
+            samples = np.concatenate([self._leftover, samples])
+        usable = len(samples) - len(samples) % FRAME_SAMPLES
+
+        events: list[dict] = []
+        for start in range(0, usable, FRAME_SAMPLES):
+            frame = samples[start : start + FRAME_SAMPLES]
+            event = self.endpointer.process(frame)
+            if event == "start":
+                pre_roll = self.endpointer.take_pre_roll()
+                origin = self._position - len(pre_roll)
+                self._current = _Utterance(origin=origin, offset=origin)
+                self._current.buffer.append(pre_roll)
+                events.append({"type": "speech_start", "start": round(origin / SAMPLE_RATE, 3)})
+
+            if self._current is not None:
+                self._current.buffer.append(frame)
+                self._current.since_partial += FRAME_SAMPLES
+            self._position += FRAME_SAMPLES
+
+            if event == "end" and self._current is not None:
+                self._close_current()
+
+        self._leftover = samples[usable:].copy()
+        return events
+
+    def close(self) -> None:
+        if self._current is not None:
+            self._close_current()
+        self.endpointer.reset()
+
+    def _close_current(self) -> None:
+        self._current.end = self._position
+        self._closed.append(self._current)
+        self._current = None
+
+    def _prompt(self, utterance: _Utterance) -> str | None:
+        prompt = " ".join(utterance.committed)[-self.prompt_chars :]
+        return prompt or None
+
+    def decode_partial(self) -> dict | None:
+        utterance = self._current
+        if utterance is None:
+            return None
+        utterance.since_partial = 0
+
+        segments, _ = self.transcribe_segments(utterance.buffer.view(), self.language, self._prompt(utterance))
+        if len(utterance.buffer) > self.window_samples and len(segments) > 1:
+            # Everything before the last segment is final: commit its text and drop its audio so
+            # later passes only decode a bounded rolling window.
+            keep_from = int(segments[-1][0] * SAMPLE_RATE)
+            utterance.committed.extend(text.strip() for _, _, text in segments[:-1])
+            utterance.buffer.drop_front(keep_from)
+            utterance.offset += keep_from
+            utterance.previous_words = []
+            segments = segments[-1:]
+
+        words = " ".join(text.strip() for _, _, text in segments).split()
+        stable = _common_prefix(utterance.previous_words, words)
+        utterance.previous_words = words
+        return {
+            "type": "partial",
+            "text": " ".join(utterance.committed + words),
+            "stable": " ".join(utterance.committed + stable),
+        }
+
+    def discard_final(self) -> None:
+        if self._closed:
+            self._closed.popleft()
+
+    def decode_final(self) -> dict | None:
+        if not self._closed:
+            return None
+        utterance = self._closed.popleft()
+        segments, language = self.transcribe_segments(utterance.buffer.view(), self.language, self._prompt(utterance))
+        text = " ".join(utterance.committed + [text.strip() for _, _, text in segments]).strip()
+        if not text:
+            return None
+        return {
+            "type": "final",
+            "text": text,
+            "language": language,
+            "start": round(utterance.origin / SAMPLE_RATE, 3),
+            "end": round(utterance.end / SAMPLE_RATE, 3),
+        }
+
+
+class IncrementalTranscriber:
+    # Decodes an utterance in the background while it is still being captured. Segments that
+    # two consecutive passes agree on (and that end well before the live edge) are committed
+    # and never decoded again, so end of speech only pays for the uncommitted tail.
+    def __init__(
+        self,
+        transcribe_segments: TranscribeSegments,
+        language: str | None = None,
+        interval_ms: float = 800,
+        edge_margin_s: float = 1.0,
+        prompt_chars: int = 200,
+    ):
+        self.transcribe_segments = transcribe_segments
+        self.language = language
+        self.interval = interval_ms / 1000
+        self.edge_margin = int(edge_margin_s * SAMPLE_RATE)
+        self.prompt_chars = prompt_chars
+
+        self.committed: list[str] = []
+        self.committed_samples = 0
+        self.tail_samples = 0
+        self._previous: list[tuple[float, float, str]] = []
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _prompt(self) -> str | None:
+        prompt = " ".join(self.committed)[-self.prompt_chars :]
+        return prompt or None
+
+    def start(self, get_audio: Callable[[], np.ndarray]) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(get_audio,), name="speculative-stt", daemon=True)
+        self._thread.start()
+
+    def _run(self, get_audio: Callable[[], np.ndarray]) -> None:
+        while not self._stop.wait(self.interval):
+            audio = get_audio()
+            if len(audio) - self.committed_samples < self.edge_margin * 2:
+                continue
+            try:
+                self._advance(audio)
+            except Exception:
+                logger.exception("Speculative transcription pass failed")
+                return
+
+    def _advance(self, audio: np.ndarray) -> None:
+        window = audio[self.committed_samples :]
+        segments, _ = self.transcribe_segments(window, self.language, self._prompt())
+        live_edge = (len(window) - self.edge_margin) / SAMPLE_RATE
+
+        agreed = 0
+        for current, previous in zip(segments[:-1], self._previous):
+            if current[2].strip() != previous[2].strip() or current[1] > live_edge:
+                break
+            agreed += 1
+
+        if agreed:
+            self.committed.extend(text.strip() for _, _, text in segments[:agreed])
+            self.committed_samples += int(segments[agreed - 1][1] * SAMPLE_RATE)
+            self._previous = []
+        else:
+            self._previous = segments
+
+    def finish(self, audio: np.ndarray) -> str:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        tail = audio[self.committed_samples :]
+        self.tail_samples = len(tail)
+        segments, _ = self.transcribe_segments(tail, self.language, self._prompt()) if len(tail) else ([], None)
+        return " ".join(self.committed + [text.strip() for _, _, text in segments]).strip()
@@ -1,22 +1,115 @@
+import io
+import json
+import threading
+import time
 import unittest
+import wave
+from types import SimpleNamespace
+from unittest import mock
 
+import numpy as np
+from fastapi import WebSocketDisconnect
 from fastapi.testclient import TestClient
 
 from api import create_app
+from async_clients import ThreadedOpenAI
+from inference import InferenceExecutor, QueueFullError
+from model_registry import UnknownModelError
+from response_cache import ResponseCache
+from voice_runtime import Transcription, UnsupportedLanguageError
+
+
+def make_wav(seconds: float = 0.5, sample_rate: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(np.zeros(int(seconds * sample_rate), dtype=np.int16).tobytes())
+    return buffer.getvalue()
+
+
+class FakeCompletions:
+    calls = 0
+
+    def create(self, model, messages, stream):
+        self.messages = messages
+        self.calls += 1
+        for token in ["Olá! ", "Tudo ", "bem?"]:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
 
 
 class FakeServices:
     def __init__(self):
         self.language = "pt"
         self.current_config = {"whisper_lang": "pt"}
-        self.voice_config = {"pt": {"voice_id": "Camila"}, "en": {"voice_id": "Joanna"}}
+        self.voice_config = {
+            "pt": {"voice_id": "Camila", "whisper_lang": "pt", "system_prompt": "Seja breve."},
+            "en": {"voice_id": "Joanna", "whisper_lang": "en", "system_prompt": "Be brief."},
+        }
+        self.config = SimpleNamespace(llm_model="fake-llm", segment_first_clause_chars=0, segment_min_chars=0)
+        self.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+        self.async_openai = ThreadedOpenAI(self.openai_client)
+        self.transcribed = []
+        self.budgets = []
+        self.decode_error = None
+        self.is_ready = True
+        self.load_error = None
+        self.startup_timings = {"whisper_load": 0.1}
 
-    def transcribe_file(self, filename: str, language: str | None = None):
+    def transcribe_file(self, audio, language: str | None = None, model: str | None = None):
+        self.transcribed.append(audio)
+        if model not in (None, "small"):
+            raise UnknownModelError(f"Model '{model}' is not enabled")
         return "ola mundo", language or "pt"
 
+    def transcribe(self, audio, language: str | None = None, model: str | None = None, budget_s: float | None = None):
+        self.budgets.append(budget_s)
+        text, lang = self.transcribe_file(audio, language=language, model=model)
+        return Transcription(text, lang, "fast_decode" if budget_s is not None else "none")
+
+    def transcribe_chunk(self, audio, offset_s, language=None, model=None, total_s=0.0):
+        if model not in (None, "small"):
+            raise UnknownModelError(f"Model '{model}' is not enabled")
+        # Earlier chunks finish last, so ordered output has to wait for them.
+        time.sleep(max(0.0, 0.05 - offset_s / 100))
+        self.transcribed.append(offset_s)
+        return [(offset_s, offset_s + len(audio) / 16000, f" chunk {offset_s:.0f}")], language or "pt"
+
+    def route(self, audio_seconds: float, model: str | None = None):
+        if model not in (None, "small"):
+            raise UnknownModelError(f"Model '{model}' is not enabled")
+        return model
+
+    def check_language(self, language: str | None, audio_seconds: float = 0.0, model: str | None = None):
+        self.route(audio_seconds, model)
+        if language not in (None, "auto", "pt", "en"):
+            raise UnsupportedLanguageError(f"Language '{language}' is not supported by this model")
+
+    def transcribe_segments(
+        self, audio, language: str | None = None, initial_prompt: str | None = None, model: str | None = None
+    ):
+        if self.decode_error is not None:
+            raise self.decode_error
+        self.transcribed.append(audio)
+        return [(0.0, len(audio) / 16000, " ola mundo")], language or "pt"
+
     def synthesize_speech(self, text: str, language: str, output_format: str):
         return b"audio-bytes"
 
+    async def asynthesize_speech(self, text: str, language: str, output_format: str):
+        return b"audio-bytes"
+
+    async def astream_speech(self, text: str, language: str, output_format: str):
+        yield b"audio-"
+        yield b"bytes"
+
+    async def aclose(self):
+        pass
+
+    def close(self):
+        pass
+
 
 class ApiTests(unittest.TestCase):
     def test_health(self):
@@ -27,10 +120,36 @@ class ApiTests(unittest.TestCase):
         self.assertEqual(resp.json()["status"], "ok")
         self.assertEqual(resp.json()["mode"], "pt")
 
+    def test_probes_separate_liveness_from_readiness(self):
+        def starting():
+            services = FakeServices()
+            services.is_ready = False
+            return services
+
+        app = create_app(services_factory=starting)
+        with TestClient(app) as client:
+            self.assertEqual(client.get("/health/live").status_code, 200)
+            ready = client.get("/health/ready")
+            self.assertEqual(ready.status_code, 503)
+            self.assertEqual(ready.json()["status"], "starting")
+            self.assertEqual(client.get("/health").json()["status"], "starting")
+            tts = client.post("/tts", json={"text": "x", "language": "pt", "format": "mp3"})
+            self.assertEqual(tts.status_code, 503)
+            self.assertIn("retry-after", tts.headers)
+
+            app.state.services.is_ready = True
+            ready = client.get("/health/ready")
+        self.assertEqual(ready.status_code, 200)
+        self.assertEqual(ready.json()["startup"], {"whisper_load": 0.1})
+
     def test_tts_validation(self):
         app = create_app(services_factory=FakeServices)
         with TestClient(app) as client:
-            resp = client.post("/tts", json={"text": "x", "language": "pt", "format": "wav"})
+            resp = client.post("/tts", json={"text": "x", "language": "pt", "format": "flac"})
+            self.assertEqual(resp.status_code, 400)
+            resp = client.post("/tts", json={"text": "x", "format": "opus", "bitrate": 1000})
+            self.assertEqual(resp.status_code, 400)
+            resp = client.post("/tts", json={"text": "x", "format": "wav", "sample_rate": 24000})
         self.assertEqual(resp.status_code, 400)
 
     def test_tts_success(self):
@@ -45,12 +164,272 @@ class ApiTests(unittest.TestCase):
         with TestClient(app) as client:
             resp = client.post(
                 "/transcribe",
-                files={"file": ("sample.wav", b"dummy-audio", "audio/wav")},
+                files={"file": ("sample.wav", make_wav(), "audio/wav")},
             )
+            audio = app.state.services.transcribed[0]
         self.assertEqual(resp.status_code, 200)
         payload = resp.json()
         self.assertEqual(payload["text"], "ola mundo")
         self.assertEqual(payload["language"], "pt")
+        self.assertEqual(payload["degradation"], "none")
+        self.assertEqual(audio.dtype, np.float32)
+        self.assertEqual(audio.shape, (8000,))
+
+    def test_metrics_exports_stage_histograms(self):
+        app = create_app(services_factory=FakeServices)
+        with TestClient(app) as client:
+            client.post("/transcribe", files={"file": ("sample.wav", make_wav(), "audio/wav")})
+            resp = client.get("/metrics")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("text/plain", resp.headers["content-type"])
+        self.assertIn("# TYPE voice_stage_seconds histogram", resp.text)
+        for stage in ("upload_read", "audio_decode", "stt"):
+            self.assertIn(f'voice_stage_seconds_count{{stage="{stage}"}}', resp.text)
+
+    def test_transcribe_accepts_language_and_model(self):
+        app = create_app(services_factory=FakeServices)
+        with TestClient(app) as client:
+            upload = {"file": ("sample.wav", make_wav(), "audio/wav")}
+            resp = client.post("/transcribe", files=upload, data={"language": "en", "model": "small"})
+            unknown = client.post("/transcribe", files=upload, data={"model": "huge"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["language"], "en")
+        self.assertEqual(unknown.status_code, 400)
+
+    def test_transcribe_passes_the_remaining_deadline_budget(self):
+        app = create_app(services_factory=FakeServices)
+        with TestClient(app) as client:
+            upload = {"file": ("sample.wav", make_wav(), "audio/wav")}
+            resp = client.post("/transcribe", files=upload, data={"priority": "interactive", "deadline_ms": "2000"})
+            expired = client.post("/transcribe", files=upload, data={"deadline_ms": "0"})
+            unknown = client.post("/transcribe", files=upload, data={"priority": "urgent"})
+            budgets = app.state.services.budgets
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["degradation"], "fast_decode")
+        self.assertEqual(len(budgets), 1)
+        self.assertTrue(0 < budgets[0] <= 2.0)
+        self.assertEqual(expired.status_code, 504)
+        self.assertEqual(unknown.status_code, 400)
+
+    def test_long_transcription_streams_ordered_segments(self):
+        app = create_app(services_factory=FakeServices, executor_factory=lambda: InferenceExecutor(workers=4))
+        tone = (np.sin(np.arange(16000 * 2) * 0.2) * 10000).astype(np.int16)
+        pcm = np.concatenate([tone, np.zeros(8000, dtype=np.int16)] * 4)
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(16000)
+            wav.writeframes(pcm.tobytes())
+        upload = {"file": ("call.wav", buffer.getvalue(), "audio/wav")}
+
+        with (
+            mock.patch("api.LONG_AUDIO_CHUNK_S", 3.0),
+            mock.patch("api.LONG_AUDIO_VAD", "energy"),
+            TestClient(app) as client,
+        ):
+            with client.stream("POST", "/transcribe/long", files=upload) as resp:
+                self.assertEqual(resp.headers["content-type"], "application/x-ndjson")
+                events = [json.loads(line) for line in resp.iter_lines() if line]
+            unknown = client.post("/transcribe/long", files=upload, data={"model": "huge"})
+            unsupported = client.post("/transcribe/long", files=upload, data={"language": "xx"})
+            decode_order = app.state.services.transcribed
+
+        segments = [event for event in events if event["type"] == "segment"]
+        self.assertEqual([event["text"] for event in segments], [" chunk 0", " chunk 2", " chunk 5", " chunk 7"])
+        # Each cut falls in one of the half-second pauses after 2 s of tone.
+        for i, event in enumerate(segments[1:], start=1):
+            self.assertTrue(2.5 * i - 0.5 <= event["start"] <= 2.5 * i, event)
+        self.assertEqual(segments[-1]["end"], 10.0)
+        self.assertEqual(events[-1], {"type": "done", "language": "pt", "duration": 10.0, "chunks": 4})
+        self.assertNotEqual(decode_order, sorted(decode_order))
+        self.assertEqual(unknown.status_code, 400)
+        self.assertEqual(unsupported.status_code, 400)
+        self.assertIn("not supported", unsupported.json()["detail"])
+
+    def test_long_transcription_gives_up_on_a_queue_that_stays_full(self):
+        class BusyExecutor(InferenceExecutor):
+            # Refuses chunk decodes `busy` times before taking them.
+            busy = 0
+
+            def submit(self, fn, *args, **kwargs):
+                if getattr(fn, "__name__", "") == "transcribe_chunk" and self.busy:
+                    self.busy -= 1
+                    raise QueueFullError(retry_after=0)
+                return super().submit(fn, *args, **kwargs)
+
+        app = create_app(services_factory=FakeServices, executor_factory=BusyExecutor)
+        upload = {"file": ("call.wav", make_wav(seconds=2.0), "audio/wav")}
+        with mock.patch("api.LONG_AUDIO_VAD", "energy"), TestClient(app) as client:
+
+            def events():
+                resp = client.post("/transcribe/long", files=upload)
+                return [json.loads(line) for line in resp.iter_lines() if line]
+
+            app.state.inference.busy = 3
+            waited = events()
+            app.state.inference.busy = 1000
+            with mock.patch("api.LONG_AUDIO_QUEUE_WAIT_S", 0.0):
+                failed = events()
+
+        self.assertEqual(waited[-1]["type"], "done")
+        self.assertEqual(failed[-1]["type"], "error")
+        self.assertIn("queue is full", failed[-1]["detail"])
+
+    def test_transcribe_rejects_undecodable_upload(self):
+        app = create_app(services_factory=FakeServices)
+        with TestClient(app) as client:
+            resp = client.post(
+                "/transcribe",
+                files={"file": ("sample.wav", b"dummy-audio", "audio/wav")},
+            )
+        self.assertEqual(resp.status_code, 400)
+
+    def test_transcribe_rejects_oversized_upload(self):
+        app = create_app(services_factory=FakeServices)
+        with mock.patch("api.MAX_UPLOAD_BYTES", 1024), TestClient(app) as client:
+            resp = client.post(
+                "/transcribe",
+                files={"file": ("sample.wav", make_wav(seconds=2.0), "audio/wav")},
+            )
+        self.assertEqual(resp.status_code, 413)
+
+    def test_long_recordings_have_their_own_upload_limit(self):
+        app = create_app(services_factory=FakeServices)
+        upload = {"file": ("call.wav", make_wav(seconds=2.0), "audio/wav")}
+        with (
+            mock.patch("api.MAX_UPLOAD_BYTES", 1024),
+            mock.patch("api.MAX_LONG_UPLOAD_BYTES", 1024 * 1024),
+            mock.patch("api.LONG_AUDIO_VAD", "energy"),
+            TestClient(app) as client,
+        ):
+            self.assertEqual(client.post("/transcribe", files=upload).status_code, 413)
+            self.assertEqual(client.post("/transcribe/long", files=upload).status_code, 200)
+            with mock.patch("api.MAX_LONG_UPLOAD_BYTES", 1024):
+                self.assertEqual(client.post("/transcribe/long", files=upload).status_code, 413)
+
+    def test_transcribe_rejects_when_queue_full(self):
+        app = create_app(
+            services_factory=FakeServices,
+            executor_factory=lambda: InferenceExecutor(workers=1, max_queue=0, retry_after=2),
+        )
+        release = threading.Event()
+        with TestClient(app) as client:
+            blocker = app.state.inference.submit(release.wait)
+            try:
+                resp = client.post(
+                    "/transcribe",
+                    files={"file": ("sample.wav", make_wav(), "audio/wav")},
+                )
+            finally:
+                release.set()
+                blocker.result(timeout=5)
+            stats = client.get("/stats").json()["inference"]
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp.headers["retry-after"], "2")
+        self.assertEqual(stats["rejected"], 1)
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertEqual(stats["in_flight"], 0)
+
+    def test_ws_transcribe_streams_final_transcript(self):
+        app = create_app(services_factory=FakeServices)
+        silence = np.zeros(8000, dtype=np.int16)
+        tone = (np.sin(np.arange(16000) * 0.2) * 10000).astype(np.int16)
+        with mock.patch("api.STREAM_VAD", "energy"), TestClient(app) as client:
+            with client.websocket_connect("/ws/transcribe") as ws:
+                for chunk in (silence, tone, silence, silence):
+                    ws.send_bytes(chunk.tobytes())
+                ws.send_text('{"type": "end"}')
+                events = []
+                while not events or events[-1]["type"] != "done":
+                    events.append(ws.receive_json())
+
+        types = [event["type"] for event in events]
+        self.assertEqual(types[0], "speech_start")
+        self.assertIn("partial", types)
+        final = next(event for event in events if event["type"] == "final")
+        self.assertEqual(final["text"], "ola mundo")
+        self.assertLess(final["start"], 0.5)
+        self.assertGreater(final["end"], 1.5)
+
+    def test_ws_transcribe_rejects_unsupported_language_on_connect(self):
+        app = create_app(services_factory=FakeServices)
+        with TestClient(app) as client:
+            with client.websocket_connect("/ws/transcribe?language=xx") as ws:
+                event = ws.receive_json()
+                with self.assertRaises(WebSocketDisconnect) as closed:
+                    ws.receive_json()
+        self.assertEqual(event["type"], "error")
+        self.assertIn("not supported", event["detail"])
+        self.assertEqual(closed.exception.code, 1008)
+
+    def test_ws_transcribe_reports_decode_failures_and_stays_open(self):
+        app = create_app(services_factory=FakeServices)
+        silence = np.zeros(8000, dtype=np.int16)
+        tone = (np.sin(np.arange(16000) * 0.2) * 10000).astype(np.int16)
+        with mock.patch("api.STREAM_VAD", "energy"), TestClient(app) as client:
+            app.state.services.decode_error = RuntimeError("decoder crashed")
+            with client.websocket_connect("/ws/transcribe") as ws:
+                for chunk in (silence, tone, silence, silence):
+                    ws.send_bytes(chunk.tobytes())
+                ws.send_text('{"type": "end"}')
+                events = []
+                while not events or events[-1]["type"] != "done":
+                    events.append(ws.receive_json())
+
+        errors = [event for event in events if event["type"] == "error"]
+        self.assertTrue(errors)
+        self.assertTrue(all(event["detail"] == "decoder crashed" for event in errors))
+        self.assertNotIn("final", [event["type"] for event in events])
+
+    def test_ws_converse_streams_sentence_audio_in_order(self):
+        app = create_app(services_factory=FakeServices)
+        with TestClient(app) as client:
+            with client.websocket_connect("/ws/converse?format=pcm") as ws:
+                ws.send_text('{"type": "text", "text": "Oi"}')
+                events = []
+                while not events or events[-1].get("type") != "turn_end":
+                    message = ws.receive()
+                    events.append(json.loads(message["text"]) if message.get("text") else {"audio": message["bytes"]})
+                ws.send_text('{"type": "end"}')
+                self.assertEqual(ws.receive_json()["type"], "done")
+
+        sentences = [event["text"] for event in events if event.get("type") == "sentence"]
+        self.assertEqual(sentences, ["Olá!", "Tudo bem?"])
+        self.assertEqual(sum(1 for event in events if "audio" in event), 2)
+        self.assertEqual(events[-1]["text"], "Olá! Tudo bem?")
+
+    def test_ws_converse_replays_repeated_utterances_from_the_response_cache(self):
+        def with_cache():
+            services = FakeServices()
+            services.response_cache = ResponseCache()
+            return services
+
+        def converse(client, texts):
+            replies = []
+            with client.websocket_connect("/ws/converse?format=pcm") as ws:
+                for text in texts:
+                    ws.send_text(json.dumps({"type": "text", "text": text}))
+                    while True:
+                        message = ws.receive()
+                        if message.get("text") and json.loads(message["text"])["type"] == "turn_end":
+                            replies.append(json.loads(message["text"])["text"])
+                            break
+                ws.send_text('{"type": "end"}')
+                self.assertEqual(ws.receive_json()["type"], "done")
+            return replies
+
+        app = create_app(services_factory=with_cache)
+        with TestClient(app) as client:
+            # Opening turns are replayed across sessions; a repeat later in a conversation is not,
+            # since its meaning depends on the history the key leaves out.
+            first = converse(client, ["Oi", "oi!"])
+            second = converse(client, ["OI"])
+            services = app.state.services
+
+        self.assertEqual(first + second, ["Olá! Tudo bem?"] * 3)
+        self.assertEqual(services.openai_client.chat.completions.calls, 2)
+        self.assertEqual(services.response_cache.stats()["hits"], 1)
 
 
 if __name__ == "__main__":
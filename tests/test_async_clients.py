@@ -0,0 +1,68 @@
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+
+import httpx
+from botocore.credentials import Credentials
+
+from async_clients import AsyncPolly, PollyError, RetryBudget
+
+
+def make_polly(handler, max_retries: int = 2, budget: RetryBudget | None = None) -> AsyncPolly:
+    session = SimpleNamespace(get_credentials=lambda: Credentials("AKIDEXAMPLE", "secret"))
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return AsyncPolly(session, "us-east-1", client, max_retries=max_retries, budget=budget)
+
+
+def collect(polly: AsyncPolly, chunk_bytes: int = 4) -> bytes:
+    async def run():
+        try:
+            return b"".join([chunk async for chunk in polly.stream({"Text": "Olá"}, chunk_bytes)])
+        finally:
+            await polly.aclose()
+
+    return asyncio.run(run())
+
+
+class AsyncPollyTests(unittest.TestCase):
+    def test_requests_are_signed_and_audio_streamed(self):
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request)
+            return httpx.Response(200, content=b"audio-bytes")
+
+        self.assertEqual(collect(make_polly(handler)), b"audio-bytes")
+        self.assertEqual(json.loads(seen[0].content), {"Text": "Olá"})
+        self.assertIn("AWS4-HMAC-SHA256", seen[0].headers["authorization"])
+
+    def test_throttling_is_retried(self):
+        responses = [httpx.Response(429, json={"message": "slow down"}), httpx.Response(200, content=b"ok")]
+        self.assertEqual(collect(make_polly(lambda request: responses.pop(0))), b"ok")
+
+    def test_client_errors_are_not_retried(self):
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            return httpx.Response(400, json={"message": "bad voice"}, headers={"x-amzn-ErrorType": "ValidationException"})
+
+        with self.assertRaisesRegex(PollyError, "ValidationException"):
+            collect(make_polly(handler))
+        self.assertEqual(len(calls), 1)
+
+    def test_exhausted_budget_stops_retries(self):
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            return httpx.Response(503, json={"message": "unavailable"})
+
+        with self.assertRaises(PollyError):
+            collect(make_polly(handler, max_retries=5, budget=RetryBudget(ratio=0.0, min_tokens=1.0)))
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import io
+import unittest
+
+import av
+import numpy as np
+
+from audio_encoding import AudioFormat, UnsupportedFormatError, encode_all, make_encoder
+from audio_io import decode_audio_bytes
+
+
+def tone(seconds: float = 1.0, rate: int = 16000) -> bytes:
+    t = np.arange(int(seconds * rate)) / rate
+    return (np.sin(2 * np.pi * 440 * t) * 8000).astype("<i2").tobytes()
+
+
+class AudioFormatTests(unittest.TestCase):
+    def test_parse_validates_rate_and_bitrate(self):
+        self.assertEqual(AudioFormat.parse("opus"), AudioFormat.of("opus"))
+        self.assertEqual(AudioFormat.parse("wav", 8000).source, AudioFormat("pcm", 8000))
+        self.assertEqual(AudioFormat.parse("opus", 48000).polly_format, "pcm")
+        self.assertFalse(AudioFormat.parse("mp3").encoded)
+        with self.assertRaises(UnsupportedFormatError):
+            AudioFormat.parse("flac")
+        with self.assertRaises(UnsupportedFormatError):
+            AudioFormat.parse("wav", 44100)
+        with self.assertRaises(UnsupportedFormatError):
+            AudioFormat.parse("mp3", bitrate=64000)
+
+
+class EncoderTests(unittest.TestCase):
+    def test_streamed_wav_decodes_and_finalized_copy_has_real_sizes(self):
+        pcm = tone(0.5)
+        encoder = make_encoder(AudioFormat.parse("wav"))
+        streamed = encoder.encode(pcm[:1001]) + encoder.encode(pcm[1001:]) + encoder.flush()
+        self.assertEqual(len(decode_audio_bytes(streamed)), 8000)
+
+        complete = encode_all(pcm, AudioFormat.parse("wav"))
+        self.assertEqual(int.from_bytes(complete[40:44], "little"), len(pcm))
+        self.assertEqual(complete[44:], pcm)
+
+    def test_opus_is_emitted_while_streaming(self):
+        pcm = tone(2.0)
+        encoder = make_encoder(AudioFormat.parse("opus", 48000, 32000))
+        # Odd chunk sizes split samples across calls.
+        pieces = [encoder.encode(pcm[i : i + 4095]) for i in range(0, len(pcm), 4095)]
+        data = b"".join(pieces) + encoder.flush()
+
+        self.assertGreater(sum(1 for piece in pieces[:-1] if piece), 5)
+        self.assertLess(len(data), len(pcm) / 4)
+        container = av.open(io.BytesIO(data))
+        stream = container.streams.audio[0]
+        self.assertEqual((stream.codec_context.name, stream.rate), ("opus", 48000))
+        samples = sum(frame.samples for frame in container.decode(audio=0))
+        self.assertAlmostEqual(samples / 48000, 2.0, delta=0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
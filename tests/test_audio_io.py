@@ -0,0 +1,58 @@
+import io
+import struct
+import unittest
+import wave
+
+import numpy as np
+
+from audio_io import AudioDecodeError, decode_audio_bytes
+
+
+def wav_bytes(samples: np.ndarray, sample_rate: int = 16000, channels: int = 1) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.astype(np.int16).tobytes())
+    return buffer.getvalue()
+
+
+def float_wav_bytes(samples: np.ndarray) -> bytes:
+    payload = samples.astype("<f4").tobytes()
+    fmt = struct.pack("<HHIIHH", 3, 1, 16000, 16000 * 4, 4, 32)
+    body = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", len(payload)) + payload
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+class DecodeAudioBytesTests(unittest.TestCase):
+    def test_pcm16_mono_wav(self):
+        samples = np.array([0, 16384, -16384, 32767], dtype=np.int16)
+        audio = decode_audio_bytes(wav_bytes(samples))
+        self.assertEqual(audio.dtype, np.float32)
+        np.testing.assert_allclose(audio, samples / 32768.0, atol=1e-6)
+
+    def test_float32_wav_is_a_view_of_the_upload(self):
+        samples = np.linspace(-1, 1, 160, dtype=np.float32)
+        data = bytearray(float_wav_bytes(samples))
+        audio = decode_audio_bytes(data)
+        np.testing.assert_array_equal(audio, samples)
+        self.assertTrue(np.shares_memory(audio, np.frombuffer(data, dtype=np.uint8)))
+
+    def test_stereo_wav_is_downmixed(self):
+        interleaved = np.array([1000, 3000, -2000, 2000], dtype=np.int16)
+        audio = decode_audio_bytes(wav_bytes(interleaved, channels=2))
+        np.testing.assert_allclose(audio, np.array([2000, 0]) / 32768.0, atol=1e-6)
+
+    def test_streamed_wav_with_placeholder_size(self):
+        data = bytearray(wav_bytes(np.arange(10, dtype=np.int16)))
+        data[40:44] = struct.pack("<I", 0xFFFFFFFF)
+        self.assertEqual(decode_audio_bytes(data).shape, (10,))
+
+    def test_garbage_raises_decode_error(self):
+        with self.assertRaises(AudioDecodeError):
+            decode_audio_bytes(b"not audio at all")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+import wave
+
+import numpy as np
+
+from batch_pipeline import TRANSCRIPT_FILE, BatchPipeline, load_utterances
+from benchmarks.fakes import FakeOpenAI, FakePolly, FakeWhisperModel, Latency
+from voice_runtime import RuntimeConfig, RuntimeServices
+
+
+def write_wav(path: str, seconds: float = 0.5) -> None:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(np.zeros(int(seconds * 16000), dtype=np.int16).tobytes())
+    with open(path, "wb") as f:
+        f.write(buffer.getvalue())
+
+
+def make_services(stt_ms: float = 0, llm_ms: float = 0, tts_ms: float = 0) -> RuntimeServices:
+    config = RuntimeConfig(
+        llm_model="test",
+        whisper_size="tiny",
+        whisper_device="cpu",
+        whisper_compute_type="int8",
+        aws_region="us-east-1",
+        language="pt",
+        whisper_warmup=False,
+        tts_cache_max_bytes=0,
+    )
+    return RuntimeServices(
+        config,
+        openai_client=FakeOpenAI(Latency(llm_ms), Latency(0)),
+        polly_client=FakePolly(Latency(tts_ms), Latency(0)),
+        whisper_model=FakeWhisperModel(Latency(stt_ms), realtime_factor=0),
+    )
+
+
+class BatchPipelineTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.inputs = os.path.join(self.tmp.name, "in")
+        self.outputs = os.path.join(self.tmp.name, "out")
+        os.makedirs(self.inputs)
+
+    def run_pipeline(self, services, utterances, **kwargs):
+        pipeline = BatchPipeline(services, self.outputs, **kwargs)
+        try:
+            summary = pipeline.run(utterances)
+        finally:
+            pipeline.close()
+        with open(os.path.join(self.outputs, TRANSCRIPT_FILE), encoding="utf-8") as f:
+            return summary, [json.loads(line) for line in f]
+
+    def test_replies_and_records_are_written_in_input_order(self):
+        for name in ("b", "a", "c"):
+            write_wav(os.path.join(self.inputs, f"{name}.wav"))
+        with open(os.path.join(self.inputs, "broken.wav"), "wb") as f:
+            f.write(b"RIFF\x00\x00\x00\x00WAVEjunk")
+        with open(os.path.join(self.inputs, "notes.txt"), "w") as f:
+            f.write("not audio")
+
+        summary, records = self.run_pipeline(make_services(), load_utterances(self.inputs))
+
+        self.assertEqual([record["id"] for record in records], ["a", "b", "broken", "c"])
+        self.assertEqual((summary["utterances"], summary["failed"]), (4, 1))
+        self.assertIn("error", records[2])
+        good = records[0]
+        self.assertEqual(good["transcript"], "ola mundo")
+        self.assertTrue(good["reply"].startswith("Claro, posso ajudar com isso."))
+        self.assertTrue({"stt_wait", "stt", "llm_first_token", "llm_total", "tts"} <= set(good["stages_ms"]))
+        with open(good["output"], "rb") as f:
+            audio = f.read()
+        self.assertEqual(audio[:4], b"RIFF")
+        self.assertAlmostEqual((len(audio) - 44) / 32000, good["reply_s"], places=1)
+
+    def test_stages_overlap_across_utterances(self):
+        for i in range(6):
+            write_wav(os.path.join(self.inputs, f"{i:02d}.wav"))
+        utterances = load_utterances(self.inputs)
+        # Serially each utterance costs 50 ms STT, 150 ms LLM and 50 ms per synthesized sentence: 350 ms or more.
+        services = make_services(stt_ms=50, llm_ms=150, tts_ms=50)
+
+        started = time.perf_counter()
+        summary, records = self.run_pipeline(services, utterances, output_format="pcm", llm_workers=6, tts_workers=6)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(summary["failed"], 0)
+        self.assertLess(elapsed, 6 * 0.35 * 0.5)
+        self.assertTrue(all(record["output"].endswith(".pcm") for record in records))
+
+    def test_manifest_paths_ids_and_languages(self):
+        write_wav(os.path.join(self.inputs, "hello.wav"))
+        manifest = os.path.join(self.tmp.name, "manifest.jsonl")
+        with open(manifest, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"audio": "in/hello.wav", "id": "greeting", "language": "en"}) + "\n")
+            f.write(json.dumps({"audio": "in/hello.wav", "language": "xx"}) + "\n")
+
+        utterances = load_utterances(manifest)
+        self.assertEqual([(u.id, u.language) for u in utterances], [("greeting", "en"), ("hello", "xx")])
+        self.assertEqual(utterances[0].path, os.path.join(self.tmp.name, "in", "hello.wav"))
+
+        summary, records = self.run_pipeline(make_services(), utterances)
+        self.assertEqual(summary["failed"], 1)
+        self.assertIn("not supported", records[1]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
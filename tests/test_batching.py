@@ -0,0 +1,79 @@
+import threading
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from batching import SAMPLE_RATE, TranscriptionBatcher
+
+
+class FakePipeline:
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, language=None, clip_timestamps=None, **kwargs):
+        self.calls.append(clip_timestamps)
+        segments = [
+            SimpleNamespace(text=f"clip{i}", start=round(clip["start"] + 0.2, 3))
+            for i, clip in enumerate(clip_timestamps)
+        ]
+        return iter(segments), SimpleNamespace(language=language)
+
+
+class FakeModel:
+    def transcribe(self, audio, language=None, **kwargs):
+        return iter([SimpleNamespace(text="solo")]), SimpleNamespace(language=language or "en")
+
+
+class WindowedBatcher(TranscriptionBatcher):
+    def _speech_windows(self, audio):
+        # One window per second of audio.
+        return [(i * SAMPLE_RATE, (i + 1) * SAMPLE_RATE) for i in range(len(audio) // SAMPLE_RATE)]
+
+
+class TranscriptionBatcherTests(unittest.TestCase):
+    def test_concurrent_requests_share_one_pass(self):
+        pipeline = FakePipeline()
+        batcher = WindowedBatcher(FakeModel(), max_batch_size=4, max_wait_ms=200, pipeline=pipeline)
+        try:
+            results = {}
+
+            def call(name, seconds):
+                audio = np.zeros(seconds * SAMPLE_RATE, dtype=np.float32)
+                results[name] = batcher.transcribe(audio, "pt")
+
+            threads = [threading.Thread(target=call, args=("a", 2)), threading.Thread(target=call, args=("b", 1))]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(timeout=5)
+        finally:
+            batcher.close()
+
+        self.assertEqual(len(pipeline.calls), 1)
+        self.assertEqual(len(pipeline.calls[0]), 3)
+        self.assertEqual(len(results["a"][0].split()), 2)
+        self.assertEqual(len(results["b"][0].split()), 1)
+        self.assertEqual(results["a"][1], "pt")
+        self.assertEqual(batcher.stats()["batches"], 1)
+
+    def test_single_request_uses_model_directly(self):
+        pipeline = FakePipeline()
+        batcher = WindowedBatcher(FakeModel(), max_batch_size=4, max_wait_ms=0, pipeline=pipeline)
+        try:
+            text, lang = batcher.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), None)
+        finally:
+            batcher.close()
+
+        self.assertEqual((text, lang), ("solo", "en"))
+        self.assertEqual(pipeline.calls, [])
+
+    def test_requests_left_behind_by_close_fail_instead_of_hanging(self):
+        batcher = WindowedBatcher(FakeModel(), max_batch_size=4, max_wait_ms=0, pipeline=FakePipeline())
+        batcher.close()
+        with self.assertRaisesRegex(RuntimeError, "closed"):
+            batcher.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
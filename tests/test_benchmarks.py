@@ -0,0 +1,28 @@
+import unittest
+
+from benchmarks.harness import build_parser, compare, run
+
+
+class HarnessTests(unittest.TestCase):
+    def test_every_scenario_runs_offline_against_stand_ins(self):
+        args = build_parser().parse_args(
+            [
+                "--concurrency", "2",
+                "--requests", "4",
+                "--turns", "1",
+                "--polly-ms", "0", "--polly-jitter-ms", "0", "--polly-chunk-ms", "0",
+                "--llm-first-token-ms", "0", "--llm-jitter-ms", "0", "--llm-token-ms", "0",
+                "--whisper-overhead-ms", "0", "--whisper-jitter-ms", "0", "--whisper-rtf", "0",
+                "--playback-speed", "1000",
+            ]
+        )  # fmt: skip
+        report = run(args)
+        rows = {row["scenario"]: row for row in report["results"]}
+        self.assertEqual(set(rows), {"transcribe", "tts", "agent"})
+        for row in rows.values():
+            self.assertEqual(row["errors"], 0)
+            self.assertGreater(row["throughput_rps"], 0)
+            self.assertLessEqual(row["p50_ms"], row["p99_ms"])
+
+        slower = {"results": [dict(row, p95_ms=row["p95_ms"] * 2 + 1) for row in report["results"]]}
+        self.assertEqual(len(compare(slower, report, threshold=0.1)), 3)
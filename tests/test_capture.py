@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+
+from capture import CaptureBuffer
+from voice_activity import FRAME_SAMPLES, SAMPLE_RATE
+
+
+class CaptureBufferTests(unittest.TestCase):
+    def test_long_silence_keeps_pre_roll_before_anchor(self):
+        buffer = CaptureBuffer(max_seconds=1.0, pre_roll_seconds=0.1)
+        total = 0
+        # Three seconds of "silence" labelled by sample position, more than the buffer holds.
+        for _ in range(3 * SAMPLE_RATE // FRAME_SAMPLES):
+            buffer.append(np.arange(total, total + FRAME_SAMPLES, dtype=np.float32))
+            total += FRAME_SAMPLES
+
+        onset = total - FRAME_SAMPLES
+        start = buffer.anchor(onset - buffer.pre_roll)
+        self.assertEqual(start, onset - buffer.pre_roll)
+
+        buffer.append(np.arange(total, total + FRAME_SAMPLES, dtype=np.float32))
+        total += FRAME_SAMPLES
+        utterance = buffer.view(start, total)
+        np.testing.assert_array_equal(utterance, np.arange(start, total, dtype=np.float32))
+
+    def test_read_frame_times_out_until_a_full_frame_arrives(self):
+        buffer = CaptureBuffer(max_seconds=1.0, pre_roll_seconds=0.1)
+        buffer.append(np.zeros(FRAME_SAMPLES // 2, dtype=np.float32))
+        self.assertIsNone(buffer.read_frame(0, timeout=0.01))
+        buffer.append(np.ones(FRAME_SAMPLES // 2, dtype=np.float32))
+        frame = buffer.read_frame(0, timeout=0.01)
+        self.assertEqual(frame.shape, (FRAME_SAMPLES,))
+        self.assertEqual(frame[-1], 1.0)
+
+    def test_anchored_capture_is_capped_at_capacity(self):
+        buffer = CaptureBuffer(max_seconds=0.1, pre_roll_seconds=0.0)
+        buffer.anchor(0)
+        buffer.append(np.ones(SAMPLE_RATE, dtype=np.float32))
+        self.assertLessEqual(len(buffer.view(0, SAMPLE_RATE)), int(0.1 * SAMPLE_RATE) + FRAME_SAMPLES)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import threading
+import time
+import unittest
+
+from inference import DeadlineExceededError, InferenceExecutor, QueueFullError, UnknownPriorityError
+
+
+class InferenceExecutorTests(unittest.TestCase):
+    def setUp(self):
+        self.executor = InferenceExecutor(workers=1, max_queue=4)
+        self.addCleanup(self.executor.shutdown)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        # Occupies the only worker so everything submitted next waits in the queue.
+        self.blocker = self.executor.submit(self.release.wait)
+        while self.executor.stats()["in_flight"] == 0:
+            time.sleep(0.001)
+
+    def test_higher_priority_and_earlier_deadline_run_first(self):
+        order = []
+        now = time.monotonic()
+        futures = [
+            self.executor.submit(order.append, "batch", priority="batch"),
+            self.executor.submit(order.append, "normal-late", deadline=now + 20),
+            self.executor.submit(order.append, "normal-soon", deadline=now + 10),
+            self.executor.submit(order.append, "interactive", priority="interactive"),
+        ]
+        self.assertEqual(self.executor.stats()["queue_by_priority"], {"interactive": 1, "normal": 2, "batch": 1})
+        self.release.set()
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(order, ["interactive", "normal-soon", "normal-late", "batch"])
+
+    def test_expired_requests_are_dropped_without_running(self):
+        ran = []
+        late = self.executor.submit(ran.append, "late", deadline=time.monotonic() + 0.05)
+        with self.assertRaises(DeadlineExceededError):
+            self.executor.submit(ran.append, "already-late", deadline=time.monotonic() - 1)
+        time.sleep(0.1)
+        self.release.set()
+
+        with self.assertRaises(DeadlineExceededError):
+            late.result(timeout=5)
+        self.assertEqual(ran, [])
+        self.assertEqual(self.executor.stats()["expired"], 2)
+
+    def test_full_queue_evicts_the_newest_lower_priority_request(self):
+        batch = [self.executor.submit(time.sleep, 0, priority="batch") for _ in range(4)]
+        with self.assertRaises(QueueFullError):
+            self.executor.submit(time.sleep, 0, priority="batch")
+
+        live = self.executor.submit(time.sleep, 0, priority="interactive")
+        with self.assertRaises(QueueFullError):
+            batch[-1].result(timeout=1)
+        self.release.set()
+        live.result(timeout=5)
+        for future in batch[:-1]:
+            future.result(timeout=5)
+        stats = self.executor.stats()
+        self.assertEqual((stats["rejected"], stats["preempted"], stats["queue_depth"]), (2, 1, 0))
+
+    def test_cancelled_requests_free_their_slot(self):
+        queued = self.executor.submit(time.sleep, 0)
+        self.assertTrue(queued.cancel())
+        self.assertEqual(self.executor.stats()["queue_depth"], 0)
+
+    def test_cancelling_while_a_worker_claims_the_job_does_not_kill_the_worker(self):
+        next_job = self.executor._next
+
+        def cancelled_on_the_way():
+            # The caller gives up (e.g. a client disconnect) right after the job leaves the queue.
+            job = next_job()
+            if job is not None and job.future is late:
+                job.future.cancel()
+            return job
+
+        self.executor._next = cancelled_on_the_way
+        late = self.executor.submit(time.sleep, 0, deadline=time.monotonic() + 0.05)
+        time.sleep(0.1)
+        self.release.set()
+        self.blocker.result(timeout=5)
+        self.assertTrue(late.cancelled())
+        self.assertEqual(self.executor.submit(lambda: "alive").result(timeout=5), "alive")
+
+    def test_unknown_priority_is_rejected(self):
+        with self.assertRaises(UnknownPriorityError):
+            self.executor.submit(time.sleep, 0, priority="urgent")
+
+
+if __name__ == "__main__":
+    unittest.main()
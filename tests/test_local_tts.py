@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from local_tts import LocalTTS, LocalTTSError, to_pcm16
+
+ID_MAP = {"^": [1], "$": [2], "_": [0], "o": [10], "l": [11], "a": [12], "́": [13]}
+
+
+class FakeSession:
+    # Returns one second of a sine at the voice's rate, shaped like Piper's [1, 1, 1, samples] output.
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.inputs = None
+
+    def run(self, outputs, inputs):
+        self.inputs = inputs
+        t = np.arange(self.sample_rate) / self.sample_rate
+        return [(0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32).reshape(1, 1, 1, -1)]
+
+
+def write_config(directory, **overrides):
+    config = {"audio": {"sample_rate": 22050}, "phoneme_type": "text", "phoneme_id_map": ID_MAP, **overrides}
+    path = os.path.join(directory, "pt_BR-test.onnx")
+    with open(f"{path}.json", "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    return path
+
+
+class LocalTTSTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_text_is_mapped_to_padded_phoneme_ids(self):
+        voice = LocalTTS(write_config(self.tmp.name), session=FakeSession(22050))
+        self.assertEqual(voice.name, "pt_BR-test")
+        # "á" is decomposed into "a" plus the combining accent; "x" is unknown and skipped.
+        self.assertEqual(voice.phoneme_ids("olá x"), [1, 0, 10, 0, 11, 0, 12, 0, 13, 0, 2])
+
+    def test_output_is_16khz_pcm(self):
+        session = FakeSession(22050)
+        voice = LocalTTS(write_config(self.tmp.name), session=session)
+        pcm = voice.synthesize("ola")
+
+        self.assertAlmostEqual(len(pcm) / 2, 16000, delta=200)
+        self.assertEqual(set(session.inputs), {"input", "input_lengths", "scales"})
+        self.assertEqual(session.inputs["input_lengths"].tolist(), [9])
+
+    def test_multi_speaker_voices_get_a_speaker_id(self):
+        session = FakeSession(16000)
+        voice = LocalTTS(write_config(self.tmp.name, audio={"sample_rate": 16000}, num_speakers=4), session=session)
+        self.assertEqual(len(voice.synthesize("a")), 32000)
+        self.assertEqual(session.inputs["sid"].tolist(), [0])
+
+    def test_missing_config_is_reported(self):
+        with self.assertRaisesRegex(LocalTTSError, "config not found"):
+            LocalTTS(os.path.join(self.tmp.name, "missing.onnx"), session=FakeSession(16000))
+
+    def test_audio_is_peak_normalized(self):
+        pcm = np.frombuffer(to_pcm16(np.array([0.25, -0.5], dtype=np.float32), 16000, 16000), dtype=np.int16)
+        self.assertEqual(pcm.tolist(), [16383, -32767])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+import numpy as np
+
+from long_audio import split_at_silence
+from voice_activity import SAMPLE_RATE, EnergyVAD
+
+
+def tone(seconds: float) -> np.ndarray:
+    return (0.3 * np.sin(np.arange(int(seconds * SAMPLE_RATE)) * 0.2)).astype(np.float32)
+
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+class SplitAtSilenceTests(unittest.TestCase):
+    def test_short_audio_is_one_chunk(self):
+        audio = tone(5)
+        self.assertEqual(split_at_silence(audio, EnergyVAD(), chunk_s=30), [(0, len(audio))])
+
+    def test_cuts_land_in_pauses(self):
+        audio = np.concatenate([tone(20), silence(1), tone(20), silence(2), tone(10)])
+        bounds = split_at_silence(audio, EnergyVAD(), chunk_s=30)
+
+        self.assertEqual(len(bounds), 3)
+        self.assertEqual(bounds[0][0], 0)
+        self.assertEqual(bounds[-1][1], len(audio))
+        for (_, end), (start, _) in zip(bounds, bounds[1:]):
+            self.assertEqual(end, start)
+        self.assertTrue(20 * SAMPLE_RATE < bounds[0][1] < 21 * SAMPLE_RATE)
+        self.assertTrue(41 * SAMPLE_RATE < bounds[1][1] < 43 * SAMPLE_RATE)
+
+    def test_speech_without_pauses_is_still_bounded(self):
+        audio = tone(95)
+        bounds = split_at_silence(audio, EnergyVAD(), chunk_s=30)
+        self.assertTrue(all(end - start <= 30 * SAMPLE_RATE for start, end in bounds))
+        self.assertEqual(bounds[-1][1], len(audio))
+
+
+if __name__ == "__main__":
+    unittest.main()
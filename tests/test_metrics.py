@@ -0,0 +1,18 @@
+import unittest
+
+from metrics import MetricsRegistry
+
+
+class HistogramTests(unittest.TestCase):
+    def test_render_uses_cumulative_buckets(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("stage_seconds", "Stage latency.", buckets=(0.1, 1.0), labelnames=("stage",))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.observe(value, stage="stt")
+
+        lines = registry.render().splitlines()
+        self.assertIn('stage_seconds_bucket{stage="stt",le="0.1"} 1', lines)
+        self.assertIn('stage_seconds_bucket{stage="stt",le="1"} 3', lines)
+        self.assertIn('stage_seconds_bucket{stage="stt",le="+Inf"} 4', lines)
+        self.assertIn('stage_seconds_sum{stage="stt"} 4.05', lines)
+        self.assertIn('stage_seconds_count{stage="stt"} 4', lines)
@@ -0,0 +1,76 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from model_registry import ModelRegistry, ModelSpec, UnknownModelError
+
+MB = 1024 * 1024
+
+
+class ModelRegistryTests(unittest.TestCase):
+    def test_least_recently_used_model_is_evicted_to_fit_the_budget(self):
+        loaded = []
+
+        def loader(spec):
+            loaded.append(spec.key)
+            return f"model-{spec.key}"
+
+        # tiny:int8 ~40 MB, base:int8 ~75 MB, small:int8 ~250 MB
+        registry = ModelRegistry(loader, budget_bytes=300 * MB)
+        tiny, base, small = (ModelSpec(size, "int8") for size in ("tiny", "base", "small"))
+        registry.get(tiny)
+        registry.get(base)
+        registry.get(tiny)
+        registry.get(small)
+
+        stats = registry.stats()
+        self.assertEqual(stats["loaded"], ["tiny:int8", "small:int8"])
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(loaded, ["tiny:int8", "base:int8", "small:int8"])
+
+    def test_pinned_model_is_never_evicted(self):
+        registry = ModelRegistry(lambda spec: spec.key, budget_bytes=300 * MB)
+        registry.add(ModelSpec("small", "int8"), "default", pinned=True)
+        registry.get(ModelSpec("base", "int8"))
+        registry.get(ModelSpec("tiny", "int8"))
+        self.assertIn("small:int8", registry.stats()["loaded"])
+        self.assertNotIn("base:int8", registry.stats()["loaded"])
+
+    def test_concurrent_requests_share_one_load(self):
+        calls = []
+
+        def loader(spec):
+            calls.append(spec.key)
+            time.sleep(0.05)
+            return object()
+
+        registry = ModelRegistry(loader)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(registry.get(ModelSpec("tiny", "int8")))) for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len({id(model) for model in results}), 1)
+
+    def test_models_outside_the_allow_list_are_rejected(self):
+        registry = ModelRegistry(lambda spec: spec.key, allowed={"small:int8"})
+        with self.assertRaises(UnknownModelError):
+            registry.get(ModelSpec.parse("large-v3", "int8"))
+        self.assertEqual(ModelSpec.parse("large-v3:float16", "int8").key, "large-v3:float16")
+
+    def test_evicted_models_are_closed(self):
+        closed = []
+        registry = ModelRegistry(
+            lambda spec: SimpleNamespace(close=lambda: closed.append(spec.key)), budget_bytes=200 * MB, copies=2
+        )
+        # Two replicas each: tiny:int8 ~80 MB, base:int8 ~150 MB
+        registry.get(ModelSpec("tiny", "int8"))
+        registry.get(ModelSpec("base", "int8"))
+        self.assertEqual(closed, ["tiny:int8"])
+        registry.close()
+        self.assertEqual(closed, ["tiny:int8", "base:int8"])
@@ -0,0 +1,66 @@
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from playback import PCMRingBuffer
+
+
+class PCMRingBufferTests(unittest.TestCase):
+    def test_reads_back_across_wraparound_and_pads_underrun(self):
+        ring = PCMRingBuffer(capacity=8)
+        ring.write(np.arange(6, dtype=np.int16))
+        out = np.empty(4, dtype=np.int16)
+        ring.read_into(out)
+        ring.write(np.arange(6, 12, dtype=np.int16))
+
+        out = np.empty(10, dtype=np.int16)
+        self.assertEqual(ring.read_into(out), 8)
+        np.testing.assert_array_equal(out, [4, 5, 6, 7, 8, 9, 10, 11, 0, 0])
+
+    def test_write_longer_than_capacity_completes_as_reader_drains(self):
+        ring = PCMRingBuffer(capacity=16)
+        clip = np.arange(100, dtype=np.int16)
+        played = []
+
+        def reader():
+            out = np.empty(5, dtype=np.int16)
+            while len(played) < len(clip):
+                count = ring.read_into(out)
+                played.extend(out[:count].tolist())
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        ring.write(clip)
+        thread.join(timeout=5)
+
+        self.assertEqual(played, clip.tolist())
+        self.assertTrue(ring.wait_empty(timeout=1))
+
+    def test_clear_drops_pending_audio(self):
+        ring = PCMRingBuffer(capacity=8)
+        ring.write(np.ones(6, dtype=np.int16))
+        ring.clear()
+        self.assertEqual(ring.pending, 0)
+        self.assertTrue(ring.wait_empty(timeout=0))
+
+    def test_clear_aborts_a_write_waiting_for_space(self):
+        ring = PCMRingBuffer(capacity=4)
+        results = []
+        writer = threading.Thread(target=lambda: results.append(ring.write(np.ones(10, dtype=np.int16))))
+        writer.start()
+        time.sleep(0.05)
+        ring.clear()
+        writer.join(timeout=1)
+
+        self.assertEqual(results, [False])
+        self.assertEqual(ring.pending, 0)
+        # A write that read the generation before the clear is dropped as well.
+        stale = ring.generation - 1
+        self.assertFalse(ring.write(np.ones(2, dtype=np.int16), stale))
+        self.assertEqual(ring.pending, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
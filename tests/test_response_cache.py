@@ -0,0 +1,72 @@
+import unittest
+
+from response_cache import ResponseCache, normalize
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def put(cache: ResponseCache, text: str, sentences=("Olá!",), audio=(b"audio",), opening: bool = True) -> bool:
+    return cache.put(text, "pt", "Seja breve.", "llm", "pcm", list(sentences), list(audio), opening=opening)
+
+
+def get(cache: ResponseCache, text: str, opening: bool = True):
+    return cache.get(text, "pt", "Seja breve.", "llm", "pcm", opening=opening)
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def test_transcripts_are_matched_after_normalization(self):
+        self.assertEqual(normalize("  Olá, tudo BEM?! "), "olá tudo bem")
+        cache = ResponseCache()
+        self.assertTrue(put(cache, "Olá, tudo bem?"))
+        self.assertEqual(get(cache, "olá tudo bem").audio, (b"audio",))
+        self.assertIsNone(cache.get("olá tudo bem", "pt", "Other prompt.", "llm", "pcm", opening=True))
+        self.assertIsNone(cache.get("olá tudo bem", "pt", "Seja breve.", "llm", "mp3", opening=True))
+
+    def test_entries_expire_after_ttl(self):
+        clock = Clock()
+        cache = ResponseCache(ttl_s=10, clock=clock)
+        put(cache, "oi")
+        clock.now = 9.9
+        self.assertIsNotNone(get(cache, "oi"))
+        clock.now = 10.0
+        self.assertIsNone(get(cache, "oi"))
+        self.assertEqual(cache.stats()["expired"], 1)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_without_an_allow_list_only_opening_turns_are_cached(self):
+        cache = ResponseCache()
+        self.assertFalse(put(cache, "Sim", opening=False))
+        self.assertTrue(put(cache, "Sim"))
+        # "Yes" answers whatever was asked before it, so mid-conversation it is never replayed.
+        self.assertIsNone(get(cache, "Sim", opening=False))
+        self.assertIsNotNone(get(cache, "Sim"))
+
+    def test_deny_and_allow_lists_gate_caching(self):
+        cache = ResponseCache(allow=r"(oi|olá|bom dia)( .*)?", deny=r"\b(repete|de novo|isso)\b")
+        self.assertFalse(put(cache, "Repete isso, por favor"))
+        self.assertFalse(put(cache, "Qual o horário?"))
+        self.assertFalse(put(cache, "Oi, repete de novo"))
+        self.assertTrue(put(cache, "Bom dia!", opening=False))
+        self.assertIsNotNone(get(cache, "bom dia", opening=False))
+        self.assertIsNone(get(cache, "Oi, repete de novo"))
+        self.assertEqual(cache.stats()["skipped"], 1)
+
+    def test_least_recently_used_replies_are_evicted_over_budget(self):
+        cache = ResponseCache(max_bytes=30)
+        put(cache, "a", ("A",), (b"x" * 10,))
+        put(cache, "b", ("B",), (b"x" * 10,))
+        get(cache, "a")
+        put(cache, "c", ("C",), (b"x" * 10,))
+        self.assertIsNotNone(get(cache, "a"))
+        self.assertIsNone(get(cache, "b"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
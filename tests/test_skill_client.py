@@ -0,0 +1,129 @@
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+CLIENT_PATH = os.path.join(os.path.dirname(__file__), "..", "skills", "voice-agent", "scripts", "client.py")
+spec = importlib.util.spec_from_file_location("skill_client", CLIENT_PATH)
+client = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(client)
+
+
+class FakeServer:
+    # Stands in for Connection.request: counts calls and answers from `reply`.
+    def __init__(self, reply: bytes, delay: float = 0.0):
+        self.reply = reply
+        self.delay = delay
+        self.calls = 0
+        self.bodies = []
+        self.lock = threading.Lock()
+
+    def request(self, method, path, body=None, headers=None):
+        with self.lock:
+            self.calls += 1
+        self.bodies.append(b"".join(body()) if callable(body) else body)
+        time.sleep(self.delay)
+        return 200, io.BytesIO(self.reply)
+
+
+class MultipartTests(unittest.TestCase):
+    def test_declared_length_matches_the_streamed_body(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "clip.wav")
+            content = os.urandom(client.UPLOAD_CHUNK * 2 + 17)
+            with open(path, "wb") as f:
+                f.write(content)
+
+            length, chunks = client._multipart(path, "b0undary", {"priority": "batch"})
+            parts = list(chunks())
+            body = b"".join(parts)
+
+        self.assertEqual(length, len(body))
+        # The file is streamed in upload-sized pieces, between the form head and the closing boundary.
+        self.assertEqual(len(parts), 5)
+        self.assertIn(b'name="priority"\r\n\r\nbatch\r\n', body)
+        self.assertIn(b'filename="clip.wav"', body)
+        self.assertIn(content, body)
+        self.assertTrue(body.endswith(b"\r\n--b0undary--\r\n"))
+
+
+class RunBatchTests(unittest.TestCase):
+    def test_results_are_printed_in_input_order_with_errors_counted(self):
+        def work(item):
+            # Earlier items finish last.
+            time.sleep((5 - item) * 0.01)
+            if item == 2:
+                raise RuntimeError("boom")
+            return {"value": item * 10}
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            failed = client._run_batch(range(5), work, workers=5)
+
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(failed, 1)
+        self.assertEqual([result["input"] for result in results], [0, 1, 2, 3, 4])
+        self.assertEqual(results[2], {"input": 2, "error": "boom"})
+        self.assertEqual(results[4], {"input": 4, "value": 40})
+
+
+class CacheTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.cache = os.path.join(self.tmp, "cache")
+
+    def test_transcripts_are_cached_by_file_content(self):
+        audio = os.path.join(self.tmp, "a.wav")
+        with open(audio, "wb") as f:
+            f.write(b"RIFF-audio")
+        server = FakeServer(json.dumps({"text": "ola", "language": "pt"}).encode())
+
+        with mock.patch.object(client.Connection, "request", server.request):
+            first = client.transcribe_request(audio, self.cache, priority="batch")
+            second = client.transcribe_request(audio, self.cache, priority="batch")
+
+        self.assertEqual(first, second)
+        self.assertEqual(server.calls, 1)
+        self.assertIn(b"batch", server.bodies[0])
+
+    def test_duplicate_inputs_in_one_batch_leave_a_valid_cache_entry(self):
+        audio = os.path.join(self.tmp, "a.wav")
+        with open(audio, "wb") as f:
+            f.write(b"RIFF-audio")
+        reply = {"text": "x" * 200_000, "language": "pt"}
+        server = FakeServer(json.dumps(reply).encode(), delay=0.01)
+
+        with mock.patch.object(client.Connection, "request", server.request), contextlib.redirect_stdout(io.StringIO()):
+            failed = client.batch_transcribe([audio] * 8, workers=8, cache_dir=self.cache)
+
+        self.assertEqual(failed, 0)
+        entries = os.listdir(self.cache)
+        self.assertEqual(len(entries), 1)
+        with open(os.path.join(self.cache, entries[0])) as f:
+            self.assertEqual(json.load(f), reply)
+
+    def test_synthesized_audio_is_served_from_the_cache(self):
+        server = FakeServer(b"ogg-audio" * 1000)
+        first = os.path.join(self.tmp, "first.ogg")
+        second = os.path.join(self.tmp, "second.ogg")
+
+        with mock.patch.object(client.Connection, "request", server.request):
+            client.synthesize_request("Olá", first, self.cache)
+            client.synthesize_request("Olá", second, self.cache)
+
+        self.assertEqual(server.calls, 1)
+        with open(first, "rb") as a, open(second, "rb") as b:
+            self.assertEqual(a.read(), b.read())
+        self.assertFalse([name for name in os.listdir(self.cache) if name.endswith(".tmp")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import time
+import unittest
+
+import numpy as np
+
+from streaming_stt import AudioBuffer, IncrementalTranscriber, StreamingTranscriber
+from voice_activity import SAMPLE_RATE, EnergyVAD
+
+
+def tone(seconds: float) -> np.ndarray:
+    return (np.sin(np.arange(int(seconds * SAMPLE_RATE)) * 0.2) * 0.3).astype(np.float32)
+
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+class FakeDecoder:
+    # One two-second segment per two seconds of audio, labelled by absolute position.
+    def __init__(self):
+        self.window_lengths = []
+
+    def __call__(self, audio, language, prompt):
+        self.window_lengths.append(len(audio) / SAMPLE_RATE)
+        count = max(1, int(len(audio) / SAMPLE_RATE // 2))
+        return [(i * 2.0, (i + 1) * 2.0, f" w{i}") for i in range(count)], language
+
+
+class StreamingTranscriberTests(unittest.TestCase):
+    def test_utterance_is_closed_after_trailing_silence(self):
+        session = StreamingTranscriber(FakeDecoder(), vad=EnergyVAD(), language="pt", min_silence_ms=300)
+        events = session.push(np.concatenate([silence(0.5), tone(1.0)]))
+        self.assertEqual([event["type"] for event in events], ["speech_start"])
+        self.assertFalse(session.final_ready)
+
+        session.push(silence(0.5))
+        self.assertTrue(session.final_ready)
+        final = session.decode_final()
+        self.assertEqual(final["text"], "w0")
+        self.assertAlmostEqual(final["start"], 0.3, delta=0.1)
+
+    def test_long_utterance_decodes_a_bounded_window(self):
+        decoder = FakeDecoder()
+        session = StreamingTranscriber(decoder, vad=EnergyVAD(), language="pt", window_s=5.0, partial_interval_ms=1000)
+        for _ in range(20):
+            session.push(tone(1.0))
+            if session.partial_due:
+                partial = session.decode_partial()
+
+        self.assertLess(max(decoder.window_lengths), 8.0)
+        self.assertTrue(partial["stable"])
+        self.assertTrue(partial["text"].startswith(partial["stable"]))
+
+    def test_audio_buffer_keeps_samples_across_growth_and_drops(self):
+        buffer = AudioBuffer(capacity=4)
+        buffer.append(np.arange(3, dtype=np.float32))
+        buffer.drop_front(2)
+        buffer.append(np.arange(3, 8, dtype=np.float32))
+        np.testing.assert_array_equal(buffer.view(), np.arange(2, 8, dtype=np.float32))
+
+
+class IncrementalTranscriberTests(unittest.TestCase):
+    def test_agreed_segments_are_committed_and_only_the_tail_is_decoded_at_the_end(self):
+        decoder = FakeDecoder()
+        speculative = IncrementalTranscriber(decoder, language="pt", interval_ms=1, edge_margin_s=1.0)
+        audio = tone(9.0)
+        passes = []
+
+        def captured_so_far():
+            # First pass sees 8 s of speech, later passes the full 9 s.
+            passes.append(None)
+            return audio[: 8 * SAMPLE_RATE] if len(passes) == 1 else audio
+
+        speculative.start(captured_so_far)
+        deadline = time.monotonic() + 5
+        while len(passes) < 4 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        text = speculative.finish(audio)
+
+        self.assertEqual(speculative.committed, ["w0", "w1", "w2"])
+        self.assertEqual(decoder.window_lengths[:2], [8.0, 9.0])
+        self.assertEqual(decoder.window_lengths[-1], 3.0)
+        self.assertEqual(speculative.tail_samples, 3 * SAMPLE_RATE)
+        self.assertEqual(text, "w0 w1 w2 w0")
+
+
+if __name__ == "__main__":
+    unittest.main()
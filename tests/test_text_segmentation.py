@@ -0,0 +1,45 @@
+import random
+import unittest
+
+from text_segmentation import StreamingSegmenter, split_sentences
+
+REPLY = "O Dr. Silva chega às 9.30, e.g. amanhã. Tudo bem?! Claro. Até logo"
+
+
+def feed_tokens(segmenter: StreamingSegmenter, text: str, size: int) -> list[str]:
+    segments: list[str] = []
+    for start in range(0, len(text), size):
+        segments += segmenter.feed(text[start : start + size])
+    return segments + segmenter.flush()
+
+
+class StreamingSegmenterTests(unittest.TestCase):
+    def test_matches_batch_splitting_for_any_token_size(self):
+        for size in (1, 2, 3, 7, len(REPLY)):
+            self.assertEqual(feed_tokens(StreamingSegmenter(), REPLY, size), split_sentences(REPLY))
+
+    def test_agrees_with_extract_complete_sentences_on_random_text(self):
+        # Abbreviations, stray dots, decimals and unicode letters in every arrangement and token size.
+        pieces = ["mr.", "Mr.", "e.g.", "etc.", "i.e.", ".", "..", ".mr.", " ", "\n"]
+        pieces += ["Olá", "é", "a", "_", "9", "!", "?", ",", "-"]
+        rng = random.Random(0)
+        for _ in range(3000):
+            text = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 25)))
+            size = rng.randint(1, 6)
+            self.assertEqual(feed_tokens(StreamingSegmenter(), text, size), split_sentences(text), repr(text))
+
+    def test_first_clause_is_flushed_early_at_a_comma_or_conjunction(self):
+        segmenter = StreamingSegmenter(first_clause_chars=10)
+        self.assertEqual(segmenter.feed("Sim, claro, posso ajudar "), ["Sim, claro,"])
+        # Only the first segment is cut early.
+        self.assertEqual(segmenter.feed("com isso, e também "), [])
+        self.assertEqual(segmenter.flush(), ["posso ajudar com isso, e também"])
+
+        segmenter = StreamingSegmenter(first_clause_chars=10)
+        self.assertEqual(segmenter.feed("I can look that up and "), ["I can look that up"])
+        self.assertEqual(segmenter.flush(), ["and"])
+
+    def test_short_sentences_after_the_first_are_merged(self):
+        segmenter = StreamingSegmenter(min_chars=12)
+        text = "Olá! Sim. Ok. Posso ajudar com isso. Fim."
+        self.assertEqual(feed_tokens(segmenter, text, 4), ["Olá!", "Sim. Ok. Posso ajudar com isso.", "Fim."])
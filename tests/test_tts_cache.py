@@ -0,0 +1,77 @@
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+
+from tts_cache import TTSCache
+
+
+class TTSCacheTests(unittest.TestCase):
+    def test_key_covers_every_synthesis_parameter(self):
+        base = TTSCache.key("Olá", "Camila", "neural", "mp3", "16000")
+        self.assertNotEqual(base, TTSCache.key("Olá", "Camila", "neural", "pcm", "16000"))
+        self.assertNotEqual(base, TTSCache.key("Olá", "Vitoria", "neural", "mp3", "16000"))
+        self.assertEqual(base, TTSCache.key("Olá", "Camila", "neural", "mp3", "16000"))
+
+    def test_evicts_least_recently_used_over_budget(self):
+        cache = TTSCache(max_bytes=10)
+        cache.put("a", b"12345")
+        cache.put("b", b"12345")
+        cache.get("a")
+        cache.put("c", b"12345")
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_disk_tier_survives_new_instance(self):
+        with tempfile.TemporaryDirectory() as disk_dir:
+            TTSCache(disk_dir=disk_dir).put("k", b"audio")
+            cache = TTSCache(disk_dir=disk_dir)
+            self.assertEqual(cache.get("k"), b"audio")
+            self.assertEqual(cache.stats()["disk_hits"], 1)
+
+    def test_concurrent_misses_call_producer_once(self):
+        cache = TTSCache()
+        calls = []
+
+        def producer():
+            calls.append(1)
+            time.sleep(0.05)
+            return b"audio"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_create("k", producer))) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [b"audio"] * 5)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_cancelled_waiter_does_not_abort_the_shared_synthesis(self):
+        cache = TTSCache()
+        calls = []
+
+        async def producer():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return b"audio"
+
+        async def scenario():
+            first = asyncio.create_task(cache.aget_or_create("k", producer))
+            second = asyncio.create_task(cache.aget_or_create("k", producer))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second
+
+        self.assertEqual(asyncio.run(scenario()), b"audio")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.get("k"), b"audio")
+        self.assertEqual(cache.stats()["coalesced"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
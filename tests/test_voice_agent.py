@@ -0,0 +1,94 @@
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from benchmarks.fakes import FakeOpenAI, FakePolly, FakeWhisperModel, Latency, SimulatedPlayer
+from main import VoiceAgent
+from voice_runtime import RuntimeConfig, RuntimeServices
+
+REPLY = "Primeira frase curta. Segunda frase. Terceira frase. Quarta frase. Quinta frase."
+
+
+class CountingOpenAI(FakeOpenAI):
+    def __init__(self, token: Latency):
+        super().__init__(Latency(0), token)
+        self.chat.completions.reply = REPLY
+        self.tokens = 0
+        create = self.chat.completions.create
+
+        def counted(**kwargs):
+            for chunk in create(**kwargs):
+                self.tokens += 1
+                yield chunk
+
+        self.chat.completions.create = counted
+
+
+def make_agent(openai, barge_in: bool = True, playback_speed: float = 1.0, polly_ms: float = 0) -> VoiceAgent:
+    config = RuntimeConfig(
+        llm_model="test",
+        whisper_size="tiny",
+        whisper_device="cpu",
+        whisper_compute_type="int8",
+        aws_region="us-east-1",
+        language="pt",
+        whisper_warmup=False,
+        tts_cache_max_bytes=0,
+        segment_first_clause_chars=0,
+        segment_min_chars=0,
+    )
+    services = RuntimeServices(
+        config,
+        openai_client=openai,
+        polly_client=FakePolly(Latency(polly_ms), Latency(0)),
+        whisper_model=FakeWhisperModel(Latency(0), realtime_factor=0),
+    )
+    # At real-time speed each sentence takes about a second to play.
+    return VoiceAgent(services, player=SimulatedPlayer(speed=playback_speed), barge_in=barge_in)
+
+
+class BargeInTests(unittest.TestCase):
+    def test_interrupt_stops_llm_synthesis_and_playback(self):
+        openai = CountingOpenAI(Latency(50))
+        agent = make_agent(openai)
+        try:
+            agent.handle_turn(np.zeros(16000, dtype=np.float32))
+            deadline = time.monotonic() + 5
+            while "playback_start" not in agent.trace.stages and time.monotonic() < deadline:
+                time.sleep(0.01)
+            time.sleep(0.2)
+
+            started = time.perf_counter()
+            self.assertTrue(agent.interrupt())
+            self.assertEqual(agent.player.ring.pending, 0)
+            agent.finish_reply()
+            self.assertLess(time.perf_counter() - started, 0.2)
+
+            # The LLM stream was abandoned mid-reply and only the first sentence was heard.
+            self.assertLess(openai.tokens, len(REPLY) // 4)
+            self.assertEqual(agent.conversation.history[-1], {"role": "assistant", "content": "Primeira frase curta."})
+            self.assertFalse(agent.interrupt())
+        finally:
+            agent.shutdown()
+
+    def test_uninterrupted_reply_is_recorded_in_full(self):
+        agent = make_agent(CountingOpenAI(Latency(0)), barge_in=False, playback_speed=1000)
+        try:
+            agent.handle_turn(np.zeros(16000, dtype=np.float32))
+            self.assertEqual(agent.conversation.history[-1]["content"], REPLY)
+        finally:
+            agent.shutdown()
+
+    def test_sentences_slower_to_synthesize_than_the_poll_interval_are_played(self):
+        agent = make_agent(CountingOpenAI(Latency(0)), barge_in=False, playback_speed=1000, polly_ms=60)
+        try:
+            agent.handle_turn(np.zeros(16000, dtype=np.float32))
+            self.assertEqual(len(agent.turn_played), 5)
+        finally:
+            agent.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,350 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+
+from async_clients import ThreadedPolly
+from inference import DeadlineExceededError
+from model_registry import ModelSpec, UnknownModelError
+from tts_cache import TTSCache
+from voice_runtime import RuntimeConfig, RuntimeServices, Transcription, UnsupportedLanguageError
+
+
+class FakeAudioStream:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+    def iter_chunks(self, chunk_size):
+        for i in range(0, len(self.data), chunk_size):
+            yield self.data[i : i + chunk_size]
+
+
+class FakePolly:
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def synthesize_speech(self, Text, **kwargs):
+        with self.lock:
+            self.calls.append(Text)
+        time.sleep(self.delays.get(Text, 0))
+        return {"AudioStream": FakeAudioStream(f"<{Text}>".encode())}
+
+
+class FakeLocalTTS:
+    name = "fake-voice"
+
+    def __init__(self):
+        self.calls = []
+
+    def synthesize(self, text, sample_rate=16000):
+        self.calls.append(text)
+        return f"[{text}]".encode()
+
+
+def make_services(polly, local_tts=None, **config_overrides) -> RuntimeServices:
+    # Bypass __init__ so no Whisper model or cloud clients are created.
+    config = RuntimeConfig(
+        llm_model="test",
+        whisper_size="tiny",
+        whisper_device="cpu",
+        whisper_compute_type="int8",
+        aws_region="us-east-1",
+        language="pt",
+        **config_overrides,
+    )
+    services = RuntimeServices.__new__(RuntimeServices)
+    services.config = config
+    services.voice_config = RuntimeServices._voice_config(config)
+    services.language = "pt"
+    services.current_config = services.voice_config["pt"]
+    services.local_tts = local_tts or {}
+    services.tts_fallbacks = 0
+    services.polly_client = polly
+    services.async_polly = ThreadedPolly(polly)
+    services.tts_cache = TTSCache() if config.tts_cache_max_bytes > 0 else None
+    services.tts_executor = ThreadPoolExecutor(max_workers=config.tts_parallelism)
+    return services
+
+
+def stream(services: RuntimeServices, text: str, output_format: str) -> list[bytes]:
+    async def collect():
+        return [chunk async for chunk in services.astream_speech(text, "pt", output_format)]
+
+    return asyncio.run(collect())
+
+
+class StreamSpeechTests(unittest.TestCase):
+    def test_short_text_is_relayed_in_chunks(self):
+        services = make_services(FakePolly(), tts_stream_chunk_bytes=4)
+        chunks = stream(services, "Olá mundo.", "pcm")
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b"".join(chunks), "<Olá mundo.>".encode())
+
+    def test_long_text_is_synthesized_in_parallel_and_streamed_in_order(self):
+        # The first sentence is the slowest, so sequential synthesis would take ~3x as long.
+        polly = FakePolly(delays={"Primeira frase.": 0.2, "Segunda frase.": 0.1, "Terceira frase.": 0.1})
+        services = make_services(polly, tts_split_min_chars=10, tts_cache_max_bytes=0)
+        started = time.perf_counter()
+        audio = b"".join(stream(services, "Primeira frase. Segunda frase. Terceira frase.", "pcm"))
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(audio, b"<Primeira frase.><Segunda frase.><Terceira frase.>")
+        self.assertLess(elapsed, 0.35)
+
+    def test_streamed_audio_populates_cache(self):
+        polly = FakePolly()
+        services = make_services(polly)
+        stream(services, "Olá.", "mp3")
+        self.assertEqual(services.synthesize_speech("Olá.", "pt", "mp3"), "<Olá.>".encode())
+        self.assertEqual(polly.calls, ["Olá."])
+
+    def test_encoded_output_is_streamed_and_cached(self):
+        polly = FakePolly()
+        services = make_services(polly, tts_split_min_chars=10)
+        text = "Primeira frase. Segunda frase."
+        streamed = b"".join(stream(services, text, "wav"))
+
+        self.assertEqual(streamed[:4], b"RIFF")
+        self.assertEqual(streamed[44:], b"<Primeira frase.><Segunda frase.>")
+        cached = services.synthesize_speech(text, "pt", "wav")
+        self.assertEqual(cached[44:], streamed[44:])
+        self.assertEqual(int.from_bytes(cached[40:44], "little"), len(cached) - 44)
+        self.assertEqual(polly.calls, ["Primeira frase.", "Segunda frase."])
+
+    def test_async_synthesis_shares_the_cache(self):
+        polly = FakePolly()
+        services = make_services(polly)
+
+        async def synthesize():
+            return await asyncio.gather(*(services.asynthesize_speech("Olá.", "pt", "mp3") for _ in range(3)))
+
+        self.assertEqual(asyncio.run(synthesize()), ["<Olá.>".encode()] * 3)
+        self.assertEqual(services.synthesize_speech("Olá.", "pt", "mp3"), "<Olá.>".encode())
+        self.assertEqual(polly.calls, ["Olá."])
+
+
+class TTSBackendTests(unittest.TestCase):
+    def test_local_backend_serves_its_language_without_polly(self):
+        polly, local = FakePolly(), FakeLocalTTS()
+        services = make_services(polly, {"pt": local}, tts_backends=("pt=local",), tts_split_min_chars=10)
+
+        self.assertEqual(services.synthesize_speech("Olá.", "pt", "pcm"), "[Olá.]".encode())
+        streamed = b"".join(stream(services, "Primeira frase. Segunda frase.", "wav"))
+        self.assertEqual(streamed[44:], b"[Primeira frase.][Segunda frase.]")
+        self.assertEqual(services.synthesize_speech("Hello.", "en", "pcm"), b"<Hello.>")
+        # Local voices only produce PCM; mp3 is still Polly's.
+        self.assertEqual(services.synthesize_speech("Olá.", "pt", "mp3"), "<Olá.>".encode())
+        self.assertEqual(polly.calls, ["Hello.", "Olá."])
+        self.assertEqual(local.calls, ["Olá.", "Primeira frase.", "Segunda frase."])
+
+    def test_local_and_polly_audio_are_cached_apart(self):
+        polly, local = FakePolly(), FakeLocalTTS()
+        services = make_services(polly, {"pt": local})
+        services.voice_config["pt"]["tts_backend"] = "local"
+        self.assertEqual(services.synthesize_speech("Olá.", "pt", "pcm"), "[Olá.]".encode())
+        services.voice_config["pt"]["tts_backend"] = "polly"
+        self.assertEqual(services.synthesize_speech("Olá.", "pt", "pcm"), "<Olá.>".encode())
+
+    def test_slow_polly_falls_back_to_the_local_voice(self):
+        polly, local = FakePolly(delays={"Olá.": 0.3}), FakeLocalTTS()
+        services = make_services(polly, {"pt": local}, tts_fallback_ms=50)
+
+        started = time.perf_counter()
+        self.assertEqual(services.synthesize_speech("Olá.", "pt", "pcm"), "[Olá.]".encode())
+        self.assertLess(time.perf_counter() - started, 0.25)
+        self.assertEqual(services.tts_fallbacks, 1)
+
+        # The abandoned Polly call still lands in the cache, so the next request gets Polly's voice.
+        time.sleep(0.4)
+        self.assertEqual(services.synthesize_speech("Olá.", "pt", "pcm"), "<Olá.>".encode())
+        self.assertEqual(polly.calls, ["Olá."])
+
+    def test_async_fallback_keeps_polly_running(self):
+        polly, local = FakePolly(delays={"Olá.": 0.3}), FakeLocalTTS()
+        services = make_services(polly, {"pt": local}, tts_fallback_ms=50)
+
+        async def synthesize():
+            first = await services.asynthesize_speech("Olá.", "pt", "pcm")
+            await asyncio.sleep(0.4)
+            return first, await services.asynthesize_speech("Olá.", "pt", "pcm")
+
+        self.assertEqual(asyncio.run(synthesize()), ("[Olá.]".encode(), "<Olá.>".encode()))
+        self.assertEqual(services.tts_fallbacks, 1)
+
+    def test_fast_polly_is_not_replaced(self):
+        polly, local = FakePolly(), FakeLocalTTS()
+        services = make_services(polly, {"pt": local}, tts_fallback_ms=500)
+        self.assertEqual(services.synthesize_speech("Olá.", "pt", "pcm"), "<Olá.>".encode())
+        self.assertEqual(local.calls, [])
+
+    def test_invalid_backend_overrides_are_rejected(self):
+        with self.assertRaisesRegex(ValueError, "Unknown TTS backend"):
+            make_services(FakePolly(), tts_backends=("pt=espeak",))
+        with self.assertRaisesRegex(ValueError, "Invalid TTS override"):
+            make_services(FakePolly(), tts_local_models=("xx=/voice.onnx",))
+
+
+class FakeWhisper:
+    def __init__(self, gate: threading.Event, fail: bool = False):
+        self.gate = gate
+        self.fail = fail
+        self.calls = 0
+
+    def transcribe(self, audio, **kwargs):
+        self.gate.wait(5)
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("CUDA out of memory")
+        return iter([]), None
+
+
+class BackgroundLoadTests(unittest.TestCase):
+    def make(self, whisper):
+        config = RuntimeConfig(
+            llm_model="test",
+            whisper_size="tiny",
+            whisper_device="cpu",
+            whisper_compute_type="int8",
+            aws_region="us-east-1",
+            language="pt",
+        )
+        return RuntimeServices(
+            config, openai_client=object(), polly_client=FakePolly(), whisper_model=whisper, background=True
+        )
+
+    def test_services_become_ready_after_the_warm_up(self):
+        gate = threading.Event()
+        whisper = FakeWhisper(gate)
+        services = self.make(whisper)
+        self.assertFalse(services.is_ready)
+
+        gate.set()
+        services.wait_ready(timeout=5)
+        self.assertTrue(services.is_ready)
+        self.assertEqual(whisper.calls, 1)
+        self.assertIn("whisper_warmup", services.startup_timings)
+
+    def test_load_failure_is_reported_instead_of_hanging(self):
+        gate = threading.Event()
+        gate.set()
+        services = self.make(FakeWhisper(gate, fail=True))
+        with self.assertRaisesRegex(RuntimeError, "out of memory"):
+            services.wait_ready(timeout=5)
+        self.assertFalse(services.is_ready)
+
+
+class ScriptedWhisper:
+    def __init__(self, name: str, avg_logprob: float = -0.2):
+        self.name = name
+        self.avg_logprob = avg_logprob
+        self.calls = []
+
+    def transcribe(self, audio, language=None, **kwargs):
+        self.calls.append(language)
+        self.options = kwargs
+        segment = SimpleNamespace(start=0.0, end=1.0, text=self.name, avg_logprob=self.avg_logprob)
+        return iter([segment]), SimpleNamespace(duration=len(audio) / 16000, language=language or "en")
+
+
+class ModelRoutingTests(unittest.TestCase):
+    def make(self, small_logprob: float = -0.2):
+        config = RuntimeConfig(
+            llm_model="test",
+            whisper_size="small",
+            whisper_device="cpu",
+            whisper_compute_type="int8",
+            aws_region="us-east-1",
+            language="pt",
+            whisper_warmup=False,
+            whisper_models=("tiny",),
+            whisper_long_model="medium",
+            whisper_long_audio_s=10.0,
+            whisper_escalate_model="large-v3",
+            whisper_escalate_logprob=-1.0,
+            whisper_degrade_model="tiny",
+        )
+        self.small = ScriptedWhisper("small", small_logprob)
+        self.medium = ScriptedWhisper("medium")
+        self.large = ScriptedWhisper("large")
+        self.tiny = ScriptedWhisper("tiny")
+        services = RuntimeServices(config, openai_client=object(), polly_client=FakePolly(), whisper_model=self.small)
+        services.models.add(ModelSpec("medium", "int8"), self.medium)
+        services.models.add(ModelSpec("large-v3", "int8"), self.large)
+        services.models.add(ModelSpec("tiny", "int8"), self.tiny)
+        return services
+
+    def test_short_clips_use_the_default_and_long_clips_the_long_model(self):
+        services = self.make()
+        self.assertEqual(services.transcribe_file(np.zeros(16000, dtype=np.float32)), ("small", "pt"))
+        self.assertEqual(services.transcribe_file(np.zeros(16000 * 12, dtype=np.float32))[0], "medium")
+
+    def test_low_confidence_results_are_escalated(self):
+        services = self.make(small_logprob=-1.5)
+        self.assertEqual(services.transcribe_file(np.zeros(16000, dtype=np.float32))[0], "large")
+        # An explicitly requested model is never second-guessed.
+        self.assertEqual(services.transcribe_file(np.zeros(16000, dtype=np.float32), model="small")[0], "small")
+
+    def test_auto_language_is_detected_by_whisper(self):
+        services = self.make()
+        text, language = services.transcribe_file(np.zeros(16000, dtype=np.float32), language="auto")
+        self.assertEqual(language, "en")
+        self.assertEqual(self.small.calls, [None])
+
+    def test_quality_is_lowered_when_the_budget_is_tight(self):
+        services = self.make()
+        audio = np.zeros(16000 * 4, dtype=np.float32)
+        # Nothing measured yet: full quality regardless of the budget.
+        self.assertEqual(services.transcribe(audio, budget_s=0.001).degradation, "none")
+        services.realtime_factors["small:int8"] = 0.5
+
+        self.assertEqual(services.transcribe(audio, budget_s=2.5), Transcription("small", "pt", "none"))
+        self.assertEqual(services.transcribe(audio, budget_s=1.5), Transcription("small", "pt", "fast_decode"))
+        self.assertTrue(self.small.options["without_timestamps"])
+        self.assertEqual(services.transcribe(audio, budget_s=0.5), Transcription("tiny", "pt", "small_model"))
+        # A requested model is kept; only the decode options are cut.
+        self.assertEqual(services.transcribe(audio, model="small", budget_s=0.5).degradation, "fast_decode")
+        # With the budget already spent nothing is decoded.
+        with self.assertRaises(DeadlineExceededError):
+            services.transcribe(audio, budget_s=0.0)
+        self.assertEqual(len(self.small.calls) + len(self.tiny.calls), 5)
+
+    def test_languages_are_checked_against_the_routed_model(self):
+        services = self.make()
+        self.small.supported_languages = ["en", "pt"]
+        services.check_language("en")
+        services.check_language("auto")
+        with self.assertRaises(UnsupportedLanguageError):
+            services.check_language("xx")
+        with self.assertRaises(UnknownModelError):
+            services.check_language("en", model="large-v2")
+
+    def test_close_stops_the_batcher(self):
+        services = self.make()
+        services.batcher = SimpleNamespace(closed=False)
+        services.batcher.close = lambda: setattr(services.batcher, "closed", True)
+        services.close()
+        self.assertTrue(services.batcher.closed)
+
+    def test_chunks_are_routed_by_recording_length_and_shifted(self):
+        services = self.make()
+        segments, language = services.transcribe_chunk(np.zeros(16000, dtype=np.float32), 60.0, total_s=600.0)
+        self.assertEqual(segments, [(60.0, 61.0, "medium")])
+        self.assertEqual(language, "pt")
+
+    def test_unknown_models_are_rejected(self):
+        services = self.make()
+        with self.assertRaises(UnknownModelError):
+            services.transcribe_file(np.zeros(16000, dtype=np.float32), model="large-v2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import signal
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from whisper_pool import WhisperProcessPool, auto_size
+
+
+class EchoModel:
+    # Reports what it received and which process decoded it.
+    supported_languages = ["en", "pt"]
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def transcribe(self, audio, language=None, **kwargs):
+        time.sleep(self.delay)
+        text = f"{len(audio)} {float(audio.sum()):.1f} {os.getpid()}"
+        segments = [SimpleNamespace(start=0.0, end=len(audio) / 16000, text=text, avg_logprob=-0.2)]
+        return iter(segments), SimpleNamespace(duration=len(audio) / 16000, language=language or "en")
+
+
+def make_echo_model(delay: float = 0.0, fail: bool = False):
+    if fail:
+        raise RuntimeError("no weights")
+    return EchoModel(delay)
+
+
+class AutoSizeTests(unittest.TestCase):
+    def test_small_machines_get_one_replica_using_every_core(self):
+        self.assertEqual(auto_size(2), (1, 2))
+        self.assertEqual(auto_size(4), (1, 4))
+
+    def test_larger_machines_are_split_into_four_thread_replicas(self):
+        self.assertEqual(auto_size(8), (2, 4))
+        self.assertEqual(auto_size(18), (4, 4))
+
+
+class WhisperProcessPoolTests(unittest.TestCase):
+    def test_audio_reaches_the_replica_through_shared_memory(self):
+        pool = WhisperProcessPool({}, replicas=1, factory=make_echo_model)
+        try:
+            segments, info = pool.transcribe(np.full(16000, 0.5, dtype=np.float32), language="pt")
+            segments = list(segments)
+        finally:
+            pool.close()
+        samples, total, _ = segments[0].text.split()
+        self.assertEqual((samples, total), ("16000", "8000.0"))
+        self.assertEqual(segments[0].avg_logprob, -0.2)
+        self.assertEqual((info.duration, info.language), (1.0, "pt"))
+        self.assertEqual(pool.supported_languages, ["en", "pt"])
+
+    def test_concurrent_requests_are_spread_over_replicas(self):
+        pool = WhisperProcessPool({"delay": 0.2}, replicas=2, factory=make_echo_model)
+        pids = []
+
+        def request():
+            segments, _ = pool.transcribe(np.zeros(1600, dtype=np.float32))
+            pids.append(next(segments).text.split()[2])
+
+        try:
+            threads = [threading.Thread(target=request) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(pool.stats()["in_flight"], [0, 0])
+        finally:
+            pool.close()
+        self.assertEqual(len(pids), 4)
+        self.assertEqual(len(set(pids)), 2)
+
+    def test_warm_up_decodes_once_on_every_replica(self):
+        pool = WhisperProcessPool({}, replicas=3, factory=make_echo_model)
+        try:
+            results = pool.warm_up(np.zeros(1600, dtype=np.float32), language="pt")
+        finally:
+            pool.close()
+        pids = {decoded[0][2].split()[2] for decoded, _, _ in results}
+        self.assertEqual(len(pids), 3)
+
+    def test_load_failure_is_raised(self):
+        with self.assertRaisesRegex(RuntimeError, "no weights"):
+            WhisperProcessPool({"fail": True}, replicas=1, factory=make_echo_model)
+
+    def test_killed_replica_fails_its_jobs_and_is_replaced(self):
+        pool = WhisperProcessPool({"delay": 0.3}, replicas=2, factory=make_echo_model)
+        try:
+            victim = pool._processes[0]
+            doomed = pool.submit(np.zeros(1600, dtype=np.float32))
+            self.assertEqual(pool.stats()["in_flight"], [1, 0])
+            os.kill(victim.pid, signal.SIGKILL)
+            victim.join(timeout=5)
+
+            # The survivor takes every request while the replacement loads.
+            for _ in range(4):
+                segments, _ = pool.transcribe(np.zeros(1600, dtype=np.float32))
+                self.assertNotEqual(int(next(segments).text.split()[2]), victim.pid)
+            with self.assertRaisesRegex(RuntimeError, "replica 0 exited"):
+                doomed.result(timeout=5)
+
+            deadline = time.monotonic() + 30
+            while pool.stats()["live"] < 2 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertEqual((pool.stats()["live"], pool.stats()["restarts"]), (2, 1))
+        finally:
+            started = time.monotonic()
+            pool.close()
+        self.assertLess(time.monotonic() - started, 10)
+
+    def test_close_terminates_replicas_that_do_not_finish_in_time(self):
+        pool = WhisperProcessPool({"delay": 30}, replicas=1, factory=make_echo_model, close_timeout=0.5)
+        stuck = pool.submit(np.zeros(160, dtype=np.float32))
+        started = time.monotonic()
+        pool.close()
+        self.assertLess(time.monotonic() - started, 10)
+        with self.assertRaises(RuntimeError):
+            stuck.result(timeout=5)
+
+    def test_closed_pool_rejects_requests(self):
+        pool = WhisperProcessPool({}, replicas=1, factory=make_echo_model)
+        pool.close()
+        with self.assertRaises(RuntimeError):
+            pool.submit(np.zeros(160, dtype=np.float32))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import re
+
+ABBREVIATIONS = {
+    "dr.",
+    "dra.",
+    "mr.",
+    "mrs.",
+    "ms.",
+    "sr.",
+    "sra.",
+    "vs.",
+    "etc.",
+    "e.g.",
+    "i.e.",
+}
+
+
+def is_sentence_boundary(buffer: str, idx: int) -> bool:
+    char = buffer[idx]
+    if char not in ".!?":
+        return False
+
+    if char == "." and idx > 0 and idx + 1 < len(buffer):
+        if buffer[idx - 1].isdigit() and buffer[idx + 1].isdigit():
+            return False
+
+    token_match = re.search(r"(\b[\w.]+)$", buffer[: idx + 1])
+    if token_match and token_match.group(1).lower() in ABBREVIATIONS:
+        return False
+
+    if idx + 1 >= len(buffer):
+        return False
+
+    return buffer[idx + 1].isspace()
+
+
+def extract_complete_sentences(buffer: str) -> tuple[list[str], str]:
+    sentences: list[str] = []
+    cursor = 0
+    for idx in range(len(buffer)):
+        if is_sentence_boundary(buffer, idx):
+            sentence = buffer[cursor : idx + 1].strip()
+            if sentence:
+                sentences.append(sentence)
+            cursor = idx + 1
+
+    remainder = buffer[cursor:].lstrip()
+    return sentences, remainder
+
+
+def split_sentences(text: str) -> list[str]:
+    sentences, remainder = extract_complete_sentences(text)
+    if remainder.strip():
+        sentences.append(remainder.strip())
+    return sentences
+
+
+CLAUSE_PUNCTUATION = ",;:"
+CLAUSE_CONJUNCTIONS = frozenset({"and", "but", "because", "so", "or", "e", "mas", "porque", "pois", "então", "ou"})
+
+
+class StreamingSegmenter:
+    # Incremental counterpart of extract_complete_sentences: feed() only scans the newly arrived
+    # text, carrying the current word and any undecided boundary across calls, so a streamed
+    # reply is segmented in linear time.
+    #
+    # Policy knobs (0 disables):
+    #   first_clause_chars: until the first segment goes out, also cut at ",;:" or before a
+    #     conjunction once the clause has this many characters, to start audio sooner.
+    #   min_chars: after the first segment, sentences shorter than this are merged into the next
+    #     one instead of costing a synthesis call of their own.
+    def __init__(
+        self,
+        first_clause_chars: int = 0,
+        min_chars: int = 0,
+        conjunctions: frozenset[str] = CLAUSE_CONJUNCTIONS,
+    ):
+        self.first_clause_chars = first_clause_chars
+        self.min_chars = min_chars
+        self.conjunctions = conjunctions
+        self.reset()
+
+    def reset(self) -> None:
+        self._parts: list[str] = []
+        self._length = 0
+        self._word = ""
+        self._word_start = 0
+        # Trailing run of word characters and dots, matched against ABBREVIATIONS.
+        self._token = ""
+        # Set after ".!?" (or clause punctuation) until the next character shows whether it ends a segment.
+        self._pending = False
+        self._held = ""
+        self._emitted = 0
+
+    def _first_clause_open(self) -> bool:
+        return self.first_clause_chars > 0 and self._emitted == 0
+
+    def feed(self, text: str) -> list[str]:
+        ready: list[str] = []
+        cut = 0
+        for idx, char in enumerate(text):
+            if char.isspace():
+                if self._pending:
+                    self._parts.append(text[cut:idx])
+                    cut = idx
+                    self._emit("".join(self._parts), ready)
+                    self._parts, self._length = [], 0
+                elif (
+                    self._word
+                    and self._first_clause_open()
+                    and self._word_start >= self.first_clause_chars
+                    and self._word.lower() in self.conjunctions
+                ):
+                    self._parts.append(text[cut:idx])
+                    cut = idx
+                    segment = "".join(self._parts)
+                    self._emit(segment[: self._word_start], ready)
+                    self._parts, self._length = [segment[self._word_start :]], len(segment) - self._word_start
+                self._pending = False
+                self._word = self._token = ""
+            else:
+                self._pending = False
+                if not self._word:
+                    self._word_start = self._length
+                self._word += char
+                self._token = self._token + char if char.isalnum() or char in "._" else ""
+                if char in ".!?":
+                    # Leading dots are not part of the word ("...mr." ends in "mr."), as in the regex path.
+                    self._pending = self._token.lstrip(".").lower() not in ABBREVIATIONS
+                elif char in CLAUSE_PUNCTUATION and self._first_clause_open():
+                    self._pending = self._length + 1 >= self.first_clause_chars
+            self._length += 1
+
+        self._parts.append(text[cut:])
+        return ready
+
+    def flush(self) -> list[str]:
+        rest = " ".join(part for part in (self._held, "".join(self._parts).strip()) if part)
+        self.reset()
+        return [rest] if rest else []
+
+    def _emit(self, segment: str, ready: list[str]) -> None:
+        segment = segment.strip()
+        if not segment:
+            return
+        if self._held:
+            segment = f"{self._held} {segment}"
+            self._held = ""
+        if self._emitted and len(segment) < self.min_chars:
+            self._held = segment
+            return
+        ready.append(segment)
+        self._emitted += 1
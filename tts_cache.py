@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class TTSCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_dir: str | None = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+        self._inflight: dict[str, Future] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+        }
+
+    @staticmethod
+    def key(text: str, voice_id: str, engine: str, output_format: str, sample_rate: str) -> str:
+        material = "\0".join((text, voice_id, engine, output_format, sample_rate))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return data
+
+        data = self._read_disk(key)
+        if data is not None:
+            with self._lock:
+                self._counters["disk_hits"] += 1
+                self._store_memory(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self._store_memory(key, data)
+        self._write_disk(key, data)
+
+    def get_or_create(self, key: str, producer: Callable[[], bytes]) -> bytes:
+        data = self.get(key)
+        if data is not None:
+            return data
+
+        data, pending, leader = self._claim(key)
+        if data is not None:
+            return data
+        if not leader:
+            return pending.result()
+
+        try:
+            data = producer()
+            self.put(key, data)
+            pending.set_result(data)
+            return data
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def aget_or_create(self, key: str, producer: Callable[[], Awaitable[bytes]]) -> bytes:
+        # Shares the in-flight table with get_or_create, so threaded and async callers coalesce too.
+        data = await asyncio.to_thread(self.get, key) if self.disk_dir else self.get(key)
+        if data is not None:
+            return data
+
+        data, pending, leader = self._claim(key)
+        if data is not None:
+            return data
+        if leader:
+            task = asyncio.ensure_future(self._produce(key, pending, producer))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        # Shielded: a cancelled caller must not abort a synthesis other callers are waiting on.
+        return await asyncio.shield(asyncio.wrap_future(pending))
+
+    async def _produce(self, key: str, pending: Future, producer: Callable[[], Awaitable[bytes]]) -> None:
+        try:
+            data = await producer()
+            if self.disk_dir:
+                await asyncio.to_thread(self.put, key, data)
+            else:
+                self.put(key, data)
+            pending.set_result(data)
+        except BaseException as e:
+            pending.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _claim(self, key: str) -> tuple[bytes | None, Future | None, bool]:
+        with self._lock:
+            # The previous leader may have finished between the caller's lookup and taking the lock.
+            data = self._entries.get(key)
+            if data is not None:
+                self._counters["memory_hits"] += 1
+                return data, None, False
+            pending = self._inflight.get(key)
+            if pending is not None:
+                self._counters["coalesced"] += 1
+                return None, pending, False
+            pending = Future()
+            self._inflight[key] = pending
+            self._counters["misses"] += 1
+            return None, pending, True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk": bool(self.disk_dir),
+            }
+
+    def _store_memory(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = data
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self._counters["evictions"] += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key)
+
+    def _read_disk(self, key: str) -> bytes | None:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("TTS disk cache read failed for %s: %s", key, e)
+            return None
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write-then-rename so concurrent readers never see a partial file.
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as temp:
+                temp.write(data)
+            os.replace(temp.name, path)
+        except OSError as e:
+            logger.warning("TTS disk cache write failed for %s: %s", key, e)
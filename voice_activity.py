@@ -0,0 +1,111 @@
+import functools
+import os
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+# Silero scores 32 ms windows at 16 kHz; the energy detector uses the same framing.
+FRAME_SAMPLES = 512
+CONTEXT_SAMPLES = 64
+
+
+class EnergyVAD:
+    def __init__(self, threshold: float = 0.015):
+        self.threshold = threshold
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        return float(np.sqrt(np.mean(np.square(frame, dtype=np.float32)))) > self.threshold
+
+    def reset(self) -> None:
+        pass
+
+
+@functools.lru_cache(maxsize=None)
+def _silero_session(model_path: str):
+    import onnxruntime
+
+    opts = onnxruntime.SessionOptions()
+    opts.inter_op_num_threads = 1
+    opts.intra_op_num_threads = 1
+    opts.log_severity_level = 4
+    return onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"], sess_options=opts)
+
+
+class SileroVAD:
+    # Streaming wrapper around the Silero model bundled with faster-whisper: the LSTM state and
+    # the 64-sample context carry over between frames instead of being reset per call.
+    def __init__(self, threshold: float = 0.5, model_path: str | None = None):
+        if model_path is None:
+            from faster_whisper.utils import get_assets_path
+
+            model_path = os.path.join(get_assets_path(), "silero_vad_v6.onnx")
+        self.threshold = threshold
+        self.session = _silero_session(model_path)
+        self.reset()
+
+    def reset(self) -> None:
+        self._h = np.zeros((1, 1, 128), dtype=np.float32)
+        self._c = np.zeros((1, 1, 128), dtype=np.float32)
+        self._context = np.zeros(CONTEXT_SAMPLES, dtype=np.float32)
+
+    def speech_prob(self, frame: np.ndarray) -> float:
+        window = np.concatenate([self._context, frame.astype(np.float32, copy=False)])[np.newaxis, :]
+        probs, self._h, self._c = self.session.run(None, {"input": window, "h": self._h, "c": self._c})
+        self._context = window[0, -CONTEXT_SAMPLES:]
+        return float(probs[0])
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        return self.speech_prob(frame) >= self.threshold
+
+
+def make_vad(kind: str = "silero", threshold: float | None = None):
+    if kind == "silero":
+        return SileroVAD() if threshold is None else SileroVAD(threshold=threshold)
+    if kind == "energy":
+        return EnergyVAD() if threshold is None else EnergyVAD(threshold=threshold)
+    raise ValueError(f"Unknown VAD '{kind}'. Options: silero, energy")
+
+
+class SpeechEndpointer:
+    # Turns per-frame VAD decisions into "start"/"end" utterance events. A pre-roll of recent
+    # unvoiced frames is kept so callers can include the audio just before the detected onset.
+    def __init__(self, vad, min_silence_ms: float = 500, pre_roll_ms: float = 200):
+        self.vad = vad
+        self.min_silence_frames = max(1, round(min_silence_ms / 1000 * SAMPLE_RATE / FRAME_SAMPLES))
+        self.pre_roll_frames = max(0, round(pre_roll_ms / 1000 * SAMPLE_RATE / FRAME_SAMPLES))
+        self.in_speech = False
+        self.silent_frames = 0
+        self._pre_roll: list[np.ndarray] = []
+
+    def process(self, frame: np.ndarray) -> str | None:
+        voiced = self.vad.is_speech(frame)
+        if not self.in_speech:
+            if voiced:
+                self.in_speech = True
+                self.silent_frames = 0
+                return "start"
+            self._pre_roll.append(frame)
+            if len(self._pre_roll) > self.pre_roll_frames:
+                self._pre_roll.pop(0)
+            return None
+
+        if voiced:
+            self.silent_frames = 0
+            return None
+        self.silent_frames += 1
+        if self.silent_frames >= self.min_silence_frames:
+            self.in_speech = False
+            self.silent_frames = 0
+            return "end"
+        return None
+
+    def take_pre_roll(self) -> np.ndarray:
+        pre_roll = np.concatenate(self._pre_roll) if self._pre_roll else np.zeros(0, dtype=np.float32)
+        self._pre_roll = []
+        return pre_roll
+
+    def reset(self) -> None:
+        self.vad.reset()
+        self.in_speech = False
+        self.silent_frames = 0
+        self._pre_roll = []
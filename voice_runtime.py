@@ -1,13 +1,48 @@
+import asyncio
+import importlib
+import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Iterator
 
+import numpy as np
 from dotenv import load_dotenv
 
+from audio_encoding import AudioFormat, encode_all, finalize, make_encoder
+from inference import DeadlineExceededError
+from metrics import observe_stage, observe_whisper
+from model_registry import ModelRegistry, ModelSpec
+from text_segmentation import split_sentences
+from whisper_pool import WhisperProcessPool, auto_size, load_whisper_model
+
+logger = logging.getLogger(__name__)
+
+
+class UnsupportedLanguageError(ValueError):
+    pass
+
+
+TTS_BACKENDS = ("polly", "local")
+
+# What /transcribe gives up, in order, when the expected decode time no longer fits a request's deadline.
+DEGRADATION_LEVELS = ("none", "fast_decode", "small_model")
+# "fast_decode": no timestamp tokens and VAD that trims harder than faster-whisper's defaults
+# (threshold 0.5, 2000 ms silence, 400 ms padding), assumed to cost about this fraction of a full decode.
+FAST_DECODE_VAD = {"threshold": 0.6, "min_silence_duration_ms": 500, "speech_pad_ms": 100}
+FAST_DECODE_COST = 0.7
+
 
 VOICE_CONFIG = {
     "pt": {
         "voice_id": "Camila",
         "whisper_lang": "pt",
+        # "polly", or "local" for an in-process Piper voice (ONNX) at `local_model`.
+        "tts_backend": "polly",
+        "local_model": None,
         "system_prompt": (
             "Você é um assistente de voz útil e rápido. "
             "Responda de forma direta e conversacional. "
@@ -17,6 +52,8 @@ VOICE_CONFIG = {
     "en": {
         "voice_id": "Joanna",
         "whisper_lang": "en",
+        "tts_backend": "polly",
+        "local_model": None,
         "system_prompt": (
             "You are a helpful and fast voice assistant. "
             "Answer directly and conversationally. "
@@ -26,6 +63,13 @@ VOICE_CONFIG = {
 }
 
 
+@dataclass(frozen=True)
+class Transcription:
+    text: str
+    language: str | None
+    degradation: str = "none"
+
+
 @dataclass
 class RuntimeConfig:
     llm_model: str
@@ -34,30 +78,276 @@ class RuntimeConfig:
     whisper_compute_type: str
     aws_region: str
     language: str
+    whisper_batch_size: int = 1
+    whisper_batch_wait_ms: float = 10.0
+    tts_cache_max_bytes: int = 64 * 1024 * 1024
+    tts_cache_dir: str | None = None
+    tts_parallelism: int = 4
+    tts_split_min_chars: int = 200
+    tts_stream_chunk_bytes: int = 4096
+    # "lang=backend" / "lang=/path/voice.onnx" overrides of VOICE_CONFIG's tts_backend and local_model.
+    tts_backends: tuple[str, ...] = ()
+    tts_local_models: tuple[str, ...] = ()
+    tts_local_threads: int = 0
+    # >0: Polly replies slower than this are answered by the language's local voice instead.
+    tts_fallback_ms: float = 0.0
+    # 0 disables the response cache; replies are cached without their conversation history.
+    response_cache_max_bytes: int = 0
+    response_cache_ttl_s: float = 3600.0
+    response_cache_max_chars: int = 80
+    response_cache_allow: str | None = None
+    response_cache_deny: str | None = None
+    segment_first_clause_chars: int = 40
+    segment_min_chars: int = 12
+    whisper_warmup: bool = True
+    # Extra "size[:compute_type]" models requests may select, on top of the default and routed ones.
+    whisper_models: tuple[str, ...] = ()
+    whisper_memory_budget_mb: int = 0
+    whisper_long_model: str | None = None
+    whisper_long_audio_s: float = 30.0
+    whisper_escalate_model: str | None = None
+    whisper_escalate_logprob: float = -1.0
+    # Smaller model used when even a fast decode on the routed one would miss the request's deadline.
+    whisper_degrade_model: str | None = None
+    # >0 runs each model as that many replicas in worker processes (CPU serving); 0 keeps it in-process.
+    whisper_replicas: int = 0
+    whisper_cpu_threads: int = 0
+    whisper_num_workers: int = 1
+    # Connection pools for Polly and OpenAI, shared by every request of the process.
+    http_max_connections: int = 200
+    http_max_keepalive: int = 50
+    http_keepalive_expiry_s: float = 30.0
+    http_connect_timeout_s: float = 3.0
+    http_read_timeout_s: float = 30.0
+    http_pool_timeout_s: float = 10.0
+    http_max_retries: int = 2
+    # Retries allowed per first attempt (Polly), so a failing backend is not hit with a retry storm.
+    http_retry_budget: float = 0.2
 
 
 class RuntimeServices:
-    def __init__(self, config: RuntimeConfig):
-        import boto3
-        from faster_whisper import WhisperModel
-        from openai import OpenAI
-
+    def __init__(
+        self,
+        config: RuntimeConfig,
+        openai_client=None,
+        polly_client=None,
+        whisper_model=None,
+        local_tts: dict | None = None,
+        background: bool = False,
+    ):
+        # Clients can be injected (benchmarks, offline runs); otherwise the real ones are built by
+        # load(), either inline or on a background thread so a server can answer probes meanwhile.
         self.config = config
-        self.voice_config = VOICE_CONFIG
+        self.voice_config = self._voice_config(config)
         self.language = config.language if config.language in VOICE_CONFIG else "pt"
-        self.current_config = VOICE_CONFIG[self.language]
-
-        self.openai_client = OpenAI()
-        self.polly_client = boto3.client("polly", region_name=config.aws_region)
-        self.whisper_model = WhisperModel(
-            config.whisper_size,
-            device=config.whisper_device,
-            compute_type=config.whisper_compute_type,
+        self.current_config = self.voice_config[self.language]
+
+        self.openai_client = openai_client
+        self.polly_client = polly_client
+        # Async counterparts used by the API; injected blocking clients get thread-backed facades.
+        self.async_openai = None
+        self.async_polly = None
+        self.whisper_model = whisper_model
+        self.batcher = None
+        # Local voices by language, for languages served by (or falling back to) the local backend.
+        self.local_tts: dict = local_tts if local_tts is not None else {}
+        self.tts_fallbacks = 0
+
+        compute_type = config.whisper_compute_type
+        self.default_model = ModelSpec(config.whisper_size, compute_type)
+        self.long_model = self.escalate_model = self.degrade_model = None
+        if config.whisper_long_model:
+            self.long_model = ModelSpec.parse(config.whisper_long_model, compute_type)
+        if config.whisper_escalate_model:
+            self.escalate_model = ModelSpec.parse(config.whisper_escalate_model, compute_type)
+        if config.whisper_degrade_model:
+            self.degrade_model = ModelSpec.parse(config.whisper_degrade_model, compute_type)
+        routed = (self.default_model, self.long_model, self.escalate_model, self.degrade_model)
+        allowed = {ModelSpec.parse(text, compute_type).key for text in config.whisper_models}
+        allowed |= {spec.key for spec in routed if spec}
+        self.models = ModelRegistry(
+            self._load_model, config.whisper_memory_budget_mb * 1024 * 1024, allowed, copies=config.whisper_replicas
         )
 
+        # Seconds of decoding per second of audio, per model (EWMA of full-quality decodes).
+        self.realtime_factors: dict[str, float] = {}
+
+        self.tts_cache = None
+        if config.tts_cache_max_bytes > 0:
+            from tts_cache import TTSCache
+
+            self.tts_cache = TTSCache(max_bytes=config.tts_cache_max_bytes, disk_dir=config.tts_cache_dir)
+        self.response_cache = None
+        if config.response_cache_max_bytes > 0:
+            from response_cache import ResponseCache
+
+            self.response_cache = ResponseCache(
+                max_bytes=config.response_cache_max_bytes,
+                ttl_s=config.response_cache_ttl_s,
+                max_chars=config.response_cache_max_chars,
+                allow=config.response_cache_allow,
+                deny=config.response_cache_deny,
+            )
+        self.tts_executor = ThreadPoolExecutor(max_workers=max(1, config.tts_parallelism), thread_name_prefix="tts")
+
+        self.loaded = threading.Event()
+        self.load_error: Exception | None = None
+        self.startup_timings: dict[str, float] = {}
+        if background:
+            threading.Thread(target=self._load_in_background, name="runtime-load", daemon=True).start()
+        else:
+            self.load()
+
+    @staticmethod
+    def _voice_config(config: RuntimeConfig) -> dict:
+        voice_config = {language: dict(settings) for language, settings in VOICE_CONFIG.items()}
+        for key, overrides in (("tts_backend", config.tts_backends), ("local_model", config.tts_local_models)):
+            for item in overrides:
+                language, _, value = item.partition("=")
+                language, value = language.strip().lower(), value.strip()
+                if language not in voice_config or not value:
+                    raise ValueError(f"Invalid TTS override '{item}'; expected <language>=<value>")
+                voice_config[language][key] = value
+        for language, settings in voice_config.items():
+            if settings["tts_backend"] not in TTS_BACKENDS:
+                raise ValueError(f"Unknown TTS backend '{settings['tts_backend']}' for '{language}'")
+        return voice_config
+
+    @property
+    def is_ready(self) -> bool:
+        return self.loaded.is_set() and self.load_error is None
+
+    def wait_ready(self, timeout: float | None = None) -> None:
+        if not self.loaded.wait(timeout):
+            raise TimeoutError("Runtime services are still loading")
+        if self.load_error is not None:
+            raise self.load_error
+
+    def _timed(self, name: str, fn: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        result = fn()
+        self.startup_timings[name] = round(time.perf_counter() - started, 3)
+        logger.info("Startup: %s took %.2fs", name, self.startup_timings[name])
+        return result
+
+    def _load_in_background(self) -> None:
+        try:
+            self.load()
+        except Exception as e:
+            logger.exception("Runtime services failed to load")
+            self.load_error = e
+            self.loaded.set()
+
+    def load(self) -> None:
+        config = self.config
+        async_clients = importlib.import_module("async_clients")
+        if self.openai_client is None:
+            openai = self._timed("import_openai", lambda: importlib.import_module("openai"))
+            self.openai_client = openai.OpenAI(
+                timeout=async_clients.make_timeout(config), max_retries=config.http_max_retries
+            )
+            self.async_openai = async_clients.make_async_openai(openai, config)
+        else:
+            self.async_openai = async_clients.ThreadedOpenAI(self.openai_client)
+        if self.polly_client is None:
+            boto3 = self._timed("import_boto3", lambda: importlib.import_module("boto3"))
+            from botocore.config import Config
+
+            session = boto3.Session(region_name=config.aws_region)
+            self.polly_client = session.client(
+                "polly",
+                config=Config(
+                    max_pool_connections=config.http_max_connections,
+                    connect_timeout=config.http_connect_timeout_s,
+                    read_timeout=config.http_read_timeout_s,
+                    retries={"max_attempts": config.http_max_retries, "mode": "standard"},
+                    tcp_keepalive=True,
+                ),
+            )
+            self.async_polly = async_clients.make_async_polly(session, config)
+        else:
+            self.async_polly = async_clients.ThreadedPolly(self.polly_client)
+        for language, settings in self.voice_config.items():
+            wanted = settings["tts_backend"] == "local" or config.tts_fallback_ms > 0
+            if settings["local_model"] and wanted and language not in self.local_tts:
+                local_tts = importlib.import_module("local_tts")
+                self.local_tts[language] = self._timed(
+                    f"local_tts_{language}",
+                    lambda path=settings["local_model"]: local_tts.LocalTTS(path, threads=config.tts_local_threads),
+                )
+            if settings["tts_backend"] == "local" and language not in self.local_tts:
+                raise ValueError(f"TTS backend 'local' for '{language}' needs a local_model")
+        if self.whisper_model is None:
+            self._timed("import_faster_whisper", lambda: importlib.import_module("faster_whisper"))
+            self.whisper_model = self._timed("whisper_load", lambda: self._load_model(self.default_model))
+        self.models.add(self.default_model, self.whisper_model, pinned=True)
+        if config.whisper_warmup:
+            self._timed("whisper_warmup", self._warm_up)
+
+        if config.whisper_batch_size > 1 and config.whisper_replicas > 0:
+            logger.warning("WHISPER_BATCH_SIZE is ignored with WHISPER_REPLICAS; the replicas decode in parallel")
+        elif config.whisper_batch_size > 1:
+            from batching import TranscriptionBatcher
+
+            self.batcher = TranscriptionBatcher(
+                self.whisper_model,
+                max_batch_size=config.whisper_batch_size,
+                max_wait_ms=config.whisper_batch_wait_ms,
+            )
+        self.loaded.set()
+
+    def _load_model(self, spec: ModelSpec):
+        config = self.config
+        model_args = {
+            "size": spec.size,
+            "device": config.whisper_device,
+            "compute_type": spec.compute_type,
+            "cpu_threads": config.whisper_cpu_threads,
+            "num_workers": config.whisper_num_workers,
+        }
+        started = time.perf_counter()
+        if config.whisper_replicas > 0:
+            model = WhisperProcessPool(model_args, config.whisper_replicas)
+        else:
+            model = load_whisper_model(**model_args)
+        elapsed = time.perf_counter() - started
+        logger.info("Loaded Whisper %s on %s in %.2fs", spec.key, config.whisper_device, elapsed)
+        return model
+
+    def close(self) -> None:
+        if self.batcher is not None:
+            self.batcher.close()
+        self.models.close()
+        self.tts_executor.shutdown()
+
+    async def aclose(self) -> None:
+        # Must run on the event loop that used the async clients; their pools are bound to it.
+        if self.async_polly is not None:
+            await self.async_polly.aclose()
+        if self.async_openai is not None:
+            await self.async_openai.close()
+
+    def _warm_up(self) -> None:
+        # The first decode pays for CUDA context/kernel setup; do it on a silent clip instead of
+        # on the first user request. No VAD filter, otherwise the silence is never decoded.
+        clip = np.zeros(16000, dtype=np.float32)
+        options = {"language": self.current_config["whisper_lang"], "beam_size": 1, "temperature": 0.0}
+        if isinstance(self.whisper_model, WhisperProcessPool):
+            # Each replica has its own model, so each needs its own warm-up decode.
+            self.whisper_model.warm_up(clip, **options)
+            return
+        segments, _ = self.whisper_model.transcribe(clip, **options)
+        list(segments)
+
     @classmethod
-    def from_env(cls) -> "RuntimeServices":
+    def from_env(cls, background: bool = False) -> "RuntimeServices":
         load_dotenv()
+        replicas = os.getenv("WHISPER_REPLICAS", "0")
+        cpu_threads = os.getenv("WHISPER_CPU_THREADS", "0")
+        if replicas == "auto":
+            auto_replicas, auto_threads = auto_size()
+            replicas = str(auto_replicas)
+            cpu_threads = cpu_threads if cpu_threads != "0" else str(auto_threads)
         config = RuntimeConfig(
             llm_model=os.getenv("LLM_MODEL", "gpt-5-mini"),
             whisper_size=os.getenv("WHISPER_SIZE", "small"),
@@ -65,27 +355,447 @@ class RuntimeServices:
             whisper_compute_type=os.getenv("WHISPER_COMPUTE_TYPE", "float16"),
             aws_region=os.getenv("AWS_REGION", "us-east-1"),
             language=os.getenv("LANGUAGE", "pt").lower(),
+            whisper_batch_size=int(os.getenv("WHISPER_BATCH_SIZE", "1")),
+            whisper_batch_wait_ms=float(os.getenv("WHISPER_BATCH_WAIT_MS", "10")),
+            tts_cache_max_bytes=int(os.getenv("TTS_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            tts_cache_dir=os.getenv("TTS_CACHE_DIR") or None,
+            tts_parallelism=int(os.getenv("TTS_PARALLELISM", "4")),
+            tts_split_min_chars=int(os.getenv("TTS_SPLIT_MIN_CHARS", "200")),
+            tts_stream_chunk_bytes=int(os.getenv("TTS_STREAM_CHUNK_BYTES", "4096")),
+            tts_backends=tuple(item for item in os.getenv("TTS_BACKENDS", "").split(",") if item.strip()),
+            tts_local_models=tuple(item for item in os.getenv("TTS_LOCAL_MODELS", "").split(",") if item.strip()),
+            tts_local_threads=int(os.getenv("TTS_LOCAL_THREADS", "0")),
+            tts_fallback_ms=float(os.getenv("TTS_FALLBACK_MS", "0")),
+            response_cache_max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", "0")),
+            response_cache_ttl_s=float(os.getenv("RESPONSE_CACHE_TTL_S", "3600")),
+            response_cache_max_chars=int(os.getenv("RESPONSE_CACHE_MAX_CHARS", "80")),
+            response_cache_allow=os.getenv("RESPONSE_CACHE_ALLOW") or None,
+            response_cache_deny=os.getenv("RESPONSE_CACHE_DENY") or None,
+            segment_first_clause_chars=int(os.getenv("SEGMENT_FIRST_CLAUSE_CHARS", "40")),
+            segment_min_chars=int(os.getenv("SEGMENT_MIN_CHARS", "12")),
+            whisper_warmup=os.getenv("WHISPER_WARMUP", "1").lower() not in {"0", "false", "no"},
+            whisper_models=tuple(name for name in os.getenv("WHISPER_MODELS", "").split(",") if name.strip()),
+            whisper_memory_budget_mb=int(os.getenv("WHISPER_MEMORY_BUDGET_MB", "0")),
+            whisper_long_model=os.getenv("WHISPER_LONG_MODEL") or None,
+            whisper_long_audio_s=float(os.getenv("WHISPER_LONG_AUDIO_S", "30")),
+            whisper_escalate_model=os.getenv("WHISPER_ESCALATE_MODEL") or None,
+            whisper_escalate_logprob=float(os.getenv("WHISPER_ESCALATE_LOGPROB", "-1.0")),
+            whisper_degrade_model=os.getenv("WHISPER_DEGRADE_MODEL") or None,
+            whisper_replicas=int(replicas),
+            whisper_cpu_threads=int(cpu_threads),
+            whisper_num_workers=int(os.getenv("WHISPER_NUM_WORKERS", "1")),
+            http_max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "200")),
+            http_max_keepalive=int(os.getenv("HTTP_MAX_KEEPALIVE", "50")),
+            http_keepalive_expiry_s=float(os.getenv("HTTP_KEEPALIVE_EXPIRY_S", "30")),
+            http_connect_timeout_s=float(os.getenv("HTTP_CONNECT_TIMEOUT_S", "3")),
+            http_read_timeout_s=float(os.getenv("HTTP_READ_TIMEOUT_S", "30")),
+            http_pool_timeout_s=float(os.getenv("HTTP_POOL_TIMEOUT_S", "10")),
+            http_max_retries=int(os.getenv("HTTP_MAX_RETRIES", "2")),
+            http_retry_budget=float(os.getenv("HTTP_RETRY_BUDGET", "0.2")),
         )
-        return cls(config)
+        return cls(config, background=background)
 
-    def transcribe_file(self, filename: str, language: str | None = None) -> tuple[str, str]:
-        lang = language or self.current_config["whisper_lang"]
-        segments, _ = self.whisper_model.transcribe(
-            filename,
-            language=lang,
+    def _resolve_language(self, language: str | None, model) -> str | None:
+        # None means the configured language; "auto" lets Whisper detect it.
+        if language is None:
+            return self.current_config["whisper_lang"]
+        if language == "auto":
+            return None
+        supported = getattr(model, "supported_languages", None)
+        if supported is not None and language not in supported:
+            raise UnsupportedLanguageError(f"Language '{language}' is not supported by this model")
+        return language
+
+    def check_language(self, language: str | None, audio_seconds: float = 0.0, model: str | None = None) -> None:
+        # Raises UnsupportedLanguageError (or UnknownModelError) before any audio is decoded.
+        self._resolve_language(language, self.models.get(self.route(audio_seconds, model)))
+
+    def route(self, audio_seconds: float, model: str | None = None) -> ModelSpec:
+        if model:
+            spec = ModelSpec.parse(model, self.config.whisper_compute_type)
+            self.models.check(spec)
+            return spec
+        if self.long_model is not None and audio_seconds >= self.config.whisper_long_audio_s:
+            return self.long_model
+        return self.default_model
+
+    def _decode(
+        self,
+        model,
+        audio: str | np.ndarray,
+        language: str | None,
+        initial_prompt: str | None = None,
+        fast: bool = False,
+    ):
+        options = {"without_timestamps": True, "vad_parameters": FAST_DECODE_VAD} if fast else {}
+        started = time.perf_counter()
+        segments, info = model.transcribe(
+            audio,
+            language=language,
             vad_filter=True,
             beam_size=1,
             temperature=0.0,
+            initial_prompt=initial_prompt,
+            **options,
         )
-        return " ".join(seg.text for seg in segments), lang
+        # Segments are decoded lazily, so the timer has to cover the iteration.
+        decoded = list(segments)
+        observe_whisper(time.perf_counter() - started, info.duration)
+        return decoded, getattr(info, "language", None) or language
+
+    def _needs_escalation(self, segments) -> bool:
+        if self.escalate_model is None or not segments:
+            return False
+        logprobs = [getattr(seg, "avg_logprob", 0.0) for seg in segments]
+        return sum(logprobs) / len(logprobs) < self.config.whisper_escalate_logprob
+
+    def _observe_speed(self, spec: ModelSpec, seconds: float, audio_seconds: float) -> None:
+        if audio_seconds <= 0:
+            return
+        factor = seconds / audio_seconds
+        previous = self.realtime_factors.get(spec.key)
+        self.realtime_factors[spec.key] = factor if previous is None else 0.8 * previous + 0.2 * factor
+
+    def _degradation(self, spec: ModelSpec, audio_seconds: float, budget_s: float | None, pinned: bool) -> str:
+        # Until a model has been timed there is nothing to predict with, so it runs at full quality.
+        factor = self.realtime_factors.get(spec.key)
+        if budget_s is None or factor is None or factor * audio_seconds <= budget_s:
+            return "none"
+        if pinned or self.degrade_model is None or factor * audio_seconds * FAST_DECODE_COST <= budget_s:
+            return "fast_decode"
+        return "small_model"
+
+    def transcribe(
+        self,
+        audio: str | np.ndarray,
+        language: str | None = None,
+        model: str | None = None,
+        budget_s: float | None = None,
+    ) -> Transcription:
+        # `budget_s` is the time left before the caller's deadline; quality is lowered (never below
+        # an explicitly requested model) when the expected decode time does not fit in it.
+        if budget_s is not None and budget_s <= 0:
+            raise DeadlineExceededError("Deadline passed before decoding started")
+        if isinstance(audio, str):
+            from faster_whisper import decode_audio
+
+            audio = decode_audio(audio)
+        audio_seconds = len(audio) / 16000
+        spec = self.route(audio_seconds, model)
+        degradation = self._degradation(spec, audio_seconds, budget_s, pinned=bool(model))
+        if degradation == "small_model":
+            spec = self.degrade_model
+        whisper_model = self.models.get(spec)
+        lang = self._resolve_language(language, whisper_model)
+
+        started = time.perf_counter()
+        if self.batcher is not None and spec == self.default_model and degradation == "none":
+            text, detected = self.batcher.transcribe(audio, lang)
+            elapsed = time.perf_counter() - started
+            observe_whisper(elapsed, audio_seconds)
+            self._observe_speed(spec, elapsed, audio_seconds)
+            return Transcription(text, detected)
+
+        segments, detected = self._decode(whisper_model, audio, lang, fast=degradation != "none")
+        if degradation != "none":
+            return Transcription(" ".join(seg.text for seg in segments), detected, degradation)
+        self._observe_speed(spec, time.perf_counter() - started, audio_seconds)
+        if not model and spec != self.escalate_model and self._needs_escalation(segments):
+            # Low-confidence result from the fast model: decode again with the accurate one.
+            logger.info("Escalating %.1fs clip from %s to %s", audio_seconds, spec.key, self.escalate_model.key)
+            started = time.perf_counter()
+            segments, detected = self._decode(self.models.get(self.escalate_model), audio, lang)
+            self._observe_speed(self.escalate_model, time.perf_counter() - started, audio_seconds)
+        return Transcription(" ".join(seg.text for seg in segments), detected)
 
-    def synthesize_speech(self, text: str, language: str, output_format: str) -> bytes:
+    def transcribe_file(
+        self, audio: str | np.ndarray, language: str | None = None, model: str | None = None
+    ) -> tuple[str, str]:
+        result = self.transcribe(audio, language=language, model=model)
+        return result.text, result.language
+
+    def transcribe_segments(
+        self,
+        audio: str | np.ndarray,
+        language: str | None = None,
+        initial_prompt: str | None = None,
+        model: str | None = None,
+    ) -> tuple[list[tuple[float, float, str]], str]:
+        # Streaming callers decode many short windows; they stay on the default model unless told otherwise.
+        whisper_model = self.models.get(self.route(0.0, model))
+        lang = self._resolve_language(language, whisper_model)
+        segments, detected = self._decode(whisper_model, audio, lang, initial_prompt)
+        return [(seg.start, seg.end, seg.text) for seg in segments], detected
+
+    def transcribe_chunk(
+        self,
+        audio: np.ndarray,
+        offset_s: float,
+        language: str | None = None,
+        model: str | None = None,
+        total_s: float = 0.0,
+    ) -> tuple[list[tuple[float, float, str]], str]:
+        # One piece of a long recording: routed by the length of the whole recording, with segment
+        # times shifted onto its timeline.
+        whisper_model = self.models.get(self.route(total_s, model))
+        lang = self._resolve_language(language, whisper_model)
+        segments, detected = self._decode(whisper_model, audio, lang)
+        return [(offset_s + seg.start, offset_s + seg.end, seg.text) for seg in segments], detected
+
+    def _polly_params(self, text: str, language: str, output_format: str | AudioFormat) -> dict:
+        fmt = AudioFormat.of(output_format)
+        return {
+            "Text": text,
+            "VoiceId": self.voice_config[language]["voice_id"],
+            "Engine": "neural",
+            "OutputFormat": fmt.polly_format,
+            "SampleRate": str(fmt.polly_rate),
+        }
+
+    def _cache_key(self, params: dict) -> str:
+        return self.tts_cache.key(
+            params["Text"], params["VoiceId"], params["Engine"], params["OutputFormat"], params["SampleRate"]
+        )
+
+    def _encoded_key(self, text: str, language: str, fmt: AudioFormat) -> str:
         voice_id = self.voice_config[language]["voice_id"]
-        response = self.polly_client.synthesize_speech(
-            Text=text,
-            VoiceId=voice_id,
-            Engine="neural",
-            OutputFormat=output_format,
-            SampleRate="16000",
+        return self.tts_cache.key(text, voice_id, "neural", fmt.tag, str(fmt.sample_rate))
+
+    def _local_key(self, text: str, engine, fmt: AudioFormat) -> str:
+        return self.tts_cache.key(text, engine.name, "local", fmt.tag, str(fmt.sample_rate))
+
+    def _local_engine(self, language: str, fmt: AudioFormat):
+        # Local voices only produce PCM, so mp3 and ogg_vorbis are always Polly's.
+        return self.local_tts.get(language) if fmt.polly_format == "pcm" else None
+
+    def _local_backend(self, language: str, fmt: AudioFormat):
+        engine = self._local_engine(language, fmt)
+        return engine if engine is not None and self.voice_config[language]["tts_backend"] == "local" else None
+
+    def _fallback_engine(self, language: str, fmt: AudioFormat):
+        return self._local_engine(language, fmt) if self.config.tts_fallback_ms > 0 else None
+
+    def _fell_back(self, language: str) -> None:
+        self.tts_fallbacks += 1
+        logger.warning(
+            "Polly exceeded %.0fms for '%s'; answering with the local voice", self.config.tts_fallback_ms, language
         )
-        return response["AudioStream"].read()
+
+    def _local_speech(self, text: str, engine, fmt: AudioFormat) -> bytes:
+        def synthesize() -> bytes:
+            if fmt.encoded:
+                return encode_all(self._local_speech(text, engine, fmt.source), fmt)
+            started = time.perf_counter()
+            audio = engine.synthesize(text, fmt.sample_rate)
+            observe_stage("local_tts", time.perf_counter() - started)
+            return audio
+
+        if self.tts_cache is None:
+            return synthesize()
+        return self.tts_cache.get_or_create(self._local_key(text, engine, fmt), synthesize)
+
+    def synthesize_speech(self, text: str, language: str, output_format: str | AudioFormat) -> bytes:
+        fmt = AudioFormat.of(output_format)
+        engine = self._local_backend(language, fmt)
+        if engine is not None:
+            return self._local_speech(text, engine, fmt)
+        engine = self._fallback_engine(language, fmt)
+        if engine is None:
+            return self._polly_speech(text, language, fmt)
+
+        # Past the budget the Polly call is abandoned, not cancelled: it still fills its cache entry.
+        pending = self.tts_executor.submit(self._polly_speech, text, language, fmt)
+        try:
+            return pending.result(timeout=self.config.tts_fallback_ms / 1000)
+        except FutureTimeoutError:
+            # Not the builtin TimeoutError before Python 3.11, which the image still runs.
+            self._fell_back(language)
+            return self._local_speech(text, engine, fmt)
+
+    def _polly_speech(self, text: str, language: str, fmt: AudioFormat) -> bytes:
+        if fmt.encoded:
+            # The Polly PCM is cached on its own, so other encodings of the same text skip Polly too.
+            def encode() -> bytes:
+                return encode_all(self._polly_speech(text, language, fmt.source), fmt)
+
+            if self.tts_cache is None:
+                return encode()
+            return self.tts_cache.get_or_create(self._encoded_key(text, language, fmt), encode)
+
+        params = self._polly_params(text, language, fmt)
+
+        def synthesize() -> bytes:
+            started = time.perf_counter()
+            response = self.polly_client.synthesize_speech(**params)
+            observe_stage("polly_first_byte", time.perf_counter() - started)
+            audio = response["AudioStream"].read()
+            observe_stage("polly_total", time.perf_counter() - started)
+            return audio
+
+        if self.tts_cache is None:
+            return synthesize()
+        return self.tts_cache.get_or_create(self._cache_key(params), synthesize)
+
+    def _encode_stream(self, fmt: AudioFormat, key: str | None, pcm: Iterator[bytes]) -> Iterator[bytes]:
+        encoder = make_encoder(fmt)
+        parts: list[bytes] = []
+        for chunk in pcm:
+            encoded = encoder.encode(chunk)
+            if encoded:
+                parts.append(encoded)
+                yield encoded
+        encoded = encoder.flush()
+        if encoded:
+            parts.append(encoded)
+            yield encoded
+        if key is not None:
+            self.tts_cache.put(key, finalize(fmt, b"".join(parts)))
+
+    def _stream_local(self, text: str, engine, fmt: AudioFormat) -> Iterator[bytes]:
+        if fmt.encoded:
+            key = self._local_key(text, engine, fmt) if self.tts_cache is not None else None
+            cached = self.tts_cache.get(key) if key is not None else None
+            if cached is not None:
+                yield cached
+                return
+            yield from self._encode_stream(fmt, key, self._stream_local(text, engine, fmt.source))
+            return
+
+        # Sentence by sentence: the first one is out while the next is being synthesized.
+        sentences = split_sentences(text) if len(text) >= self.config.tts_split_min_chars else []
+        for sentence in sentences or [text]:
+            yield self._local_speech(sentence, engine, fmt)
+
+    async def _apolly(self, params: dict) -> AsyncIterator[bytes]:
+        started = time.perf_counter()
+        first = True
+        async for chunk in self.async_polly.stream(params, self.config.tts_stream_chunk_bytes):
+            if first:
+                observe_stage("polly_first_byte", time.perf_counter() - started)
+                first = False
+            yield chunk
+        observe_stage("polly_total", time.perf_counter() - started)
+
+    async def asynthesize_speech(self, text: str, language: str, output_format: str | AudioFormat) -> bytes:
+        fmt = AudioFormat.of(output_format)
+        engine = self._local_backend(language, fmt)
+        if engine is not None:
+            return await asyncio.to_thread(self._local_speech, text, engine, fmt)
+        engine = self._fallback_engine(language, fmt)
+        if engine is None:
+            return await self._apolly_speech(text, language, fmt)
+
+        # With the TTS cache the producer is shielded, so the timed-out Polly call still completes.
+        try:
+            return await asyncio.wait_for(self._apolly_speech(text, language, fmt), self.config.tts_fallback_ms / 1000)
+        except asyncio.TimeoutError:
+            self._fell_back(language)
+            return await asyncio.to_thread(self._local_speech, text, engine, fmt)
+
+    async def _apolly_speech(self, text: str, language: str, fmt: AudioFormat) -> bytes:
+        if fmt.encoded:
+
+            async def encode() -> bytes:
+                pcm = await self._apolly_speech(text, language, fmt.source)
+                return await asyncio.to_thread(encode_all, pcm, fmt)
+
+            if self.tts_cache is None:
+                return await encode()
+            return await self.tts_cache.aget_or_create(self._encoded_key(text, language, fmt), encode)
+
+        params = self._polly_params(text, language, fmt)
+
+        async def synthesize() -> bytes:
+            return b"".join([chunk async for chunk in self._apolly(params)])
+
+        if self.tts_cache is None:
+            return await synthesize()
+        return await self.tts_cache.aget_or_create(self._cache_key(params), synthesize)
+
+    async def _astream_sentence(
+        self, text: str, language: str, output_format: str | AudioFormat
+    ) -> AsyncIterator[bytes]:
+        params = self._polly_params(text, language, output_format)
+        key = self._cache_key(params) if self.tts_cache is not None else None
+        if key is not None:
+            cached = self.tts_cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        parts: list[bytes] = []
+        async for chunk in self._apolly(params):
+            parts.append(chunk)
+            yield chunk
+        if key is not None:
+            self.tts_cache.put(key, b"".join(parts))
+
+    async def _arelay_sentence(
+        self, text: str, language: str, output_format: str | AudioFormat, out: asyncio.Queue, slots: asyncio.Semaphore
+    ) -> None:
+        try:
+            async with slots:
+                async for chunk in self._astream_sentence(text, language, output_format):
+                    out.put_nowait(chunk)
+        except Exception as e:
+            out.put_nowait(e)
+        out.put_nowait(None)
+
+    async def astream_speech(self, text: str, language: str, output_format: str | AudioFormat) -> AsyncIterator[bytes]:
+        # Streams never fall back to the local voice: once Polly's first bytes are out it is committed.
+        fmt = AudioFormat.of(output_format)
+        engine = self._local_backend(language, fmt)
+        if engine is not None:
+            chunks = self._stream_local(text, engine, fmt)
+            while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+                yield chunk
+            return
+        if fmt.encoded:
+            cached = self.tts_cache.get(self._encoded_key(text, language, fmt)) if self.tts_cache is not None else None
+            if cached is not None:
+                yield cached
+                return
+            encoder = make_encoder(fmt)
+            parts: list[bytes] = []
+            async for chunk in self.astream_speech(text, language, fmt.source):
+                encoded = encoder.encode(chunk)
+                if encoded:
+                    parts.append(encoded)
+                    yield encoded
+            encoded = encoder.flush()
+            if encoded:
+                parts.append(encoded)
+                yield encoded
+            if self.tts_cache is not None:
+                self.tts_cache.put(self._encoded_key(text, language, fmt), finalize(fmt, b"".join(parts)))
+            return
+
+        sentences = split_sentences(text) if len(text) >= self.config.tts_split_min_chars else []
+        if len(sentences) <= 1:
+            async for chunk in self._astream_sentence(text, language, output_format):
+                yield chunk
+            return
+
+        # Every sentence is synthesized concurrently but relayed strictly in order, so the first
+        # one streams live while later ones buffer until their turn comes. At most `tts_parallelism`
+        # sentences of a request are at Polly at once.
+        slots = asyncio.Semaphore(max(1, self.config.tts_parallelism))
+        outputs: list[asyncio.Queue] = []
+        tasks: list[asyncio.Task] = []
+        for sentence in sentences:
+            out: asyncio.Queue = asyncio.Queue()
+            tasks.append(asyncio.create_task(self._arelay_sentence(sentence, language, output_format, out, slots)))
+            outputs.append(out)
+
+        try:
+            for out in outputs:
+                while True:
+                    item = await out.get()
+                    if item is None:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
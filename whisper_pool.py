@@ -0,0 +1,310 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection, wait
+from types import SimpleNamespace
+from typing import Callable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Past ~4 intra-op threads CTranslate2 gains little on Whisper decoding, so spare cores are better
+# spent on more replicas serving requests in parallel.
+THREADS_PER_REPLICA = 4
+
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def auto_size(cores: int | None = None) -> tuple[int, int]:
+    # -> (replicas, cpu_threads per replica)
+    cores = cores or available_cores()
+    if cores <= THREADS_PER_REPLICA:
+        return 1, cores
+    return cores // THREADS_PER_REPLICA, THREADS_PER_REPLICA
+
+
+def load_whisper_model(size: str, device: str, compute_type: str, cpu_threads: int = 0, num_workers: int = 1):
+    from faster_whisper import WhisperModel
+
+    return WhisperModel(
+        size, device=device, compute_type=compute_type, cpu_threads=cpu_threads, num_workers=num_workers
+    )
+
+
+def _worker_main(index: int, factory: Callable, model_args: dict, jobs, results) -> None:
+    try:
+        model = factory(**model_args)
+    except Exception as e:
+        results.send(("failed", index, f"{type(e).__name__}: {e}"))
+        return
+    results.send(("ready", index, getattr(model, "supported_languages", None)))
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            results.send(("exited", index, None))
+            return
+        job_id, shm_name, samples, kwargs = job
+        shm = shared_memory.SharedMemory(name=shm_name)
+        try:
+            audio = np.ndarray((samples,), dtype=np.float32, buffer=shm.buf)
+            segments, info = model.transcribe(audio, **kwargs)
+            decoded = [(seg.start, seg.end, seg.text, getattr(seg, "avg_logprob", 0.0)) for seg in segments]
+            payload = (decoded, info.duration, getattr(info, "language", None))
+            del audio
+            results.send(("done", job_id, payload))
+        except Exception as e:
+            results.send(("error", job_id, f"{type(e).__name__}: {e}"))
+        finally:
+            shm.close()
+
+
+class WhisperProcessPool:
+    # Whisper replicas in separate processes, each with its own CTranslate2 thread pool. Callers
+    # use it like a WhisperModel: transcribe() copies the audio once into shared memory, hands the
+    # segment name to the least-loaded replica and blocks until its segments come back. A replica
+    # that dies fails its in-flight jobs, stops receiving new ones and is replaced in the background.
+    def __init__(
+        self,
+        model_args: dict,
+        replicas: int,
+        factory: Callable = load_whisper_model,
+        start_timeout: float = 600.0,
+        close_timeout: float = 60.0,
+    ):
+        self._context = multiprocessing.get_context("spawn")
+        self._factory = factory
+        self._model_args = model_args
+        self.replicas = replicas
+        self.close_timeout = close_timeout
+        # One result pipe per replica: a replica killed mid-write can only break its own pipe,
+        # whereas a shared queue's write lock would die with it and block every other replica.
+        self._results: list[Connection | None] = [None] * replicas
+        self._jobs = [self._context.Queue() for _ in range(replicas)]
+        self._in_flight = [0] * replicas
+        self._pending: dict[int, tuple[Future, int, shared_memory.SharedMemory]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+        # Replicas accepting jobs, and replicas that are gone for good (exited on close or failed to restart).
+        self._live: set[int] = set()
+        self._stopped: set[int] = set()
+        self.restarts = 0
+        self.supported_languages = None
+
+        started = time.perf_counter()
+        self._processes = [self._spawn(index) for index in range(replicas)]
+        self._wait_ready(start_timeout)
+        logger.info(
+            "Started %d Whisper replicas (%s) in %.2fs", replicas, model_args, time.perf_counter() - started
+        )
+
+        self._collector = threading.Thread(target=self._collect, name="whisper-pool-results", daemon=True)
+        self._collector.start()
+
+    def _spawn(self, index: int) -> multiprocessing.Process:
+        reader, writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, self._factory, self._model_args, self._jobs[index], writer),
+            name=f"whisper-replica-{index}",
+            daemon=True,
+        )
+        process.start()
+        # With only the replica holding the write end, its death shows up as EOF on the reader.
+        writer.close()
+        self._results[index] = reader
+        return process
+
+    def _receive(self, indexes, timeout: float) -> list[tuple[int, tuple | None]]:
+        # -> (replica, message) for every replica with something to read; None means its pipe is closed.
+        readers = {self._results[index]: index for index in indexes}
+        received = []
+        for reader in wait(list(readers), timeout=timeout):
+            try:
+                received.append((readers[reader], reader.recv()))
+            except (EOFError, OSError):
+                received.append((readers[reader], None))
+        return received
+
+    def _wait_ready(self, timeout: float) -> None:
+        waiting = set(range(self.replicas))
+        deadline = time.monotonic() + timeout
+        while waiting:
+            received = self._receive(waiting, max(0.0, deadline - time.monotonic()))
+            if not received:
+                self._terminate()
+                raise TimeoutError(f"Whisper replicas {sorted(waiting)} did not start in {timeout:.0f}s")
+            for index, message in received:
+                if message is None:
+                    self._terminate()
+                    raise RuntimeError(f"Whisper replica {index} exited while loading")
+                kind, _, detail = message
+                if kind == "failed":
+                    self._terminate()
+                    raise RuntimeError(f"Whisper replica {index} failed to load: {detail}")
+                self.supported_languages = detail
+                self._live.add(index)
+                waiting.discard(index)
+
+    def _collect(self) -> None:
+        # Liveness is checked on every pass, not only when the pipes are idle, so a dead replica is
+        # noticed within a second even under load.
+        while True:
+            with self._lock:
+                active = [index for index in range(self.replicas) if index not in self._stopped]
+            for index, message in self._receive(active, timeout=1.0):
+                if message is None:
+                    # Closed pipe: the replica is gone and _check_replicas deals with it.
+                    continue
+                kind, key, payload = message
+                if kind == "exited":
+                    with self._lock:
+                        self._stopped.add(index)
+                elif kind == "ready":
+                    with self._lock:
+                        self._live.add(index)
+                    logger.info("Whisper replica %d restarted", index)
+                elif kind == "failed":
+                    with self._lock:
+                        self._stopped.add(index)
+                    logger.error("Whisper replica %d failed to restart: %s", index, payload)
+                else:
+                    self._complete(kind, key, payload)
+            self._check_replicas()
+            with self._lock:
+                if self._closed and len(self._stopped) == self.replicas:
+                    break
+        for reader in self._results:
+            reader.close()
+
+    def _complete(self, kind: str, job_id: int, payload) -> None:
+        with self._lock:
+            entry = self._pending.pop(job_id, None)
+            if entry is None:
+                # Already failed because its replica was declared dead.
+                return
+            future, replica, shm = entry
+            self._in_flight[replica] -= 1
+        shm.unlink()
+        shm.close()
+        if kind == "done":
+            future.set_result(payload)
+        else:
+            future.set_exception(RuntimeError(payload))
+
+    def _check_replicas(self) -> None:
+        with self._lock:
+            dead = {
+                index
+                for index, process in enumerate(self._processes)
+                if index not in self._stopped and not process.is_alive()
+            }
+            if not dead:
+                return
+            lost = [key for key, (_, replica, _) in self._pending.items() if replica in dead]
+            failed = [self._pending.pop(key) for key in lost]
+            for _, replica, _ in failed:
+                self._in_flight[replica] -= 1
+            for index in dead:
+                # Only a replica that had been serving is replaced; one that died while loading would
+                # just die again.
+                if self._closed or index not in self._live:
+                    self._stopped.add(index)
+                else:
+                    logger.error("Whisper replica %d exited unexpectedly; restarting it", index)
+                    self._results[index].close()
+                    self._jobs[index] = self._context.Queue()
+                    self._processes[index] = self._spawn(index)
+                    self.restarts += 1
+                self._live.discard(index)
+        for future, replica, shm in failed:
+            shm.unlink()
+            shm.close()
+            future.set_exception(RuntimeError(f"Whisper replica {replica} exited"))
+
+    def submit(self, audio: np.ndarray, replica: int | None = None, **kwargs) -> Future:
+        # `replica` pins the job to one replica instead of the least-loaded one.
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, audio.nbytes))
+        np.ndarray(audio.shape, dtype=np.float32, buffer=shm.buf)[:] = audio
+        future: Future = Future()
+        with self._lock:
+            # Replicas that died since the collector's last pass are skipped right away.
+            candidates = [index for index in self._live if self._processes[index].is_alive()]
+            if replica is not None:
+                candidates = [index for index in candidates if index == replica]
+            if self._closed or not candidates:
+                shm.unlink()
+                shm.close()
+                raise RuntimeError("Whisper pool is closed" if self._closed else "No Whisper replica is available")
+            replica = min(candidates, key=lambda index: self._in_flight[index])
+            self._in_flight[replica] += 1
+            job_id = next(self._ids)
+            self._pending[job_id] = (future, replica, shm)
+            jobs = self._jobs[replica]
+        jobs.put((job_id, shm.name, len(audio), kwargs))
+        return future
+
+    def warm_up(self, audio: np.ndarray, **kwargs) -> list[tuple]:
+        # Every live replica decodes the clip once, so none of them pays its first-decode setup on a
+        # user request. -> one (segments, duration, language) result per replica.
+        with self._lock:
+            replicas = sorted(self._live)
+        futures = [self.submit(audio, replica=index, **kwargs) for index in replicas]
+        return [future.result() for future in futures]
+
+    def transcribe(self, audio, **kwargs):
+        if isinstance(audio, str):
+            from faster_whisper import decode_audio
+
+            audio = decode_audio(audio)
+        decoded, duration, language = self.submit(audio, **kwargs).result()
+        segments = [
+            SimpleNamespace(start=start, end=end, text=text, avg_logprob=avg_logprob)
+            for start, end, text, avg_logprob in decoded
+        ]
+        return iter(segments), SimpleNamespace(duration=duration, language=language)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "replicas": self.replicas,
+                "live": len(self._live),
+                "restarts": self.restarts,
+                "in_flight": list(self._in_flight),
+            }
+
+    def close(self) -> None:
+        # Replicas finish the jobs already queued to them before exiting; past `close_timeout`
+        # they are terminated and whatever is still pending fails.
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            queues = list(self._jobs)
+        for jobs in queues:
+            jobs.put(None)
+        self._collector.join(timeout=self.close_timeout)
+        if self._collector.is_alive():
+            logger.warning("Whisper replicas did not exit in %.0fs; terminating them", self.close_timeout)
+            self._terminate()
+            self._collector.join(timeout=5)
+        for process in self._processes:
+            process.join(timeout=5)
+
+    def _terminate(self) -> None:
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()